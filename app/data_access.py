@@ -4,6 +4,9 @@ from dataclasses import dataclass
 from pathlib import Path
 import pandas as pd
 import streamlit as st
+import yaml
+
+from pipeline.storage import Storage
 
 
 def _project_root_from_this_file(this_file: Path) -> Path:
@@ -29,6 +32,24 @@ class DataPaths:
         )
 
 
+def _settings() -> dict:
+    cfg_path = DataPaths.default().project_root / "config" / "settings.yaml"
+    if not cfg_path.exists():
+        return {}
+    with cfg_path.open("r", encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+
+def _storage() -> Storage:
+    # Marts are read in whatever format the pipeline wrote (output.format in settings.yaml)
+    return Storage.from_config(_settings())
+
+
+def min_group_size() -> int:
+    """governance.min_group_size, for KPIs the dashboard rolls up itself."""
+    return int((_settings().get("governance") or {}).get("min_group_size", 0))
+
+
 def _missing_hint() -> str:
     return (
         "Required data not found. Run the pipeline from the project root:\n"
@@ -39,29 +60,47 @@ def _missing_hint() -> str:
 
 @st.cache_data(show_spinner=False)
 def load_campaign_kpis() -> pd.DataFrame:
-    p = DataPaths.default().marts_dir / "mart_kpis_campaign.csv"
+    storage = _storage()
+    p = storage.path(DataPaths.default().marts_dir, "mart_kpis_campaign")
     if not p.exists():
         st.error(_missing_hint())
         return pd.DataFrame()
-    df = pd.read_csv(p)
-    if "start_date" in df.columns:
-        df["start_date"] = pd.to_datetime(df["start_date"], errors="coerce")
-    return df
+    return storage.read_file(p, "mart_kpis_campaign")
 
 
 @st.cache_data(show_spinner=False)
 def load_segment_kpis() -> pd.DataFrame:
-    p = DataPaths.default().marts_dir / "mart_kpis_segment.csv"
+    storage = _storage()
+    p = storage.path(DataPaths.default().marts_dir, "mart_kpis_segment")
     if not p.exists():
         st.error(_missing_hint())
         return pd.DataFrame()
-    return pd.read_csv(p)
+    return storage.read_file(p, "mart_kpis_segment")
+
+
+@st.cache_data(show_spinner=False)
+def load_sufficient_stats() -> pd.DataFrame:
+    storage = _storage()
+    p = storage.path(DataPaths.default().marts_dir, "mart_sufficient_stats")
+    if not p.exists():
+        return pd.DataFrame()
+    return storage.read_file(p, "mart_sufficient_stats")
+
+
+@st.cache_data(show_spinner=False)
+def load_uplift_curves() -> pd.DataFrame:
+    storage = _storage()
+    p = storage.path(DataPaths.default().marts_dir, "mart_uplift_curves")
+    if not p.exists():
+        return pd.DataFrame()
+    return storage.read_file(p, "mart_uplift_curves")
 
 
 @st.cache_data(show_spinner=False)
 def load_outcomes_light() -> pd.DataFrame:
-    p = DataPaths.default().marts_dir / "mart_campaign_outcomes_light.csv"
+    storage = _storage()
+    p = storage.path(DataPaths.default().marts_dir, "mart_campaign_outcomes_light")
     if not p.exists():
         st.error(_missing_hint())
         return pd.DataFrame()
-    return pd.read_csv(p)
+    return storage.read_file(p, "mart_campaign_outcomes_light")
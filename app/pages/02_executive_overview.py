@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import streamlit as st
+import numpy as np
 import pandas as pd
 
 from app.data_access import load_campaign_kpis
@@ -26,7 +27,10 @@ if df.empty:
     st.stop()
 
 df = df.sort_values("incremental_revenue", ascending=False).copy()
-df["decision"] = df.apply(lambda r: decision_label(float(r["incremental_revenue"]), int(r["insufficient_sample_flag"])), axis=1)
+df["decision"] = df.apply(lambda r: decision_label(
+    float(r["incremental_revenue"]), int(r["insufficient_sample_flag"]),
+    float(r.get("incremental_revenue_ci_low", np.nan)), float(r.get("incremental_revenue_ci_high", np.nan)),
+), axis=1)
 
 c1, c2, c3, c4 = st.columns(4)
 c1.metric("Campaigns", fmt_num(len(df)))
@@ -35,12 +39,14 @@ c3.metric("Avg RPC Uplift", fmt_money(df["RPC_uplift"].mean()))
 c4.metric("Avg CR Uplift", fmt_pct(df["CR_uplift"].mean()))
 
 st.markdown("### Ranked campaigns (decision-first)")
-show = df[[
+show_cols = [
     "campaign_id", "campaign_name", "channel", "target_segment",
     "exposed_n_customers", "holdout_n_customers",
     "CR_uplift", "RPC_uplift", "incremental_revenue",
-    "insufficient_sample_flag", "decision"
-]].copy()
+    "insufficient_sample_flag", "overlap_flag", "decision"
+]
+# overlap_flag is absent from marts built before the overlap index
+show = df[[c for c in show_cols if c in df.columns]].copy()
 
 show["CR_uplift"] = show["CR_uplift"].map(fmt_pct)
 show["RPC_uplift"] = show["RPC_uplift"].map(fmt_money)
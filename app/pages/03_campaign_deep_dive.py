@@ -1,8 +1,9 @@
 from __future__ import annotations
 
+import numpy as np
 import streamlit as st
 
-from app.data_access import load_campaign_kpis, load_outcomes_light
+from app.data_access import load_campaign_kpis, load_outcomes_light, load_uplift_curves
 from app.ui_utils import fmt_pct, fmt_money, fmt_num, decision_label
 
 st.title("Campaign Deep Dive")
@@ -19,8 +20,19 @@ camp = st.selectbox("Select campaign", campaigns, index=campaigns.index(default)
 row = kpis[kpis["campaign_id"] == camp].iloc[0]
 
 st.markdown("### Decision summary")
-st.write(f"**Decision:** {decision_label(float(row['incremental_revenue']), int(row['insufficient_sample_flag']))}")
+ci_low = float(row.get("incremental_revenue_ci_low", np.nan))
+ci_high = float(row.get("incremental_revenue_ci_high", np.nan))
+st.write(f"**Decision:** {decision_label(float(row['incremental_revenue']), int(row['insufficient_sample_flag']), ci_low, ci_high)}")
 st.write(f"**Incremental Revenue:** {fmt_money(float(row['incremental_revenue']))}")
+if not (np.isnan(ci_low) or np.isnan(ci_high)):
+    st.write(f"**Bootstrap interval:** {fmt_money(ci_low)} to {fmt_money(ci_high)}")
+if "incremental_revenue_cuped" in row.index and not np.isnan(float(row["incremental_revenue_cuped"])):
+    st.write(
+        f"**CUPED-adjusted:** {fmt_money(float(row['incremental_revenue_cuped']))} "
+        f"({fmt_money(float(row['incremental_revenue_cuped_ci_low']))} to "
+        f"{fmt_money(float(row['incremental_revenue_cuped_ci_high']))}; "
+        f"variance reduction {fmt_pct(float(row['cuped_variance_reduction']))})"
+    )
 
 c1, c2, c3, c4 = st.columns(4)
 c1.metric("Exposed N", fmt_num(int(row["exposed_n_customers"])))
@@ -35,6 +47,15 @@ c6.metric("CR holdout", fmt_pct(float(row["holdout_CR"])))
 c7.metric("RPC exposed", fmt_money(float(row["exposed_RPC"])))
 c8.metric("RPC holdout", fmt_money(float(row["holdout_RPC"])))
 
+curves = load_uplift_curves()
+c = curves[curves["campaign_id"] == camp] if not curves.empty else curves
+if not c.empty:
+    st.markdown("### How uplift builds over the attribution window")
+    if int(c["complete_flag"].min()) == 0:
+        st.caption("In flight: later days only include customers whose window has run that long.")
+    st.line_chart(c.set_index("day")[["exposed_RPC", "holdout_RPC"]])
+    st.line_chart(c.set_index("day")[["RPC_uplift"]])
+
 st.markdown("### Customer-level distribution (sanity check)")
 d = out[out["campaign_id"] == camp].copy()
 if d.empty:
@@ -2,8 +2,9 @@ from __future__ import annotations
 
 import streamlit as st
 
-from app.data_access import load_segment_kpis, load_campaign_kpis
+from app.data_access import load_segment_kpis, load_campaign_kpis, load_sufficient_stats, min_group_size
 from app.ui_utils import fmt_pct, fmt_money, fmt_num
+from pipeline.sufficient_stats import STATS_DIMENSIONS, rollup_kpis
 
 st.title("Segment Analysis")
 
@@ -40,3 +41,22 @@ st.dataframe(show, use_container_width=True)
 st.markdown("### Incremental revenue by segment")
 chart = d[["segment_name", "incremental_revenue"]].set_index("segment_name")
 st.bar_chart(chart)
+
+stats = load_sufficient_stats()
+if not stats.empty:
+    st.markdown("### Custom rollup")
+    dims = st.multiselect("Break down by", STATS_DIMENSIONS, default=["region"])
+    r = rollup_kpis(stats[stats["campaign_id"] == sel], ["campaign_id"] + dims, min_group_size())
+    r = r.sort_values("incremental_revenue", ascending=False)
+
+    show = r[dims + [
+        "exposed_n_customers", "holdout_n_customers",
+        "CR_uplift", "RPC_uplift", "incremental_revenue",
+        "incremental_revenue_ci_low", "incremental_revenue_ci_high",
+        "insufficient_sample_flag",
+    ]].copy()
+    show["CR_uplift"] = show["CR_uplift"].map(fmt_pct)
+    for c in ("RPC_uplift", "incremental_revenue", "incremental_revenue_ci_low", "incremental_revenue_ci_high"):
+        show[c] = show[c].map(fmt_money)
+    st.dataframe(show, use_container_width=True)
+    st.caption("Computed from the sufficient-statistics mart; intervals are normal approximations.")
@@ -17,6 +17,11 @@ st.markdown(
 - **RPC uplift = RPC_exposed − RPC_holdout**
 - **Incremental revenue = RPC uplift × exposed customers**
 
+### Uncertainty
+- Uplifts and incremental revenue carry **bootstrap percentile intervals** (customers resampled within exposed and holdout).
+- **CUPED** adjusts uplift with each customer's pre-period revenue / transactions (`cuped.lookback_days`): same expected uplift, lower variance when behaviour persists.
+- Decisions use the interval when present: **scale** if it is entirely above zero, **stop** if entirely below, otherwise **optimize / re-test**.
+
 ### When results are not “causal”
 Treat as **directional** when:
 - Exposed or holdout group sizes are too small
@@ -21,9 +21,21 @@ def fmt_money(x: float) -> str:
     return f"{x:,.2f}"
 
 
-def decision_label(incremental_revenue: float, insufficient_flag: int) -> str:
+def decision_label(
+    incremental_revenue: float,
+    insufficient_flag: int,
+    ci_low: float = np.nan,
+    ci_high: float = np.nan,
+) -> str:
     if insufficient_flag == 1:
         return "INSUFFICIENT EVIDENCE"
+    if not (np.isnan(ci_low) or np.isnan(ci_high)):
+        # Bootstrap interval available: only act when it excludes zero
+        if ci_low > 0:
+            return "SCALE / KEEP"
+        if ci_high < 0:
+            return "STOP / INVESTIGATE"
+        return "OPTIMIZE / RE-TEST"
     if incremental_revenue > 0:
         return "SCALE / KEEP"
     if incremental_revenue < 0:
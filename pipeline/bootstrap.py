@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from pipeline.handoff import pool_context
+
+# Bootstrap confidence intervals for CR uplift, RPC uplift and incremental revenue.
+# Each resample is a row of weights over a campaign group's customers (exposed or holdout):
+# Poisson(1) counts or multinomial counts summing to n. Weighted [1, converted, revenue] totals
+# for all resamples are segmented sums over the customers sorted by segment (np.add.reduceat),
+# taken in resample blocks that bound memory; the campaign cell is the sum over its
+# segments, so one draw serves the campaign and all of its segment cells. Each campaign group
+# draws from its own seed stream keyed by its labels, so intervals do not depend on worker
+# count, run mode or campaign order.
+
+CI_COLUMNS = [
+    f"{metric}_ci_{side}"
+    for metric in ("CR_uplift", "RPC_uplift", "incremental_revenue")
+    for side in ("low", "high")
+]
+
+_BLOCK_CELLS = 4_000_000  # resamples x customers per weight block
+
+
+@dataclass(frozen=True)
+class BootstrapConfig:
+    enabled: bool
+    n_resamples: int
+    confidence: float
+    method: str    # poisson | multinomial
+    workers: int   # 0 = all cores
+    seed: int
+
+    @staticmethod
+    def from_config(cfg: dict) -> "BootstrapConfig":
+        bs = cfg.get("bootstrap", {}) or {}
+        method = str(bs.get("method", "poisson")).lower()
+        if method not in ("poisson", "multinomial"):
+            raise ValueError(f"bootstrap.method must be 'poisson' or 'multinomial', got {method!r}")
+        return BootstrapConfig(
+            enabled=bool(bs.get("enabled", True)),
+            n_resamples=int(bs.get("n_resamples", 1000)),
+            confidence=float(bs.get("confidence", 0.95)),
+            method=method,
+            workers=int(bs.get("workers", 0)) or (os.cpu_count() or 1),
+            seed=int(cfg["project"]["random_seed"]),
+        )
+
+
+def _group_rng(seed: int, labels: Tuple[str, ...]) -> np.random.Generator:
+    digest = hashlib.blake2b("|".join(labels).encode("utf-8"), digest_size=8).digest()
+    key = (int.from_bytes(digest[:4], "little"), int.from_bytes(digest[4:], "little"))
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=key))
+
+
+def _resampled_totals(
+    rng: np.random.Generator,
+    values: np.ndarray,
+    segment: np.ndarray,
+    n_segments: int,
+    n_resamples: int,
+    method: str,
+) -> np.ndarray:
+    """(n_resamples x n_segments x 3) weighted [n, converters, revenue] totals per segment."""
+    n = len(values)
+    totals = np.zeros((n_resamples, n_segments, 3))
+    if n:
+        # Rows in segment order once; each block's weight columns are gathered into the same order
+        # (every customer keeps its own draw) and reduced per segment run: O(resamples x n x 3)
+        order = np.argsort(segment, kind="stable")
+        sorted_values = values[order]
+        counts = np.bincount(segment, minlength=n_segments)
+        present = np.flatnonzero(counts)
+        starts = (np.cumsum(counts) - counts)[present]
+        block = max(1, _BLOCK_CELLS // n)
+        for lo in range(0, n_resamples, block):
+            size = min(block, n_resamples - lo)
+            if method == "poisson":
+                weights = rng.poisson(1.0, size=(size, n)).astype(np.float64)
+            else:
+                weights = rng.multinomial(n, np.full(n, 1.0 / n), size=size).astype(np.float64)
+            weights = weights[:, order]
+            for k in range(3):
+                totals[lo:lo + size, present, k] = np.add.reduceat(weights * sorted_values[:, k], starts, axis=1)
+    return totals
+
+
+def _intervals(exposed: np.ndarray, holdout: np.ndarray, n_exposed: int, confidence: float) -> np.ndarray:
+    """Percentile bounds [CR low, CR high, RPC low, RPC high, incr low, incr high] for one cell."""
+    if n_exposed == 0 or holdout[:, 0].max(initial=0) == 0:
+        return np.full(len(CI_COLUMNS), np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cr = exposed[:, 1] / exposed[:, 0] - holdout[:, 1] / holdout[:, 0]
+        rpc = exposed[:, 2] / exposed[:, 0] - holdout[:, 2] / holdout[:, 0]
+    incr = rpc * n_exposed  # incremental revenue = RPC uplift x observed exposed customers
+
+    tail = (1.0 - confidence) / 2.0
+    bounds = np.nanquantile(np.vstack([cr, rpc, incr]), [tail, 1.0 - tail], axis=1)  # (2 x 3)
+    return bounds.T.reshape(-1)
+
+
+def _campaign_task(
+    seed: int,
+    campaign_id: str,
+    segments: List[str],
+    groups: Dict[str, Tuple[np.ndarray, np.ndarray]],
+    n_resamples: int,
+    method: str,
+    confidence: float,
+) -> List[Tuple[Tuple[str, ...], np.ndarray]]:
+    """Intervals for one campaign and each of its segments (`groups`: exposed/holdout values + segment codes)."""
+    totals, counts = {}, {}
+    for group, (values, segment) in groups.items():
+        rng = _group_rng(seed, (campaign_id, group))
+        totals[group] = _resampled_totals(rng, values, segment, len(segments), n_resamples, method)
+        counts[group] = np.bincount(segment, minlength=len(segments))
+
+    exposed, holdout = totals["exposed"], totals["holdout"]
+    out = [((campaign_id,), _intervals(
+        exposed.sum(axis=1), holdout.sum(axis=1), int(counts["exposed"].sum()), confidence,
+    ))]
+    for k, seg in enumerate(segments):
+        if counts["exposed"][k] or counts["holdout"][k]:
+            out.append(((campaign_id, seg), _intervals(
+                exposed[:, k], holdout[:, k], int(counts["exposed"][k]), confidence,
+            )))
+    return out
+
+
+def bootstrap_intervals(
+    outcomes: pd.DataFrame,
+    config: BootstrapConfig,
+    segment_col: str = "segment_name",
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """(campaign intervals, campaign x segment intervals), keyed like the KPI marts."""
+    tasks = []
+    for cid, g in outcomes.groupby(outcomes["campaign_id"].astype(str), sort=True):
+        codes, segments = pd.factorize(g[segment_col].astype(str), sort=True)
+        values = np.column_stack([
+            np.ones(len(g)),
+            g["converted_flag"].to_numpy(dtype=float),
+            g["revenue_in_window"].to_numpy(dtype=float),
+        ])
+        groups = {}
+        for group, flag in (("exposed", "exposed_flag"), ("holdout", "holdout_flag")):
+            mask = g[flag].to_numpy() == 1
+            groups[group] = (values[mask], codes[mask])
+        tasks.append((config.seed, cid, list(segments), groups, config.n_resamples, config.method, config.confidence))
+
+    if config.workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(config.workers, len(tasks)), mp_context=pool_context()) as executor:
+            results = list(executor.map(_campaign_task, *zip(*tasks)))
+    else:
+        results = [_campaign_task(*task) for task in tasks]
+
+    rows: Dict[int, list] = {1: [], 2: []}
+    for cell_results in results:
+        for labels, bounds in cell_results:
+            rows[len(labels)].append((*labels, *bounds))
+    campaign = pd.DataFrame(rows[1], columns=["campaign_id"] + CI_COLUMNS)
+    segment = pd.DataFrame(rows[2], columns=["campaign_id", "segment_name"] + CI_COLUMNS)
+    return campaign, segment
+
+
+def attach_intervals(kpis: pd.DataFrame, intervals: pd.DataFrame, keys: Sequence[str]) -> pd.DataFrame:
+    """KPI mart with the CI columns appended (NaN for cells without intervals)."""
+    keyed = kpis.assign(**{k: kpis[k].astype(str) for k in keys})
+    return keyed.merge(intervals, on=list(keys), how="left")
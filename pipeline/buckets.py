@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from pipeline.holdout import _GOLDEN, _mix64
+from pipeline.schemas import SCHEMAS, apply_schema
+from pipeline.storage import Storage
+
+# Out-of-core processing: customer-keyed tables are hash-partitioned on customer_id into N
+# bucket directories (<scratch>/bucket-NNNN/<table>/part-*.<ext>), so every customer's
+# eligibility, exposure and transactions land in the same bucket and a bucket can be
+# processed end to end on its own. Inputs are streamed in batches; at most one batch per
+# table plus one bucket is in memory at a time.
+
+# Rough in-memory working set of one bucket per byte on disk (decoded frames, merges and
+# window-join arrays); compressed formats expand more.
+WORKING_SET_FACTOR = {"csv": 4.0, "parquet": 12.0, "arrow": 6.0}
+
+
+@dataclass(frozen=True)
+class OutOfCoreConfig:
+    enabled: bool
+    ram_budget_bytes: int
+    n_buckets: int          # 0 = derive from the budget and input size
+    scratch_dir: Path
+
+    @staticmethod
+    def from_config(project_root: Path, cfg: dict) -> "OutOfCoreConfig":
+        ooc = cfg.get("out_of_core", {}) or {}
+        enabled = bool(ooc.get("enabled", False))
+        if enabled and bool((cfg.get("incremental", {}) or {}).get("enabled", False)):
+            raise ValueError("out_of_core runs full recomputes; disable incremental.enabled or out_of_core.enabled")
+        return OutOfCoreConfig(
+            enabled=enabled,
+            ram_budget_bytes=int(float(ooc.get("ram_budget_mb", 1024)) * (1 << 20)),
+            n_buckets=int(ooc.get("n_buckets", 0)),
+            scratch_dir=project_root / ooc.get("scratch_dir", "data/tmp/buckets"),
+        )
+
+    @property
+    def batch_bytes(self) -> int:
+        # Streaming reads get a small slice of the budget; the rest is for the bucket being processed
+        return max(1 << 20, self.ram_budget_bytes // 16)
+
+    def buckets_for(self, input_bytes: int, fmt: str) -> int:
+        if self.n_buckets > 0:
+            return self.n_buckets
+        working_set = input_bytes * WORKING_SET_FACTOR.get(fmt, 4.0)
+        return max(1, math.ceil(working_set / max(1, self.ram_budget_bytes // 2)))
+
+
+def customer_bucket(customer_id, n_buckets: int) -> np.ndarray:
+    """Bucket 0..n_buckets-1 per customer_id (splitmix64 of the id, stable across runs)."""
+    cust = np.asarray(customer_id).astype(np.int64).astype(np.uint64)
+    return (_mix64(cust * _GOLDEN) % np.uint64(n_buckets)).astype(np.int64)
+
+
+def bucket_dir(scratch_dir: Path, bucket: int) -> Path:
+    return scratch_dir / f"bucket-{bucket:04d}"
+
+
+def scatter(
+    storage: Storage,
+    directory: Path,
+    name: str,
+    scratch_dir: Path,
+    n_buckets: int,
+    batch_bytes: int,
+    columns: Optional[Sequence[str]] = None,
+    row_col: Optional[str] = None,
+) -> int:
+    """Hash-partition one dataset into bucket directories, streaming it batch by batch.
+
+    Rows keep their relative order inside each bucket; `row_col` adds the global row number
+    so bucket results can be merged back into input order. Returns the number of rows.
+    """
+    scratch = replace(storage, csv_export=False)
+    for b in range(n_buckets):
+        (bucket_dir(scratch_dir, b) / name).mkdir(parents=True, exist_ok=True)
+
+    n_rows = 0
+    for part, batch in enumerate(storage.iter_batches(directory, name, columns, batch_bytes=batch_bytes)):
+        if batch.empty:
+            continue
+        if row_col is not None:
+            batch[row_col] = np.arange(n_rows, n_rows + len(batch), dtype=np.int64)
+        n_rows += len(batch)
+
+        buckets = customer_bucket(batch["customer_id"].to_numpy(), n_buckets)
+        order = np.argsort(buckets, kind="stable")
+        bounds = np.searchsorted(buckets[order], np.arange(n_buckets + 1))
+        for b in range(n_buckets):
+            lo, hi = bounds[b], bounds[b + 1]
+            if hi > lo:
+                rows = batch.iloc[order[lo:hi]].reset_index(drop=True)
+                scratch.write(rows, bucket_dir(scratch_dir, b) / name, f"part-{part:05d}", table=name)
+    return n_rows
+
+
+def read_bucket(
+    storage: Storage,
+    scratch_dir: Path,
+    bucket: int,
+    name: str,
+    columns: Optional[Sequence[str]] = None,
+) -> pd.DataFrame:
+    """One table of one bucket (a typed zero-row frame if no rows hashed to it)."""
+    directory = bucket_dir(scratch_dir, bucket)
+    if storage.exists(directory, name):
+        return storage.read(directory, name)
+    columns = list(columns or SCHEMAS[name].columns)
+    return apply_schema(pd.DataFrame({c: [] for c in columns}), name)
+
+
+def merge_sorted(sources: List[Iterator[pd.DataFrame]], key: str) -> Iterator[pd.DataFrame]:
+    """K-way merge of batch streams that are each sorted on `key` (keys never tie across sources).
+
+    Rows up to the smallest last key among the current batches are final (no source can still
+    produce a smaller one); they are emitted and the exhausted batches refilled.
+    """
+    heads: Dict[int, pd.DataFrame] = {}
+
+    def refill(i: int) -> None:
+        for batch in sources[i]:
+            if not batch.empty:
+                heads[i] = batch
+                return
+        heads.pop(i, None)
+
+    for i in range(len(sources)):
+        refill(i)
+
+    while heads:
+        bound = min(df[key].iat[-1] for df in heads.values())
+        ready = []
+        for i in sorted(heads):
+            df = heads[i]
+            n = int(np.searchsorted(df[key].to_numpy(), bound, side="right"))
+            if n:
+                ready.append(df.iloc[:n])
+            if n == len(df):
+                refill(i)
+            else:
+                heads[i] = df.iloc[n:]
+        yield pd.concat(ready, ignore_index=True).sort_values(key, kind="stable", ignore_index=True)
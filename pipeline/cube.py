@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from itertools import combinations
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from pipeline.sufficient_stats import rollup_kpis, sufficient_stats
+
+# KPI cube: exposed/holdout KPIs and uplift per campaign for every grouping set of a dimension
+# list (all subsets for "cube", list prefixes for "rollup"). The outcomes are aggregated once,
+# to additive sufficient statistics at the finest grain (campaign x group x all dimensions);
+# each grouping set is then a rollup of that small table. Rolled-up dimensions hold ALL and
+# grouping_id has bit i set when dimension i is rolled up (as SQL GROUPING_ID), so any slice
+# is a filter on grouping_id plus the dimension values.
+
+ALL = "(all)"
+CUSTOMER_DIMENSIONS = ("channel_pref", "tenure_band")  # joined from dim_customers
+
+
+@dataclass(frozen=True)
+class CubeConfig:
+    dimensions: Tuple[str, ...]
+    grouping: str                     # cube | rollup
+    tenure_bands_days: Tuple[int, ...]
+
+    @staticmethod
+    def from_config(cfg: dict) -> "CubeConfig":
+        cube = cfg.get("cube", {}) or {}
+        grouping = str(cube.get("grouping", "cube")).lower()
+        if grouping not in ("cube", "rollup"):
+            raise ValueError(f"cube.grouping must be 'cube' or 'rollup', got {grouping!r}")
+        return CubeConfig(
+            dimensions=tuple(cube.get("dimensions", ["lifecycle", "loyalty_tier", "region"])),
+            grouping=grouping,
+            tenure_bands_days=tuple(sorted(int(d) for d in cube.get("tenure_bands_days", [90, 365, 730]))),
+        )
+
+    def grouping_sets(self) -> List[Tuple[str, ...]]:
+        """Dimension subsets to aggregate, finest first."""
+        dims = self.dimensions
+        if self.grouping == "rollup":
+            return [dims[:k] for k in range(len(dims), -1, -1)]
+        return [s for k in range(len(dims), -1, -1) for s in combinations(dims, k)]
+
+
+def tenure_band(tenure_days: pd.Series, edges: Sequence[int]) -> pd.Series:
+    """Tenure bands '0-89d', '90-364d', ..., '730d+' from band edges in days."""
+    bounds = [0] + list(edges)
+    labels = [f"{lo}-{hi - 1}d" for lo, hi in zip(bounds[:-1], bounds[1:])] + [f"{bounds[-1]}d+"]
+    codes = np.searchsorted(np.asarray(edges), tenure_days.to_numpy(), side="right")
+    return pd.Series(pd.Categorical.from_codes(codes, categories=labels), index=tenure_days.index)
+
+
+def build_cube(outcomes: pd.DataFrame, config: CubeConfig, min_group: int, confidence: float = 0.95) -> pd.DataFrame:
+    """One row per campaign x grouping set x dimension values, ordered by grouping_id, campaign, values."""
+    dims = list(config.dimensions)
+    stats = sufficient_stats(outcomes, dims)
+    for d in dims:
+        stats[d] = stats[d].astype(str)
+
+    blocks = []
+    for dset in config.grouping_sets():
+        kpis = rollup_kpis(stats, ["campaign_id"] + list(dset), min_group, confidence)
+        grouping_id = sum(1 << i for i, d in enumerate(dims) if d not in dset)
+        kpis = kpis.assign(**{d: ALL for d in dims if d not in dset}, grouping_id=grouping_id)
+        blocks.append(kpis)
+
+    cube = pd.concat(blocks, ignore_index=True)
+    front = ["campaign_id"] + dims + ["grouping_id"]
+    cube = cube[front + [c for c in cube.columns if c not in front]]
+    return cube.sort_values(["grouping_id", "campaign_id"] + dims, kind="stable", ignore_index=True)
+
+
+def cube_lookup(cube: pd.DataFrame, campaign_id: Optional[str] = None, **values: str) -> pd.DataFrame:
+    """Rows of the grouping set made of exactly the given dimensions (filtered to their values).
+
+    A value of None keeps every member of that dimension, e.g. cube_lookup(cube, "C001",
+    region=None) gives C001 by region, cube_lookup(cube, region="North", lifecycle="Active")
+    one row per campaign.
+    """
+    dims = [c for c in cube.columns[1:cube.columns.get_loc("grouping_id")]]
+    unknown = set(values) - set(dims)
+    if unknown:
+        raise KeyError(f"Not cube dimensions: {sorted(unknown)} (cube has {dims})")
+    grouping_id = sum(1 << i for i, d in enumerate(dims) if d not in values)
+    mask = cube["grouping_id"].to_numpy() == grouping_id
+    if campaign_id is not None:
+        mask &= cube["campaign_id"].astype(str).to_numpy() == str(campaign_id)
+    for d, v in values.items():
+        if v is not None:
+            mask &= cube[d].astype(str).to_numpy() == str(v)
+    return cube.loc[mask].reset_index(drop=True)
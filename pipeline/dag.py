@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import ast
+import hashlib
+import importlib
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import pandas as pd
+
+from pipeline import profiling
+from pipeline.handoff import BackgroundWriter
+from pipeline.storage import Storage
+
+# Stage cache and DAG runner for scripts/run_all.py. Each stage declares the datasets it reads
+# and writes, the config sections (or dotted keys) it depends on and a version string; its code
+# is the script plus every pipeline module it imports, followed transitively. A stage's key is a
+# hash of all of that, where a dataset produced by another stage stands for that stage's key
+# (its lineage) and any other input for its file contents. When the key matches the last
+# successful run and the outputs are still the files that run wrote, the stage is skipped.
+# Stages run in this process: DataFrames are handed from stage to stage in memory and persisted
+# on a background writer thread, and stages whose inputs are ready run on parallel threads.
+
+Dataset = Tuple[str, str]  # (directory key: raw | processed | marts, dataset name)
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    module: str                      # importable module with a main(), e.g. scripts.02_compute_kpis
+    inputs: Tuple[Dataset, ...]
+    outputs: Tuple[Dataset, ...]
+    config: Tuple[str, ...]          # settings sections / dotted keys the stage reads
+    version: str = "1"               # bump to force a rerun without a code or input change
+
+
+@dataclass(frozen=True)
+class RunnerConfig:
+    jobs: int
+    cache_file: Path
+    manifest_dir: Path
+
+    @staticmethod
+    def from_config(project_root: Path, cfg: dict) -> "RunnerConfig":
+        runner = cfg.get("runner", {}) or {}
+        return RunnerConfig(
+            jobs=int(runner.get("jobs", 0)) or (os.cpu_count() or 1),
+            cache_file=project_root / runner.get("cache_file", "data/.stage_cache.json"),
+            manifest_dir=project_root / runner.get("manifest_dir", "data/runs"),
+        )
+
+
+def _config_value(cfg: dict, key: str):
+    value = cfg
+    for part in key.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def _code_files(project_root: Path, module: str) -> List[Path]:
+    """The module's file plus the pipeline modules it imports, transitively."""
+    seen: Set[Path] = set()
+    pending = [project_root / Path(*module.split(".")).with_suffix(".py")]
+    while pending:
+        path = pending.pop()
+        if path in seen or not path.exists():
+            continue
+        seen.add(path)
+        for node in ast.walk(ast.parse(path.read_text(encoding="utf-8"))):
+            names = []
+            if isinstance(node, ast.ImportFrom) and node.module:
+                names = [node.module]
+            elif isinstance(node, ast.Import):
+                names = [a.name for a in node.names]
+            for name in names:
+                if name == "pipeline" or name.startswith("pipeline."):
+                    pending.append(project_root / Path(*name.split(".")).with_suffix(".py"))
+    return sorted(seen)
+
+
+class StageCache:
+    """Last successful key and output fingerprints per stage, plus file digests by (size, mtime)."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        state = json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+        self.stages: Dict[str, dict] = state.get("stages", {})
+        self.digests: Dict[str, list] = state.get("digests", {})
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"stages": self.stages, "digests": self.digests}, indent=1), encoding="utf-8")
+        tmp.replace(self.path)
+
+    def file_digest(self, path: Path) -> str:
+        st = path.stat()
+        cached = self.digests.get(str(path))
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2]
+        h = hashlib.blake2b(digest_size=16)
+        with path.open("rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        self.digests[str(path)] = [st.st_size, st.st_mtime_ns, h.hexdigest()]
+        return h.hexdigest()
+
+
+class DagRunner:
+    def __init__(self, project_root: Path, cfg: dict, dirs: Dict[str, Path], storage: Storage, stages: Sequence[Stage]):
+        self.project_root = project_root
+        self.cfg = cfg
+        self.dirs = dirs
+        self.storage = storage
+        self.stages = {s.name: s for s in stages}
+        self.produced = {out: s.name for s in stages for out in s.outputs}
+        self.deps = {s.name: sorted({self.produced[i] for i in s.inputs if i in self.produced} - {s.name})
+                     for s in stages}
+
+    def _files(self, dataset: Dataset) -> Optional[List[Path]]:
+        """The dataset's single file and/or its partition files (part-* or per-campaign); None if missing."""
+        directory, name = self.dirs[dataset[0]], dataset[1]
+        single = self.storage.path(directory, name)
+        files = [single] if single.exists() else []
+        part_dir = directory / name
+        if part_dir.is_dir():
+            files += sorted(part_dir.rglob(f"*{self.storage.ext}"))
+        return files or None
+
+    def _key(self, stage: Stage, cache: StageCache, keys: Dict[str, str]) -> Optional[str]:
+        h = hashlib.blake2b(digest_size=16)
+        h.update(f"{stage.name}|{stage.module}|{stage.version}".encode())
+        for path in _code_files(self.project_root, stage.module):
+            h.update(f"|code:{path.relative_to(self.project_root)}:{cache.file_digest(path)}".encode())
+        for key in stage.config:
+            h.update(f"|cfg:{key}={json.dumps(_config_value(self.cfg, key), sort_keys=True, default=str)}".encode())
+        for dataset in stage.inputs:
+            producer = self.produced.get(dataset)
+            if producer is not None:
+                h.update(f"|in:{dataset[0]}/{dataset[1]}<-{producer}:{keys[producer]}".encode())
+                continue
+            files = self._files(dataset)
+            if files is None:
+                return None  # input missing: cannot be cached, must run (and fail loudly if still missing)
+            for path in files:
+                h.update(f"|in:{path.relative_to(self.project_root)}:{cache.file_digest(path)}".encode())
+        return h.hexdigest()
+
+    def _fingerprint(self, stage: Stage) -> Optional[List[list]]:
+        out = []
+        for dataset in stage.outputs:
+            files = self._files(dataset)
+            if files is None:
+                return None
+            for path in files:
+                st = path.stat()
+                out.append([str(path.relative_to(self.project_root)), st.st_size, st.st_mtime_ns])
+        return out
+
+    def run(
+        self,
+        cache_file: Path,
+        jobs: int = 1,
+        force: bool = False,
+        profile: Sequence[str] = (),
+        profiler: str = "cprofile",
+        profile_prefix: Optional[Path] = None,
+    ) -> Dict[str, str]:
+        """Run every stage whose key changed (all with force); returns stage -> ran | cached.
+
+        Stages in `profile` run under `profiler`, dumped to <profile_prefix>-<stage>.prof / .html.
+        `self.status`, `self.keys` and `self.records` (profiling.StepRecord per stage run) stay readable
+        after a failure, for the run manifest.
+        """
+        cache = StageCache(cache_file)
+        self.status: Dict[str, str] = {}
+        self.keys: Dict[str, str] = {}
+        self.records: Dict[str, profiling.StepRecord] = {}
+        status = self.status
+        keys = self.keys
+        frames: Dict[str, pd.DataFrame] = {}
+        finished: List[str] = []
+        running: Dict[Future, str] = {}
+        writer = BackgroundWriter(self.storage)
+        pool = ThreadPoolExecutor(max_workers=jobs) if jobs > 1 else None
+
+        def launch(name: str) -> Dict[str, pd.DataFrame]:
+            dump = None
+            if name in profile:
+                dump = Path(f"{profile_prefix or self.project_root / 'profile'}-{name}")
+            with profiling.stage(name) as rec, profiling.profiled(profiler if dump else None, dump or Path()):
+                self.records[name] = rec
+                # Frames are read-only to stages (Handoff.read copies), so a snapshot is enough
+                return importlib.import_module(self.stages[name].module).main(dict(frames), writer) or {}
+
+        def finish(name: str, outputs: Dict[str, pd.DataFrame]) -> None:
+            frames.update(outputs)
+            status[name] = "ran"
+            finished.append(name)
+            rec = self.records[name]
+            rss = "" if rec.peak_rss is None else f", peak RSS {rec.peak_rss / 2**20:.0f} MB"
+            print(f"✅ {name} finished in {rec.wall_s:.2f}s (CPU {rec.cpu_s:.2f}s{rss})")
+
+        try:
+            while len(status) < len(self.stages):
+                ready = [
+                    n for n in self.stages
+                    if n not in status and n not in running.values() and all(d in status for d in self.deps[n])
+                ]
+                for name in ready:
+                    stage = self.stages[name]
+                    keys[name] = self._key(stage, cache, keys) or ""
+                    entry = cache.stages.get(name, {})
+                    if not force and keys[name] and entry.get("key") == keys[name] \
+                            and entry.get("outputs") == self._fingerprint(stage):
+                        status[name] = "cached"
+                        print(f"⏭️  {name}: inputs, config and code unchanged (cached)")
+                        continue
+                    print(f"▶️  {name}")
+                    if pool is None:
+                        try:
+                            finish(name, launch(name))
+                        except BaseException:
+                            status[name] = "failed"
+                            raise
+                    else:
+                        running[pool.submit(launch, name)] = name
+                if not running:
+                    continue
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for fut in done:
+                    name = running.pop(fut)
+                    if fut.exception() is not None:
+                        status[name] = "failed"
+                        raise fut.exception()
+                    finish(name, fut.result())
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+            # Outputs are fingerprinted once on disk; a failed write leaves its stage unrecorded
+            writer.close()
+            for name in finished:
+                cache.stages[name] = {
+                    "key": keys[name] or self._key(self.stages[name], cache, keys),
+                    "outputs": self._fingerprint(self.stages[name]),
+                    "seconds": round(self.records[name].wall_s, 3),
+                }
+            cache.save()
+        return status
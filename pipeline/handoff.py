@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import multiprocessing
+import queue
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from pipeline import profiling
+from pipeline.schemas import apply_schema
+from pipeline.storage import Storage
+
+# In-memory handoff between stages. Run standalone, a script reads its inputs from disk and writes
+# its outputs synchronously, exactly as before. Run from run_all.py, each main() receives the frames
+# earlier stages produced and returns its own: reads of those datasets are served from memory (cast
+# to the registered schema, so they look like a disk read) and writes go to a background thread, so
+# serializing a dataset and parsing it back are off the critical path. Files on disk are the same.
+
+
+def pool_context():
+    """Process-pool start method: fork unless other threads are running (the background writer or
+    parallel stages under run_all), since forking while another thread holds a lock can deadlock."""
+    return multiprocessing.get_context("forkserver" if threading.active_count() > 1 else None)
+
+
+class BackgroundWriter:
+    """Writes datasets on one daemon thread, in submission order; errors surface on wait/close."""
+
+    def __init__(self, storage: Storage):
+        self.storage = storage
+        self._queue: "queue.Queue[Optional[Tuple[pd.DataFrame, Path, str, Optional[str], Any]]]" = queue.Queue()
+        self._pending: Dict[Path, int] = {}
+        self._lock = threading.Condition()
+        self._errors: List[BaseException] = []
+        self._thread = threading.Thread(target=self._run, name="dataset-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            df, directory, name, table, stage = item
+            try:
+                if not self._errors:
+                    with profiling.detached_step(stage, f"write:{name}", rows_out=len(df)):
+                        self.storage.write(df, directory, name, table=table)
+            except BaseException as exc:  # re-raised on the caller's thread
+                self._errors.append(exc)
+            finally:
+                path = self.storage.path(directory, name)
+                with self._lock:
+                    self._pending[path] -= 1
+                    if not self._pending[path]:
+                        del self._pending[path]
+                    self._lock.notify_all()
+
+    def submit(self, df: pd.DataFrame, directory: Path, name: str, table: Optional[str] = None) -> Path:
+        path = self.storage.path(directory, name)
+        with self._lock:
+            self._pending[path] = self._pending.get(path, 0) + 1
+        self._queue.put((df, directory, name, table, profiling.root()))
+        return path
+
+    def wait(self, paths: Optional[Sequence[Path]] = None) -> None:
+        """Block until `paths` (default: everything submitted) are on disk."""
+        with self._lock:
+            self._lock.wait_for(lambda: not (set(paths) & set(self._pending) if paths is not None else self._pending))
+        if self._errors:
+            raise self._errors[0]
+
+    def close(self) -> None:
+        self.wait()
+        self._queue.put(None)
+        self._thread.join()
+
+
+class Handoff:
+    """Storage-like read/write for one stage: in-memory frames first, background writes when orchestrated.
+
+    `frames` are datasets handed over by earlier stages (by name); `outputs` collects what this stage
+    wrote, for main() to return. Without a writer, writes are synchronous and nothing is retained.
+    """
+
+    def __init__(self, storage: Storage, frames: Optional[Dict[str, pd.DataFrame]] = None,
+                 writer: Optional[BackgroundWriter] = None):
+        self.storage = storage
+        self.frames = frames or {}
+        self.writer = writer
+        self.outputs: Dict[str, pd.DataFrame] = {}
+
+    def read(self, directory: Path, name: str, columns: Optional[Sequence[str]] = None,
+             table: Optional[str] = None) -> pd.DataFrame:
+        with profiling.step(f"read:{name}") as rec:
+            df = self.frames.get(name)
+            if df is None:
+                self.flush([self.storage.path(directory, name)])
+                df = self.storage.read(directory, name, columns=columns, table=table)
+            else:
+                # Projection copies (file column order, absent columns skipped) so a stage never mutates its input
+                cols = list(df.columns) if columns is None else [c for c in df.columns if c in columns]
+                df = apply_schema(df.reindex(columns=cols), table or name)
+        profiling.add_rows(rows_in=len(df))
+        if rec is not None:
+            rec.rows_in = len(df)  # the read step itself reports rows_in, not a nested total
+        return df
+
+    def write(self, df: pd.DataFrame, directory: Path, name: str, table: Optional[str] = None) -> Path:
+        profiling.add_rows(rows_out=len(df))
+        if self.writer is None:
+            with profiling.step(f"write:{name}") as rec:
+                if rec is not None:
+                    rec.rows_out = len(df)
+                return self.storage.write(df, directory, name, table=table)
+        self.outputs[name] = df
+        return self.writer.submit(df, directory, name, table=table)
+
+    def flush(self, paths: Optional[Sequence[Path]] = None) -> None:
+        """Wait for background writes, before a code path that reads files directly (SQL, out-of-core)."""
+        if self.writer is not None:
+            self.writer.wait(paths)
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import hashlib
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+# Holdout membership is a pure function of (salt, campaign_id, customer_id, holdout_pct):
+# the generator, 01_prepare_outcomes and a send-time service all get the same answer
+# without storing or joining the exposure table.
+
+ArrayLike = Union[np.ndarray, pd.Series, list]
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+
+
+def _campaign_key(campaign_id: str, salt: str) -> int:
+    digest = hashlib.blake2b(f"{salt}|{campaign_id}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def _mix64(x: np.ndarray) -> np.ndarray:
+    # splitmix64 finalizer; uint64 array arithmetic wraps modulo 2**64.
+    x = (x ^ (x >> np.uint64(30))) * _MIX_1
+    x = (x ^ (x >> np.uint64(27))) * _MIX_2
+    return x ^ (x >> np.uint64(31))
+
+
+def holdout_score(campaign_id: ArrayLike, customer_id: ArrayLike, salt: str) -> np.ndarray:
+    """Uniform [0, 1) score per (campaign_id, customer_id) pair; one vectorized call for any size."""
+    codes, uniques = pd.factorize(pd.Series(np.asarray(campaign_id), dtype=object).astype(str))
+    keys = np.array([_campaign_key(c, salt) for c in uniques], dtype=np.uint64)
+
+    cust = np.asarray(customer_id).astype(np.int64).astype(np.uint64)
+    h = _mix64(keys[codes] ^ _mix64(cust * _GOLDEN))
+    return (h >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+
+
+def assign_holdout(
+    campaign_id: ArrayLike,
+    customer_id: ArrayLike,
+    holdout_pct: Union[float, ArrayLike],
+    salt: str,
+) -> np.ndarray:
+    """control_flag (0/1) per pair; holdout_pct may be a scalar or one value per pair."""
+    score = holdout_score(campaign_id, customer_id, salt)
+    return (score < np.asarray(holdout_pct, dtype=float)).astype(int)
+
+
+def is_holdout(campaign_id: str, customer_id: int, holdout_pct: float, salt: str) -> bool:
+    """Send-time check for a single customer (O(1), same result as assign_holdout)."""
+    return bool(assign_holdout([campaign_id], [customer_id], holdout_pct, salt)[0])
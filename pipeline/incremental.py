@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import json
+from dataclasses import replace
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from pipeline.schemas import concat_typed
+from pipeline.storage import Storage
+
+# Campaign-partitioned datasets plus a JSON state file of input signatures per partition.
+# A stage compares current signatures with the stored ones and recomputes only the
+# partitions that differ; marts are then reassembled by concatenating partition files
+# (in the configured storage format).
+
+_DAY_NS = 86_400 * 10**9
+
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    return pd.util.hash_pandas_object(df, index=False).to_numpy(dtype=np.uint64)
+
+
+def _digest(count: int, total: np.uint64) -> str:
+    return f"{int(count)}:{int(total):016x}"
+
+
+def frame_digest(df: pd.DataFrame) -> str:
+    """Order-independent content digest (row count + wrapped sum of row hashes)."""
+    return _digest(len(df), np.sum(row_hashes(df), dtype=np.uint64))
+
+
+def group_digests(keys: pd.Series, df: pd.DataFrame) -> Dict[str, str]:
+    """frame_digest of each group of rows, keyed by str(key); one hashing pass over df."""
+    if df.empty:
+        return {}
+    codes, uniques = pd.factorize(keys, sort=True)
+    order = np.argsort(codes, kind="stable")
+    hashes = row_hashes(df)[order]
+    starts = np.flatnonzero(np.r_[True, np.diff(codes[order]) != 0])
+    sums = np.add.reduceat(hashes, starts)
+    counts = np.diff(np.r_[starts, len(hashes)])
+    return {str(k): _digest(c, s) for k, c, s in zip(uniques, counts, sums)}
+
+
+class DailyDigest:
+    """Per-day transaction digests with prefix sums, so any day range is digested in O(log days)."""
+
+    def __init__(self, txn_ts: pd.Series, df: pd.DataFrame):
+        day = pd.to_datetime(txn_ts).to_numpy(dtype="datetime64[ns]").view(np.int64) // _DAY_NS
+        order = np.argsort(day, kind="stable")
+        day = day[order]
+        hashes = row_hashes(df)[order]
+        self.days, starts = np.unique(day, return_index=True)
+        self.cum_count = np.r_[0, np.cumsum(np.diff(np.r_[starts, len(day)]))]
+        self.cum_hash = np.r_[np.uint64(0), np.cumsum(np.add.reduceat(hashes, starts) if len(starts) else hashes, dtype=np.uint64)]
+
+    def range_digest(self, start: pd.Timestamp, end: pd.Timestamp) -> str:
+        # Whole days touching [start, end): conservative, a same-day late arrival also marks dirty.
+        first = pd.Timestamp(start).value // _DAY_NS
+        last = (pd.Timestamp(end).value - 1) // _DAY_NS
+        lo = int(np.searchsorted(self.days, first, side="left"))
+        hi = int(np.searchsorted(self.days, last, side="right"))
+        # Array (not scalar) subtraction so uint64 wrap-around does not warn.
+        total = (self.cum_hash[hi:hi + 1] - self.cum_hash[lo:lo + 1])[0]
+        return _digest(self.cum_count[hi] - self.cum_count[lo], total)
+
+
+def load_state(path: Path) -> dict:
+    if not path.exists():
+        return {}
+    with path.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_state(path: Path, state: dict) -> None:
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    tmp.replace(path)
+
+
+def dirty_keys(current: Dict[str, dict], stored: Dict[str, dict], storage: Storage, part_dir: Path) -> List[str]:
+    """Keys whose signature changed or whose partition file is missing."""
+    return sorted(
+        k for k, sig in current.items()
+        if stored.get(k) != sig or not storage.path(part_dir, k).exists()
+    )
+
+
+def write_partitions(
+    df: pd.DataFrame,
+    storage: Storage,
+    part_dir: Path,
+    key_col: str,
+    keys: Iterable[str],
+    table: str,
+) -> None:
+    """Write one file per key (an empty one for keys without rows); csv_export applies to the
+    reassembled mart only."""
+    part_dir.mkdir(parents=True, exist_ok=True)
+    storage = replace(storage, csv_export=False)
+    groups = dict(tuple(df.groupby(key_col, sort=False, observed=True))) if not df.empty else {}
+    for key in keys:
+        storage.write(groups.get(key, df.iloc[0:0]), part_dir, key, table=table)
+
+
+def drop_stale_partitions(storage: Storage, part_dir: Path, keep: Iterable[str]) -> None:
+    keep = set(keep)
+    if part_dir.is_dir():
+        for p in part_dir.glob(f"*{storage.ext}"):
+            if p.stem not in keep:
+                p.unlink()
+
+
+def read_partitions(
+    storage: Storage,
+    part_dir: Path,
+    keys: Iterable[str],
+    table: str,
+    columns: Optional[Sequence[str]] = None,
+) -> pd.DataFrame:
+    frames = [storage.read_file(storage.path(part_dir, k), table, columns) for k in keys]
+    return concat_typed(frames, table) if frames else pd.DataFrame()
+
+
+def concat_partitions(storage: Storage, part_dir: Path, keys: Iterable[str], directory: Path, name: str) -> Path:
+    """Reassemble a mart from its partitions (byte copy for CSV, Arrow concat otherwise)."""
+    return storage.concat([storage.path(part_dir, k) for k in keys], directory, name, table=name)
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from pipeline.window_join import _NAT, _as_ns
+
+# Campaign overlap / interference: a (campaign, customer) pair is overlapped when the
+# customer's attribution window for another campaign intersects its own [anchor, window_end).
+# Intervals are sorted once by (customer_id, start); interval i can only overlap later
+# intervals i+1, i+2, ... of the same customer that start before it ends, so the sweep
+# compares all intervals with their k-th successor in one vectorized step per k and stops
+# as soon as no interval has a qualifying successor. Cost is O(n log n + n * max_concurrent).
+
+
+@dataclass(frozen=True)
+class OverlapIndex:
+    campaign_ids: np.ndarray  # campaign labels, ascending (code -> label)
+    campaign: np.ndarray      # per input row: campaign code
+    overlapped: np.ndarray    # per input row: window intersects another campaign's window
+    pair_a: np.ndarray        # per (customer, campaign pair): lower campaign code
+    pair_b: np.ndarray        # per (customer, campaign pair): higher campaign code
+
+    @staticmethod
+    def build(campaign_id, customer_id, window_start, window_end) -> "OverlapIndex":
+        codes, labels = pd.factorize(pd.Series(np.asarray(campaign_id)).astype(str), sort=True)
+        cust = np.asarray(customer_id, dtype=np.int64)
+        start = _as_ns(window_start)
+        end = _as_ns(window_end)
+
+        valid = (start != _NAT) & (end != _NAT) & (end > start)
+        order = np.lexsort((start, cust))
+        order = order[valid[order]]
+        c, s, e, k_code = cust[order], start[order], end[order], codes[order]
+
+        hit_sorted = np.zeros(len(order), dtype=bool)
+        pairs_i, pairs_j = [], []
+        active = np.arange(max(len(order) - 1, 0))
+        step = 1
+        while active.size:
+            succ = active + step
+            in_bounds = succ < len(order)
+            active, succ = active[in_bounds], succ[in_bounds]
+            concurrent = (c[succ] == c[active]) & (s[succ] < e[active])
+            active, succ = active[concurrent], succ[concurrent]
+
+            other = k_code[active] != k_code[succ]
+            hit_sorted[active[other]] = True
+            hit_sorted[succ[other]] = True
+            pairs_i.append(active[other])
+            pairs_j.append(succ[other])
+            step += 1
+
+        overlapped = np.zeros(len(cust), dtype=bool)
+        overlapped[order] = hit_sorted
+
+        i = np.concatenate(pairs_i) if pairs_i else np.empty(0, dtype=np.int64)
+        j = np.concatenate(pairs_j) if pairs_j else np.empty(0, dtype=np.int64)
+        pairs = pd.DataFrame({
+            "customer_id": c[i],
+            "a": np.minimum(k_code[i], k_code[j]),
+            "b": np.maximum(k_code[i], k_code[j]),
+        }).drop_duplicates()
+
+        return OverlapIndex(
+            np.asarray(labels, dtype=object), codes, overlapped,
+            pairs["a"].to_numpy(np.int64), pairs["b"].to_numpy(np.int64),
+        )
+
+    def campaign_rates(self, threshold: float) -> pd.DataFrame:
+        """Per campaign: customers, customers overlapped by another campaign, rate and flag."""
+        n_campaigns = len(self.campaign_ids)
+        n = np.bincount(self.campaign, minlength=n_campaigns)
+        hit = np.bincount(self.campaign, weights=self.overlapped, minlength=n_campaigns).astype(np.int64)
+        rate = np.divide(hit, n, out=np.zeros(n_campaigns), where=n > 0)
+        return pd.DataFrame({
+            "campaign_id": self.campaign_ids,
+            "n_customers": n,
+            "overlapped_customers": hit,
+            "overlap_rate": rate,
+            "overlap_flag": (rate > threshold).astype(int),
+        })
+
+    def segment_rates(self, segment) -> pd.DataFrame:
+        """Per campaign x segment (one segment label per input row): customers, overlapped, rate."""
+        df = pd.DataFrame({
+            "campaign_id": self.campaign_ids[self.campaign],
+            "segment_name": np.asarray(segment, dtype=object),
+            "overlapped": self.overlapped.astype(np.int64),
+        })
+        out = df.groupby(["campaign_id", "segment_name"], sort=True).agg(
+            n_customers=("overlapped", "size"),
+            overlapped_customers=("overlapped", "sum"),
+        ).reset_index()
+        out["overlap_rate"] = out["overlapped_customers"] / out["n_customers"]
+        return out
+
+    def pair_matrix(self) -> pd.DataFrame:
+        """Pairwise overlap in long form: customers of campaign_id whose window intersects one of
+        other_campaign_id's, and that count as a share of campaign_id's customers (both directions)."""
+        n_campaigns = len(self.campaign_ids)
+        counts = np.bincount(self.pair_a * n_campaigns + self.pair_b, minlength=n_campaigns * n_campaigns)
+        matrix = counts.reshape(n_campaigns, n_campaigns)
+        matrix = matrix + matrix.T
+
+        a, b = np.nonzero(matrix)
+        n = np.bincount(self.campaign, minlength=n_campaigns)
+        return pd.DataFrame({
+            "campaign_id": self.campaign_ids[a],
+            "other_campaign_id": self.campaign_ids[b],
+            "overlap_customers": matrix[a, b],
+            "overlap_share": matrix[a, b] / np.maximum(n[a], 1),
+        })
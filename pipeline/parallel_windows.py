@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import fields
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from pipeline.handoff import pool_context
+from pipeline.window_join import TransactionIndex, _as_ns
+
+# Per-pair window outcomes (attribution window, fixed horizons, pre-period lookbacks) from a
+# TransactionIndex, optionally spread over a process pool one campaign per task. The index is
+# built once in the parent and its arrays are saved as .npy files that every worker memory-maps
+# read-only, so the transactions are shared through the page cache rather than pickled to each
+# process. Each task returns its campaign's columns, which are scattered back to the pairs' row
+# positions: the result is identical to the serial path for any worker count or completion order.
+
+Totals = Tuple[np.ndarray, np.ndarray]
+WindowOutcomes = Tuple[np.ndarray, np.ndarray, Dict[int, Totals], Dict[int, Totals]]
+
+_worker_index: Optional[TransactionIndex] = None
+
+
+def window_outcomes(
+    index: TransactionIndex,
+    customer_id: np.ndarray,
+    window_start: np.ndarray,
+    window_end: np.ndarray,
+    windows: Sequence[int] = (),
+    lookbacks: Sequence[int] = (),
+) -> WindowOutcomes:
+    """(revenue, txn_count) per window, plus horizon and lookback totals keyed by days."""
+    revenue, txn_count = index.window_totals(customer_id, window_start, window_end)
+    return (
+        revenue,
+        txn_count,
+        index.horizon_totals(customer_id, window_start, windows),
+        index.lookback_totals(customer_id, window_start, lookbacks),
+    )
+
+
+def _save_index(index: TransactionIndex, directory: Path) -> None:
+    for f in fields(TransactionIndex):
+        value = getattr(index, f.name)
+        if isinstance(value, np.ndarray):
+            np.save(directory / f"{f.name}.npy", value)
+    np.save(directory / "revenue_scale.npy", np.array(index.revenue_scale))
+
+
+def _load_index(directory: str) -> None:
+    # Pool initializer: memory-map the parent's arrays once per worker
+    global _worker_index
+    d = Path(directory)
+    arrays = {
+        f.name: np.load(d / f"{f.name}.npy", mmap_mode="r")
+        for f in fields(TransactionIndex) if f.name != "revenue_scale"
+    }
+    _worker_index = TransactionIndex(**arrays, revenue_scale=float(np.load(d / "revenue_scale.npy")))
+
+
+def _campaign_task(customer_id: np.ndarray, window_start: np.ndarray, window_end: np.ndarray,
+                   windows: Sequence[int], lookbacks: Sequence[int]) -> WindowOutcomes:
+    return window_outcomes(_worker_index, customer_id, window_start, window_end, windows, lookbacks)
+
+
+def parallel_window_outcomes(
+    index: TransactionIndex,
+    campaign_id: pd.Series,
+    customer_id: np.ndarray,
+    window_start: pd.Series,
+    window_end: pd.Series,
+    windows: Sequence[int] = (),
+    lookbacks: Sequence[int] = (),
+    workers: int = 1,
+) -> WindowOutcomes:
+    """window_outcomes computed per campaign on `workers` processes (serial when workers <= 1)."""
+    codes, labels = pd.factorize(campaign_id, sort=True)
+    if workers <= 1 or len(labels) <= 1:
+        return window_outcomes(index, customer_id, window_start, window_end, windows, lookbacks)
+
+    customer_id = np.asarray(customer_id, dtype=np.int64)
+    start = _as_ns(window_start).view("datetime64[ns]")
+    end = _as_ns(window_end).view("datetime64[ns]")
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(labels) + 1))
+    rows = [order[bounds[i]:bounds[i + 1]] for i in range(len(labels))]
+
+    n = len(customer_id)
+    revenue, txn_count = np.zeros(n, dtype=float), np.zeros(n, dtype=np.int64)
+    horizons = {int(d): (np.zeros(n, dtype=float), np.zeros(n, dtype=np.int64)) for d in windows}
+    pre = {int(d): (np.zeros(n, dtype=float), np.zeros(n, dtype=np.int64)) for d in lookbacks}
+
+    with tempfile.TemporaryDirectory(prefix="txn-index-") as tmp:
+        _save_index(index, Path(tmp))
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(labels)), mp_context=pool_context(),
+            initializer=_load_index, initargs=(tmp,),
+        ) as executor:
+            results = executor.map(
+                _campaign_task,
+                [customer_id[r] for r in rows], [start[r] for r in rows], [end[r] for r in rows],
+                [list(windows)] * len(rows), [list(lookbacks)] * len(rows),
+            )
+            for r, (rev, cnt, hor, lb) in zip(rows, results):
+                revenue[r], txn_count[r] = rev, cnt
+                for d, (rev_d, cnt_d) in hor.items():
+                    horizons[d][0][r], horizons[d][1][r] = rev_d, cnt_d
+                for d, (rev_d, cnt_d) in lb.items():
+                    pre[d][0][r], pre[d][1][r] = rev_d, cnt_d
+    return revenue, txn_count, horizons, pre
+
@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import cProfile
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+# Built-in instrumentation: wall time, CPU time, peak RSS and rows in/out per stage and sub-step.
+# Steps nest per thread; a step opened with no enclosing one (a script run standalone) records
+# nothing, so the instrumented scripts cost nothing outside run_all. CPU is process CPU (all
+# threads plus reaped child processes, e.g. bootstrap workers) and RSS is the process's, sampled
+# every few milliseconds while any step is open: with stages on parallel threads, both include
+# whatever else is running. Background writes are recorded on the writer thread with thread CPU.
+
+PROFILERS = ("cprofile", "pyinstrument")
+_SAMPLE_S = 0.005
+
+
+def _cpu_seconds() -> float:
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def _procfs_rss() -> Optional[int]:
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None  # no psutil and no procfs: RSS is not reported
+
+
+def _rss_reader() -> Callable[[], Optional[int]]:
+    try:
+        import psutil
+    except ImportError:
+        return _procfs_rss
+    proc = psutil.Process()
+    return lambda: int(proc.memory_info().rss)
+
+
+_rss_bytes = _rss_reader()
+
+
+@dataclass
+class StepRecord:
+    name: str
+    rows_in: Optional[int] = None
+    rows_out: Optional[int] = None
+    thread: str = field(default_factory=lambda: threading.current_thread().name)
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    peak_rss: Optional[int] = None
+    steps: List["StepRecord"] = field(default_factory=list)
+
+    def add_rows(self, rows_in: int = 0, rows_out: int = 0) -> None:
+        if rows_in:
+            self.rows_in = (self.rows_in or 0) + int(rows_in)
+        if rows_out:
+            self.rows_out = (self.rows_out or 0) + int(rows_out)
+
+    def to_dict(self) -> dict:
+        out = {
+            "name": self.name,
+            "thread": self.thread,
+            "wall_s": round(self.wall_s, 4),
+            "cpu_s": round(self.cpu_s, 4),
+            "peak_rss_mb": None if self.peak_rss is None else round(self.peak_rss / 2**20, 1),
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+        }
+        if self.steps:
+            out["steps"] = [s.to_dict() for s in self.steps]
+        return out
+
+
+class _RssSampler:
+    """One daemon thread raising peak_rss of every open step while any is open."""
+
+    def __init__(self):
+        self._open: List[StepRecord] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self) -> None:
+        while True:
+            rss = _rss_bytes()
+            with self._lock:
+                if not self._open or rss is None:
+                    self._thread = None
+                    return
+                for rec in self._open:
+                    rec.peak_rss = max(rec.peak_rss or 0, rss)
+            time.sleep(_SAMPLE_S)
+
+    def open(self, rec: StepRecord) -> None:
+        rec.peak_rss = _rss_bytes()
+        with self._lock:
+            self._open.append(rec)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+                self._thread.start()
+
+    def close(self, rec: StepRecord) -> None:
+        rss = _rss_bytes()
+        with self._lock:
+            self._open.remove(rec)
+            if rss is not None:
+                rec.peak_rss = max(rec.peak_rss or 0, rss)
+
+
+_sampler = _RssSampler()
+_local = threading.local()
+
+
+def _stack() -> List[StepRecord]:
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def current() -> Optional[StepRecord]:
+    """Innermost open step on this thread (None outside run_all)."""
+    stack = _stack()
+    return stack[-1] if stack else None
+
+
+def root() -> Optional[StepRecord]:
+    """The stage record open on this thread (None outside run_all)."""
+    stack = _stack()
+    return stack[0] if stack else None
+
+
+def add_rows(rows_in: int = 0, rows_out: int = 0) -> None:
+    """Count rows read / written against every open step on this thread (the stage and its sub-steps)."""
+    for rec in _stack():
+        rec.add_rows(rows_in, rows_out)
+
+
+@contextmanager
+def _measure(rec: StepRecord, thread_cpu: bool = False) -> Iterator[StepRecord]:
+    cpu = time.thread_time if thread_cpu else _cpu_seconds
+    _sampler.open(rec)
+    wall0, cpu0 = time.perf_counter(), cpu()
+    try:
+        yield rec
+    finally:
+        rec.wall_s = time.perf_counter() - wall0
+        rec.cpu_s = cpu() - cpu0
+        _sampler.close(rec)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[StepRecord]:
+    """Top-level record for one stage run on this thread; steps inside attach to it."""
+    rec = StepRecord(name)
+    stack = _stack()
+    stack.append(rec)
+    try:
+        with _measure(rec):
+            yield rec
+    finally:
+        stack.pop()
+
+
+@contextmanager
+def step(name: str, rows_in: Optional[int] = None) -> Iterator[Optional[StepRecord]]:
+    """Sub-step of the current stage (no-op when none is open); set `.rows_out` on the yielded record."""
+    parent = current()
+    if parent is None:
+        yield None
+        return
+    rec = StepRecord(name, rows_in=rows_in)
+    parent.steps.append(rec)
+    stack = _stack()
+    stack.append(rec)
+    try:
+        with _measure(rec):
+            yield rec
+    finally:
+        stack.pop()
+
+
+@contextmanager
+def detached_step(parent: Optional[StepRecord], name: str, rows_out: Optional[int] = None) -> Iterator[None]:
+    """A step of `parent` run on another thread (background writes), timed with that thread's CPU."""
+    if parent is None:
+        yield
+        return
+    rec = StepRecord(name, rows_out=rows_out)
+    parent.steps.append(rec)
+    with _measure(rec, thread_cpu=True):
+        yield
+
+
+@contextmanager
+def profiled(profiler: Optional[str], out_path: Path) -> Iterator[None]:
+    """Run the body under cProfile (<out_path>.prof, pstats) or pyinstrument (<out_path>.html)."""
+    if profiler is None:
+        yield
+        return
+    if profiler not in PROFILERS:
+        raise ValueError(f"profiler must be one of {list(PROFILERS)}, got {profiler!r}")
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    if profiler == "cprofile":
+        prof = cProfile.Profile()
+        prof.enable()
+        try:
+            yield
+        finally:
+            prof.disable()
+            prof.dump_stats(str(out_path.with_suffix(".prof")))
+        return
+    try:
+        from pyinstrument import Profiler
+    except ImportError as exc:
+        raise ImportError("--profiler pyinstrument requires pyinstrument (pip install pyinstrument)") from exc
+    prof = Profiler()
+    prof.start()
+    try:
+        yield
+    finally:
+        prof.stop()
+        out_path.with_suffix(".html").write_text(prof.output_html(), encoding="utf-8")
+
+
+def environment() -> Dict[str, str]:
+    """Interpreter, platform and library versions for the run manifest."""
+    versions = {"python": sys.version.split()[0], "platform": platform.platform(), "cpu_count": str(os.cpu_count())}
+    for module in ("numpy", "pandas", "pyarrow", "duckdb"):
+        mod = sys.modules.get(module)
+        if mod is not None:
+            versions[module] = str(getattr(mod, "__version__", ""))
+    return versions
+
+
+def write_manifest(path: Path, manifest: dict) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, indent=1, default=str), encoding="utf-8")
+    tmp.replace(path)
+    return path
@@ -0,0 +1,280 @@
+from __future__ import annotations
+
+import importlib.util
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+# Central column types for every raw, processed and mart table. Reading through here skips
+# dtype inference, keeps ids/labels as categoricals and 0/1 flags as int8, and parses
+# timestamps in the reader instead of a separate pd.to_datetime pass. pyarrow's multi-threaded
+# CSV reader is used when installed, pandas' C parser otherwise.
+
+CSV_ENGINE = "pyarrow" if importlib.util.find_spec("pyarrow") is not None else "c"
+
+CAT = "category"
+FLAG = "int8"
+TEXT = "str"
+
+
+@dataclass(frozen=True)
+class TableSchema:
+    name: str
+    layer: str                                   # raw | processed | marts
+    dtypes: Dict[str, str]                       # non-timestamp columns
+    timestamps: Tuple[str, ...] = field(default_factory=tuple)
+    prefixes: Dict[str, str] = field(default_factory=dict)  # column-name prefix -> type (per-window columns)
+
+    @property
+    def columns(self) -> Tuple[str, ...]:
+        return tuple(self.dtypes) + self.timestamps
+
+    def dtypes_for(self, columns: Sequence[str]) -> Dict[str, str]:
+        """Types of the given non-timestamp columns, including prefix-typed ones."""
+        out = {}
+        for c in columns:
+            if c in self.dtypes:
+                out[c] = self.dtypes[c]
+            else:
+                for prefix, t in self.prefixes.items():
+                    if c.startswith(prefix):
+                        out[c] = t
+                        break
+        return out
+
+
+_KPI_COLUMNS = {
+    f"{group}_{metric}": "float64"
+    for group in ("exposed", "holdout")
+    for metric in ("n_customers", "converters", "revenue", "CR", "RPC")
+}
+_KPI_COLUMNS.update({"CR_uplift": "float64", "RPC_uplift": "float64", "incremental_revenue": "float64"})
+# CUPED-adjusted uplift (pipeline/cuped.py)
+_CUPED_COLUMNS = {
+    c: "float64" for c in (
+        "CR_uplift_cuped", "RPC_uplift_cuped", "incremental_revenue_cuped",
+        "incremental_revenue_cuped_ci_low", "incremental_revenue_cuped_ci_high", "cuped_variance_reduction",
+    )
+}
+# bootstrap intervals (pipeline/bootstrap.py)
+_CI_COLUMNS = {
+    f"{metric}_ci_{side}": "float64"
+    for metric in ("CR_uplift", "RPC_uplift", "incremental_revenue")
+    for side in ("low", "high")
+}
+
+SCHEMAS: Dict[str, TableSchema] = {s.name: s for s in (
+    # raw
+    TableSchema("dim_customers", "raw", {
+        "customer_id": "int64", "tenure_days": "int32", "loyalty_tier": CAT, "region": CAT,
+        "channel_pref": CAT, "consent_email": FLAG, "consent_sms": FLAG,
+        "baseline_buy_prob_daily": "float64", "lifecycle": CAT,
+    }, ("signup_date",)),
+    TableSchema("dim_campaigns", "raw", {
+        "campaign_id": CAT, "campaign_name": TEXT, "channel": CAT, "target_segment": CAT,
+        "attribution_window_days": "int32", "holdout_pct": "float64", "true_rpc_uplift": "float64",
+    }, ("start_date", "end_date", "eligibility_snapshot_date")),
+    TableSchema("fact_eligibility", "raw", {
+        "campaign_id": CAT, "customer_id": "int64",
+        # legacy dense layout
+        "eligible_flag": FLAG, "eligibility_reason": CAT,
+    }, ("snapshot_date",)),
+    TableSchema("fact_exposure", "raw", {
+        "campaign_id": CAT, "customer_id": "int64", "send_id": TEXT,
+        "delivered_flag": FLAG, "bounce_flag": FLAG, "control_flag": FLAG,
+    }, ("delivered_ts",)),
+    TableSchema("fact_transactions", "raw", {
+        "txn_id": TEXT, "customer_id": "int64", "store_id": "int32", "channel": CAT,
+        "gross_revenue": "float64", "items_count": "int32",
+    }, ("txn_ts",)),
+    # processed
+    TableSchema("mart_campaign_outcomes", "processed", {
+        "campaign_id": CAT, "customer_id": "int64",
+        "exposed_flag": FLAG, "holdout_flag": FLAG, "delivered_flag": FLAG, "control_flag": FLAG,
+        "bounce_flag": FLAG, "window_days": "int32",
+        "converted_flag": FLAG, "revenue_in_window": "float64", "txn_count_in_window": "int32",
+        "lifecycle": CAT, "loyalty_tier": CAT, "region": CAT,
+        "baseline_buy_prob_daily": "float64", "segment_name": CAT,
+    }, ("anchor_ts", "window_start", "window_end"), {
+        # sensitivity windows not fully observed by the cutoff are NaN, so converted_<d> is a float
+        "revenue_in_window_": "float64", "converted_": "float64", "pre_revenue_": "float64", "pre_txn_count_": "int32",
+    }),
+    # marts
+    TableSchema("mart_kpis_campaign", "marts", {
+        "campaign_id": CAT, **_KPI_COLUMNS,
+        "insufficient_sample_flag": "float64", "leakage_rate": "float64",
+        "campaign_name": TEXT, "channel": CAT, "target_segment": CAT, **_CI_COLUMNS, **_CUPED_COLUMNS,
+        "overlap_rate": "float64", "overlap_flag": FLAG,
+    }, ("start_date",)),
+    TableSchema("mart_kpis_campaign_window", "marts", {
+        "campaign_id": CAT, "window_days": "int32", **_KPI_COLUMNS, "insufficient_sample_flag": FLAG,
+        "complete_flag": FLAG,
+    }),
+    TableSchema("mart_kpis_segment", "marts", {
+        "campaign_id": CAT, "segment_name": CAT, **_KPI_COLUMNS, "insufficient_sample_flag": FLAG,
+        **_CI_COLUMNS, **_CUPED_COLUMNS,
+    }),
+    TableSchema("mart_sufficient_stats", "marts", {
+        "campaign_id": CAT, "group": CAT, "lifecycle": CAT, "loyalty_tier": CAT, "region": CAT,
+        "n_customers": "int64", "converters": "int64", "revenue": "float64", "revenue_sq": "float64",
+    }),
+    TableSchema("mart_kpi_cube", "marts", {
+        "campaign_id": CAT, "lifecycle": CAT, "loyalty_tier": CAT, "region": CAT,
+        "channel_pref": CAT, "tenure_band": CAT, "grouping_id": "int32",
+        **_KPI_COLUMNS, "insufficient_sample_flag": FLAG, **_CI_COLUMNS,
+    }),
+    TableSchema("mart_uplift_curves", "marts", {
+        "campaign_id": CAT, "day": "int32", **_KPI_COLUMNS, "complete_flag": FLAG,
+    }),
+    TableSchema("mart_overlap_campaign", "marts", {
+        "campaign_id": CAT, "n_customers": "int64", "overlapped_customers": "int64",
+        "overlap_rate": "float64", "overlap_flag": FLAG,
+    }),
+    TableSchema("mart_overlap_segment", "marts", {
+        "campaign_id": CAT, "segment_name": CAT, "n_customers": "int64", "overlapped_customers": "int64",
+        "overlap_rate": "float64",
+    }),
+    TableSchema("mart_overlap_pairs", "marts", {
+        "campaign_id": CAT, "other_campaign_id": CAT, "overlap_customers": "int64", "overlap_share": "float64",
+    }),
+    TableSchema("mart_campaign_outcomes_light", "marts", {
+        "campaign_id": CAT, "customer_id": "int64",
+        "exposed_flag": FLAG, "holdout_flag": FLAG, "converted_flag": FLAG, "revenue_in_window": "float64",
+        "segment_name": CAT, "lifecycle": CAT, "loyalty_tier": CAT, "region": CAT,
+        "baseline_buy_prob_daily": "float64",
+    }),
+)}
+
+
+def window_columns(days: Sequence[int]) -> List[str]:
+    """Per-window outcome columns of mart_campaign_outcomes for sensitivity windows `days`."""
+    return [f"{prefix}{int(d)}" for d in days for prefix in ("revenue_in_window_", "converted_")]
+
+
+def lookback_columns(days: Sequence[int]) -> List[str]:
+    """Pre-period covariate columns of mart_campaign_outcomes for lookback windows `days`."""
+    return [f"{prefix}{int(d)}" for d in days for prefix in ("pre_revenue_", "pre_txn_count_")]
+
+
+def apply_schema(df: pd.DataFrame, table: str) -> pd.DataFrame:
+    """Cast a frame to its registered column types (used before writing columnar files)."""
+    schema = SCHEMAS.get(table)
+    if schema is None:
+        return df
+    casts = {}
+    for c, t in schema.dtypes_for(df.columns).items():
+        if str(df[c].dtype) == t or (t == TEXT and df[c].dtype == object):
+            continue
+        if t == CAT:
+            values = df[c].astype(object)
+            casts[c] = pd.Categorical(values, categories=sorted(values.dropna().unique()))
+        elif t == TEXT:
+            casts[c] = df[c].astype(object)
+        else:
+            casts[c] = df[c].astype(t)
+    for c in schema.timestamps:
+        if c in df.columns and str(df[c].dtype) != "datetime64[ns]":
+            casts[c] = pd.to_datetime(df[c], errors="coerce").astype("datetime64[ns]")
+    return df.assign(**casts) if casts else df
+
+
+def concat_typed(frames: Sequence[pd.DataFrame], table: str) -> pd.DataFrame:
+    """pd.concat that restores categoricals (parts with different categories concat to object)."""
+    df = pd.concat(frames, ignore_index=True)
+    schema = SCHEMAS.get(table)
+    for c, t in (schema.dtypes.items() if schema else ()):
+        if t == CAT and c in df.columns:
+            df[c] = df[c].astype(CAT)
+    return df
+
+
+def _arrow_csv_options(dtypes: Dict[str, str], ts_cols: Sequence[str], usecols: Sequence[str]):
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+
+    arrow_types = {
+        CAT: pa.dictionary(pa.int32(), pa.string()),
+        TEXT: pa.string(),
+        FLAG: pa.int8(),
+        "int32": pa.int32(),
+        "int64": pa.int64(),
+        "float64": pa.float64(),
+    }
+    column_types = {c: arrow_types[t] for c, t in dtypes.items() if c in usecols}
+    column_types.update({c: pa.timestamp("ns") for c in ts_cols})
+    return pa_csv.ConvertOptions(column_types=column_types, include_columns=list(usecols))
+
+
+def arrow_to_pandas(table) -> pd.DataFrame:
+    """Arrow table/batch -> pandas with categories in sorted order (arrow keeps first-seen order,
+    pandas groupby order follows the categories)."""
+    df = table.to_pandas()
+    for c in df.columns:
+        if isinstance(df[c].dtype, pd.CategoricalDtype) and not df[c].cat.categories.is_monotonic_increasing:
+            df[c] = df[c].cat.reorder_categories(sorted(df[c].cat.categories))
+    return df
+
+
+def _read_pyarrow(path: Path, dtypes: Dict[str, str], ts_cols: Sequence[str], usecols: Sequence[str]) -> pd.DataFrame:
+    import pyarrow.csv as pa_csv
+
+    table = pa_csv.read_csv(path, convert_options=_arrow_csv_options(dtypes, ts_cols, usecols))
+    return arrow_to_pandas(table)
+
+
+def _typed_read_args(path: Path, table: str, columns: Optional[Sequence[str]]):
+    schema = SCHEMAS.get(table)
+    header = list(pd.read_csv(path, nrows=0).columns)
+    usecols = [c for c in header if columns is None or c in columns]
+
+    dtypes = schema.dtypes_for(usecols) if schema else {}
+    ts_cols = [c for c in (schema.timestamps if schema else ()) if c in usecols]
+    return dtypes, ts_cols, usecols
+
+
+def read_csv_typed(path: Path, table: str, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """Read a CSV with the registered schema (unknown tables / columns fall back to inference)."""
+    dtypes, ts_cols, usecols = _typed_read_args(path, table, columns)
+    if CSV_ENGINE == "pyarrow":
+        return _read_pyarrow(path, dtypes, ts_cols, usecols)
+
+    return pd.read_csv(
+        path,
+        engine=CSV_ENGINE,
+        usecols=usecols,
+        dtype={c: t for c, t in dtypes.items() if c in usecols},
+        parse_dates=ts_cols or False,
+    )
+
+
+def iter_csv_typed(
+    path: Path,
+    table: str,
+    columns: Optional[Sequence[str]] = None,
+    batch_bytes: int = 64 << 20,
+) -> Iterator[pd.DataFrame]:
+    """read_csv_typed in batches of roughly `batch_bytes` of CSV text (same parser, same types)."""
+    dtypes, ts_cols, usecols = _typed_read_args(path, table, columns)
+    if CSV_ENGINE == "pyarrow":
+        import pyarrow.csv as pa_csv
+
+        reader = pa_csv.open_csv(
+            path,
+            read_options=pa_csv.ReadOptions(block_size=int(batch_bytes)),
+            convert_options=_arrow_csv_options(dtypes, ts_cols, usecols),
+        )
+        for batch in reader:
+            if batch.num_rows:
+                yield arrow_to_pandas(batch)
+        return
+
+    yield from pd.read_csv(
+        path,
+        engine=CSV_ENGINE,
+        usecols=usecols,
+        dtype={c: t for c, t in dtypes.items() if c in usecols},
+        parse_dates=ts_cols or False,
+        chunksize=max(1_000, int(batch_bytes) // 100),  # ~100 bytes per CSV row
+    )
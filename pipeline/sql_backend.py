@@ -0,0 +1,354 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from pipeline.holdout import assign_holdout
+from pipeline.schemas import CAT, FLAG, SCHEMAS, TEXT
+from pipeline.storage import Storage
+from pipeline.window_join import observation_cutoff
+
+# SQL execution backend: 01/02 expressed as DuckDB queries over the raw / processed files
+# (csv and parquet are scanned directly, Arrow IPC through a pyarrow dataset). DuckDB runs
+# the joins and aggregations multi-threaded and spills to `temp_dir` above `memory_limit`.
+# Results keep the pandas backend's mart schemas; pairs are ordered by (campaign_id, customer_id).
+
+BACKENDS = ("pandas", "duckdb")
+
+_SQL_TYPES = {
+    CAT: "VARCHAR", TEXT: "VARCHAR", FLAG: "TINYINT",
+    "int32": "INTEGER", "int64": "BIGINT", "float64": "DOUBLE",
+}
+
+
+@dataclass(frozen=True)
+class SqlConfig:
+    backend: str
+    threads: int         # 0 = engine default (all cores)
+    memory_limit: str    # "" = engine default
+    temp_dir: Path
+
+    @staticmethod
+    def from_config(project_root: Path, cfg: dict) -> "SqlConfig":
+        ex = cfg.get("execution", {}) or {}
+        backend = str(ex.get("backend", "pandas")).lower()
+        if backend not in BACKENDS:
+            raise ValueError(f"execution.backend must be one of {list(BACKENDS)}, got {backend!r}")
+        if backend != "pandas":
+            for section in ("incremental", "out_of_core"):
+                if bool((cfg.get(section, {}) or {}).get("enabled", False)):
+                    raise ValueError(f"execution.backend: {backend} runs full recomputes; disable {section}.enabled")
+        return SqlConfig(
+            backend=backend,
+            threads=int(ex.get("threads", 0)),
+            memory_limit=str(ex.get("memory_limit", "") or ""),
+            temp_dir=project_root / ex.get("temp_dir", "data/tmp/sql"),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend != "pandas"
+
+    def connect(self):
+        try:
+            import duckdb
+        except ImportError as exc:
+            raise ImportError("execution.backend: duckdb requires the duckdb package (pip install duckdb)") from exc
+
+        self.temp_dir.mkdir(parents=True, exist_ok=True)
+        con = duckdb.connect()
+        con.execute(f"SET temp_directory = '{self.temp_dir.as_posix()}'")
+        if self.threads > 0:
+            con.execute(f"SET threads = {self.threads}")
+        if self.memory_limit:
+            con.execute(f"SET memory_limit = '{self.memory_limit}'")
+        return con
+
+
+def _sql_list(paths: Sequence[Path]) -> str:
+    return "[" + ", ".join("'" + p.as_posix().replace("'", "''") + "'" for p in paths) + "]"
+
+
+def register(con, storage: Storage, directory: Path, name: str, table: Optional[str] = None) -> None:
+    """Expose a dataset (single file or partitions) as view `name` without loading it."""
+    table = table or name
+    files = storage.files(directory, name)
+    if storage.format == "parquet":
+        con.execute(f"CREATE OR REPLACE VIEW {name} AS SELECT * FROM read_parquet({_sql_list(files)}, union_by_name = true)")
+    elif storage.format == "arrow":
+        import pyarrow.dataset as ds
+
+        con.register(f"{name}_arrow", ds.dataset([str(p) for p in files], format="feather"))
+        con.execute(f"CREATE OR REPLACE VIEW {name} AS SELECT * FROM {name}_arrow")
+    else:
+        schema = SCHEMAS.get(table)
+        header = list(pd.read_csv(files[0], nrows=0).columns)
+        types = {c: _SQL_TYPES[t] for c, t in (schema.dtypes_for(header) if schema else {}).items()}
+        types.update({c: "TIMESTAMP" for c in (schema.timestamps if schema else ()) if c in header})
+        types_sql = "{" + ", ".join(f"'{c}': '{t}'" for c, t in types.items()) + "}"
+        con.execute(
+            f"CREATE OR REPLACE VIEW {name} AS SELECT * FROM read_csv({_sql_list(files)}, header = true, "
+            f"union_by_name = true, types = {types_sql})"
+        )
+
+
+def _columns(con, view: str) -> List[str]:
+    return [row[0] for row in con.execute(f"DESCRIBE {view}").fetchall()]
+
+
+def _register_holdout(con, design: dict) -> None:
+    import pyarrow as pa
+
+    salt = str(design["holdout_salt"])
+
+    def holdout(campaign_id, customer_id, pct):
+        flags = assign_holdout(campaign_id.to_numpy(zero_copy_only=False), customer_id.to_numpy(zero_copy_only=False),
+                               pct.to_numpy(zero_copy_only=False), salt)
+        return pa.array(flags.astype(np.int32))
+
+    con.create_function("holdout_flag", holdout, ["VARCHAR", "BIGINT", "DOUBLE"], "INTEGER", type="arrow")
+
+
+def prepare_outcomes(
+    con, storage: Storage, raw_dir: Path, cfg: dict, windows: Sequence[int] = (), lookbacks: Sequence[int] = (),
+) -> pd.DataFrame:
+    """mart_campaign_outcomes in SQL: base pairs, anchors, window join, pre-period covariates and
+    customer attributes."""
+    for name in ("dim_customers", "dim_campaigns", "fact_eligibility", "fact_exposure", "fact_transactions"):
+        register(con, storage, raw_dir, name)
+
+    design = cfg["campaign_design"]
+    default_window = int(design["default_attribution_window_days"])
+    elig_filter = "WHERE eligible_flag = 1" if "eligible_flag" in _columns(con, "fact_eligibility") else ""
+
+    # Hash assignment: control membership recomputed per pair (verifies / fills the exposure log)
+    if design.get("holdout_assignment", "random") == "hash":
+        _register_holdout(con, design)
+        expected = f"holdout_flag(b.campaign_id, b.customer_id, COALESCE(b.holdout_pct, {float(design['holdout_pct'])}))"
+    else:
+        expected = "1"
+
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE base AS
+        WITH exp AS (
+            SELECT e.campaign_id, e.customer_id, e.delivered_flag, e.control_flag, e.bounce_flag,
+                   c.start_date, c.attribution_window_days, c.holdout_pct,
+                   CASE WHEN e.delivered_flag = 1 THEN e.delivered_ts
+                        ELSE c.start_date + INTERVAL 9 HOUR END AS anchor_ts
+            FROM fact_exposure e
+            LEFT JOIN dim_campaigns c USING (campaign_id)
+        ),
+        elig AS (
+            SELECT DISTINCT campaign_id, customer_id FROM fact_eligibility {elig_filter}
+        )
+        SELECT l.campaign_id, l.customer_id,
+               b.delivered_flag, b.control_flag, b.bounce_flag, b.anchor_ts, b.start_date,
+               b.attribution_window_days, b.holdout_pct
+        FROM elig l
+        LEFT JOIN exp b USING (campaign_id, customer_id)
+    """)
+    if design.get("holdout_assignment", "random") == "hash":
+        n_logged, n_mismatch = con.execute(f"""
+            SELECT COUNT(control_flag), COUNT(*) FILTER (WHERE control_flag IS NOT NULL AND control_flag <> {expected})
+            FROM base b
+        """).fetchone()
+        if n_mismatch:
+            print(f"⚠️ control_flag disagrees with hash assignment for {n_mismatch} of {n_logged} exposure rows")
+
+    cents = con.execute(
+        "SELECT COALESCE(bool_and(round(gross_revenue * 100) / 100 = gross_revenue), true) FROM fact_transactions"
+    ).fetchone()[0]
+    # Whole-cent amounts are summed as integer cents (exact, matches the pandas window join)
+    amount = "CAST(round(t.gross_revenue * 100) AS BIGINT)" if cents else "t.gross_revenue"
+    scale = "/ 100.0" if cents else ""
+
+    # Windows ending after the observation cutoff are NULL, like the pandas path
+    as_of = (cfg.get("curves", {}) or {}).get("as_of")
+    if not as_of and windows:
+        as_of = observation_cutoff(None, [con.execute("SELECT MAX(txn_ts) FROM fact_transactions").fetchone()[0]])
+    cutoff = f"TIMESTAMP '{pd.Timestamp(as_of)}'" if windows and pd.notna(pd.Timestamp(as_of)) else None
+
+    def unobserved(d: int) -> str:
+        return f"b.window_start + INTERVAL {int(d)} DAY > {cutoff}" if cutoff else "false"
+
+    horizon = "b.window_end"
+    if windows:
+        horizon = f"greatest(b.window_end, b.window_start + INTERVAL {int(max(windows))} DAY)"
+    # The join also reaches back over the longest lookback; in-window sums filter on window_start
+    after = "t.txn_ts >= b.window_start"
+    earliest = f"b.window_start - INTERVAL {int(max(lookbacks))} DAY" if lookbacks else "b.window_start"
+    window_sums = "".join(
+        f""",
+               COALESCE(SUM({amount}) FILTER (WHERE {after} AND t.txn_ts < b.window_start + INTERVAL {int(d)} DAY), 0) {scale}
+                   AS revenue_in_window_{int(d)},
+               CAST(COUNT(t.txn_ts) FILTER (WHERE {after} AND t.txn_ts < b.window_start + INTERVAL {int(d)} DAY) > 0 AS DOUBLE)
+                   AS converted_{int(d)}"""
+        for d in windows
+    )
+    window_sums += "".join(
+        f""",
+               COALESCE(SUM({amount}) FILTER (WHERE t.txn_ts < b.window_start
+                                              AND t.txn_ts >= b.window_start - INTERVAL {int(d)} DAY), 0) {scale}
+                   AS pre_revenue_{int(d)},
+               CAST(COUNT(t.txn_ts) FILTER (WHERE t.txn_ts < b.window_start
+                                            AND t.txn_ts >= b.window_start - INTERVAL {int(d)} DAY) AS INTEGER)
+                   AS pre_txn_count_{int(d)}"""
+        for d in lookbacks
+    )
+    window_cols = "".join(
+        f""",
+               CASE WHEN {unobserved(d)} THEN NULL ELSE CAST(w.revenue_in_window_{int(d)} AS DOUBLE) END
+                   AS revenue_in_window_{int(d)},
+               CASE WHEN {unobserved(d)} THEN NULL ELSE w.converted_{int(d)} END AS converted_{int(d)}"""
+        for d in windows
+    )
+    window_cols += "".join(f", CAST(w.pre_revenue_{int(d)} AS DOUBLE) AS pre_revenue_{int(d)}, w.pre_txn_count_{int(d)}"
+                           for d in lookbacks)
+
+    return con.execute(f"""
+        WITH b AS (
+            SELECT campaign_id, customer_id,
+                   COALESCE(delivered_flag, 0) AS delivered_flag,
+                   CAST(COALESCE(control_flag, {expected}, 1) AS INTEGER) AS control_flag,
+                   COALESCE(bounce_flag, 0) AS bounce_flag,
+                   COALESCE(anchor_ts, start_date + INTERVAL 9 HOUR) AS anchor_ts,
+                   COALESCE(anchor_ts, start_date + INTERVAL 9 HOUR) AS window_start,
+                   COALESCE(anchor_ts, start_date + INTERVAL 9 HOUR) + to_days(CAST(COALESCE(attribution_window_days, {default_window}) AS INTEGER)) AS window_end,
+                   CAST(COALESCE(attribution_window_days, {default_window}) AS INTEGER) AS window_days
+            FROM base b
+        ),
+        w AS (
+            SELECT b.campaign_id, b.customer_id,
+                   COALESCE(SUM({amount}) FILTER (WHERE {after} AND t.txn_ts < b.window_end), 0) {scale} AS revenue_in_window,
+                   COUNT(t.txn_ts) FILTER (WHERE {after} AND t.txn_ts < b.window_end) AS txn_count_in_window{window_sums}
+            FROM b
+            LEFT JOIN fact_transactions t
+              ON t.customer_id = b.customer_id AND t.txn_ts >= {earliest} AND t.txn_ts < {horizon}
+            GROUP BY b.campaign_id, b.customer_id
+        )
+        SELECT b.campaign_id, b.customer_id,
+               CAST(b.delivered_flag = 1 AS INTEGER) AS exposed_flag,
+               CAST(b.control_flag = 1 OR b.delivered_flag = 0 AS INTEGER) AS holdout_flag,
+               b.delivered_flag, b.control_flag, b.bounce_flag,
+               b.anchor_ts, b.window_start, b.window_end, b.window_days,
+               CAST(w.txn_count_in_window > 0 AS INTEGER) AS converted_flag,
+               CAST(w.revenue_in_window AS DOUBLE) AS revenue_in_window, w.txn_count_in_window,
+               c.lifecycle, c.loyalty_tier, c.region, c.baseline_buy_prob_daily,
+               -- 'nan' like pandas' astype(str) for customers missing from dim_customers
+               COALESCE(CAST(c.lifecycle AS VARCHAR), 'nan') || ' | '
+                   || COALESCE(CAST(c.loyalty_tier AS VARCHAR), 'nan') AS segment_name{window_cols}
+        FROM b
+        JOIN w USING (campaign_id, customer_id)
+        LEFT JOIN dim_customers c ON c.customer_id = b.customer_id
+        ORDER BY b.campaign_id, b.customer_id
+    """).df()
+
+
+def _kpi_select(n: str, conv: str, rev: str, prefix: str) -> str:
+    return f"""
+        CAST({n} AS DOUBLE) AS {prefix}_n_customers,
+        CAST({conv} AS DOUBLE) AS {prefix}_converters,
+        CAST({rev} AS DOUBLE) AS {prefix}_revenue,
+        CASE WHEN {n} > 0 THEN {conv} / {n} ELSE 0.0 END AS {prefix}_CR,
+        CASE WHEN {n} > 0 THEN {rev} / {n} ELSE 0.0 END AS {prefix}_RPC"""
+
+
+def _group_kpis(keys: Sequence[str], min_group: int, conv_col: str = "converted_flag",
+                rev_col: str = "revenue_in_window", extra_select: str = "", n_col: str = "*") -> str:
+    key_sql = ", ".join(keys)
+    return f"""
+        WITH g AS (
+            SELECT {key_sql},
+                   COUNT({n_col}) FILTER (WHERE exposed_flag = 1) AS e_n,
+                   COALESCE(SUM({conv_col}) FILTER (WHERE exposed_flag = 1), 0) AS e_conv,
+                   COALESCE(SUM({rev_col}) FILTER (WHERE exposed_flag = 1), 0.0) AS e_rev,
+                   COUNT({n_col}) FILTER (WHERE holdout_flag = 1) AS h_n,
+                   COALESCE(SUM({conv_col}) FILTER (WHERE holdout_flag = 1), 0) AS h_conv,
+                   COALESCE(SUM({rev_col}) FILTER (WHERE holdout_flag = 1), 0.0) AS h_rev
+            FROM outcomes
+            GROUP BY {key_sql}
+        ), k AS (
+            SELECT {key_sql}{extra_select},
+                   {_kpi_select("e_n", "e_conv", "e_rev", "exposed")},
+                   {_kpi_select("h_n", "h_conv", "h_rev", "holdout")},
+                   e_n, h_n
+            FROM g
+        )
+        SELECT * EXCLUDE (e_n, h_n),
+               exposed_CR - holdout_CR AS CR_uplift,
+               exposed_RPC - holdout_RPC AS RPC_uplift,
+               (exposed_RPC - holdout_RPC) * exposed_n_customers AS incremental_revenue,
+               CAST(e_n < {int(min_group)} OR h_n < {int(min_group)} AS INTEGER) AS insufficient_sample_flag
+        FROM k
+        ORDER BY {key_sql}
+    """
+
+
+def register_kpi_inputs(con, storage: Storage, raw_dir: Path, processed_dir: Path) -> None:
+    """Views `dim_campaigns` and `outcomes` over the files 02 reads."""
+    register(con, storage, raw_dir, "dim_campaigns")
+    register(con, storage, processed_dir, "mart_campaign_outcomes")
+    con.execute("CREATE OR REPLACE VIEW outcomes AS SELECT * FROM mart_campaign_outcomes")
+
+
+def compute_kpis(con, min_group: int, windows: Sequence[int] = ()) -> Dict[str, pd.DataFrame]:
+    """KPI marts in SQL (grouped aggregations over the `outcomes` view), keyed by mart name."""
+    campaign = con.execute(f"""
+        SELECT k.* EXCLUDE (insufficient_sample_flag),
+               CAST(k.insufficient_sample_flag AS DOUBLE) AS insufficient_sample_flag,
+               0.0 AS leakage_rate,
+               c.campaign_name, c.start_date, c.channel, c.target_segment, c.attribution_window_days
+        FROM ({_group_kpis(["campaign_id"], min_group)}) k
+        LEFT JOIN dim_campaigns c USING (campaign_id)
+        ORDER BY k.campaign_id
+    """).df()
+
+    marts = {
+        "mart_kpis_campaign": campaign,
+        "mart_kpis_segment": con.execute(_group_kpis(["campaign_id", "segment_name"], min_group)).df(),
+    }
+
+    marts["mart_sufficient_stats"] = con.execute("""
+        SELECT campaign_id,
+               CASE WHEN exposed_flag = 1 THEN 'exposed' ELSE 'holdout' END AS "group",
+               lifecycle, loyalty_tier, region,
+               COUNT(*) AS n_customers,
+               CAST(SUM(converted_flag) AS BIGINT) AS converters,
+               SUM(revenue_in_window) AS revenue,
+               SUM(revenue_in_window * revenue_in_window) AS revenue_sq
+        FROM outcomes
+        WHERE exposed_flag = 1 OR holdout_flag = 1
+        GROUP BY ALL
+        ORDER BY campaign_id, "group", lifecycle, loyalty_tier, region
+    """).df()
+
+    if windows:
+        # Only pairs observed over the whole window count; complete_flag = 0 when some were not
+        blocks = [
+            f"""
+            SELECT k.*, CAST(COALESCE(o.complete, true) AS INTEGER) AS complete_flag
+            FROM ({_group_kpis(["campaign_id"], min_group, f"converted_{int(d)}", f"revenue_in_window_{int(d)}",
+                               extra_select=f", {int(d)} AS window_days", n_col=f"revenue_in_window_{int(d)}")}) k
+            LEFT JOIN (
+                SELECT campaign_id, COUNT(revenue_in_window_{int(d)}) = COUNT(*) AS complete
+                FROM outcomes WHERE exposed_flag = 1 OR holdout_flag = 1
+                GROUP BY campaign_id
+            ) o USING (campaign_id)"""
+            for d in windows
+        ]
+        marts["mart_kpis_campaign_window"] = con.execute(
+            "SELECT * FROM (" + " UNION ALL ".join(f"({b})" for b in blocks) + ") ORDER BY campaign_id, window_days"
+        ).df()
+    return marts
+
+
+def read_outcomes(con, columns: Sequence[str]) -> pd.DataFrame:
+    """Columns of the registered outcomes view (light mart / overlap inputs), in pair order."""
+    available = set(_columns(con, "outcomes"))
+    cols = ", ".join(c for c in columns if c in available)
+    return con.execute(f"SELECT {cols} FROM outcomes ORDER BY campaign_id, customer_id").df()
+
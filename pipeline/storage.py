@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+import pandas as pd
+
+from pipeline.schemas import apply_schema, arrow_to_pandas, concat_typed, iter_csv_typed, read_csv_typed
+
+# Pluggable on-disk format for every pipeline dataset, chosen under `output:` in settings.yaml.
+# A dataset is either <dir>/<name>.<ext> or a partitioned <dir>/<name>/part-*.<ext> directory.
+#   csv      plain text (default; what the repo has always written)
+#   parquet  compressed columnar files
+#   arrow    Arrow IPC (Feather v2); memory-mapped on read, zero-copy when uncompressed
+
+EXTENSIONS = {"csv": ".csv", "parquet": ".parquet", "arrow": ".arrow"}
+
+
+@dataclass(frozen=True)
+class Storage:
+    format: str = "csv"
+    compression: str = "zstd"   # parquet / arrow codec ("none" to disable)
+    memory_map: bool = True     # memory-map parquet / arrow files on read
+    csv_export: bool = False    # also write a .csv copy next to parquet / arrow files
+
+    @staticmethod
+    def from_config(cfg: dict) -> "Storage":
+        out = cfg.get("output", {})
+        fmt = str(out.get("format", "csv")).lower()
+        if fmt not in EXTENSIONS:
+            raise ValueError(f"output.format must be one of {sorted(EXTENSIONS)}, got {fmt!r}")
+        if fmt != "csv":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError as exc:
+                raise ImportError(f"output.format: {fmt} requires pyarrow (pip install pyarrow)") from exc
+        return Storage(
+            format=fmt,
+            compression=str(out.get("compression", "zstd")),
+            memory_map=bool(out.get("memory_map", True)),
+            csv_export=bool(out.get("csv_export", False)),
+        )
+
+    @property
+    def ext(self) -> str:
+        return EXTENSIONS[self.format]
+
+    def path(self, directory: Path, name: str) -> Path:
+        return directory / f"{name}{self.ext}"
+
+    def part_paths(self, directory: Path, name: str) -> List[Path]:
+        part_dir = directory / name
+        return sorted(part_dir.glob(f"part-*{self.ext}")) if part_dir.is_dir() else []
+
+    def exists(self, directory: Path, name: str) -> bool:
+        return self.path(directory, name).exists() or bool(self.part_paths(directory, name))
+
+    def files(self, directory: Path, name: str) -> List[Path]:
+        """The single file of a dataset, or its partition files in order."""
+        path = self.path(directory, name)
+        files = [path] if path.exists() else self.part_paths(directory, name)
+        if not files:
+            raise FileNotFoundError(f"Missing required dataset: {path}")
+        return files
+
+    def nbytes(self, directory: Path, name: str) -> int:
+        return sum(p.stat().st_size for p in self.files(directory, name))
+
+    # -- write ---------------------------------------------------------------------------
+
+    def write(self, df: pd.DataFrame, directory: Path, name: str, table: Optional[str] = None) -> Path:
+        """Write one file; `table` selects the schema when `name` is a partition key."""
+        table = table or name
+        path = self.path(directory, name)
+        if self.format == "csv":
+            df.to_csv(path, index=False)
+            return path
+
+        import pyarrow as pa
+
+        arrow_table = pa.Table.from_pandas(apply_schema(df, table), preserve_index=False)
+        self._write_arrow(arrow_table, path)
+        if self.csv_export:
+            df.to_csv(directory / f"{name}.csv", index=False)
+        return path
+
+    def _write_arrow(self, arrow_table, path: Path) -> None:
+        codec = None if self.compression.lower() in ("", "none") else self.compression
+        if self.format == "parquet":
+            import pyarrow.parquet as pq
+
+            pq.write_table(arrow_table, path, compression=codec or "none")
+        else:
+            import pyarrow.feather as feather
+
+            feather.write_feather(arrow_table, path, compression=codec or "uncompressed")
+
+    def remove(self, directory: Path, name: str) -> None:
+        """Delete a dataset in every format (single file, csv export and partition files)."""
+        for ext in EXTENSIONS.values():
+            single = directory / f"{name}{ext}"
+            if single.exists():
+                single.unlink()
+        part_dir = directory / name
+        if part_dir.is_dir():
+            for old in part_dir.glob("part-*"):
+                old.unlink()
+
+    # -- read ----------------------------------------------------------------------------
+
+    def read_file(self, path: Path, table: str, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        if self.format == "csv":
+            return read_csv_typed(path, table, columns)
+        return arrow_to_pandas(self._read_arrow(path, columns))
+
+    def _read_arrow(self, path: Path, columns: Optional[Sequence[str]] = None):
+        if self.format == "parquet":
+            import pyarrow.parquet as pq
+
+            names = pq.read_schema(path).names
+            cols = None if columns is None else [c for c in names if c in columns]
+            return pq.read_table(path, columns=cols, memory_map=self.memory_map)
+
+        import pyarrow as pa
+        import pyarrow.feather as feather
+
+        cols = None
+        if columns is not None:
+            with pa.memory_map(str(path)) as source:
+                names = pa.ipc.open_file(source).schema.names
+            cols = [c for c in names if c in columns]
+        return feather.read_table(path, columns=cols, memory_map=self.memory_map)
+
+    def read(
+        self,
+        directory: Path,
+        name: str,
+        columns: Optional[Sequence[str]] = None,
+        table: Optional[str] = None,
+    ) -> pd.DataFrame:
+        """Read <name> or its partitions; `columns` projects (absent columns are skipped)."""
+        table = table or name
+        files = self.files(directory, name)
+        if len(files) == 1:
+            return self.read_file(files[0], table, columns)
+        return concat_typed([self.read_file(p, table, columns) for p in files], table)
+
+    def iter_batches(
+        self,
+        directory: Path,
+        name: str,
+        columns: Optional[Sequence[str]] = None,
+        table: Optional[str] = None,
+        batch_bytes: int = 64 << 20,
+    ) -> Iterator[pd.DataFrame]:
+        """Stream a dataset in row order, roughly `batch_bytes` of decoded data per batch."""
+        table = table or name
+        for path in self.files(directory, name):
+            if self.format == "csv":
+                yield from iter_csv_typed(path, table, columns, batch_bytes)
+            elif self.format == "parquet":
+                import pyarrow.parquet as pq
+
+                pf = pq.ParquetFile(path, memory_map=self.memory_map)
+                cols = None if columns is None else [c for c in pf.schema_arrow.names if c in columns]
+                meta = pf.metadata
+                row_bytes = max(1, sum(meta.row_group(i).total_byte_size for i in range(meta.num_row_groups))
+                                // max(1, meta.num_rows))
+                for batch in pf.iter_batches(batch_size=max(1_000, int(batch_bytes) // row_bytes), columns=cols):
+                    yield arrow_to_pandas(batch)
+            else:
+                arrow_table = self._read_arrow(path, columns)
+                row_bytes = max(1, arrow_table.nbytes // max(1, arrow_table.num_rows))
+                for batch in arrow_table.to_batches(max_chunksize=max(1_000, int(batch_bytes) // row_bytes)):
+                    yield arrow_to_pandas(batch)
+
+    def concat(self, paths: Iterable[Path], directory: Path, name: str, table: str) -> Path:
+        """Reassemble one dataset from same-layout files without a pandas round trip."""
+        paths = list(paths)
+        dest = self.path(directory, name)
+        if self.format == "csv":
+            with dest.open("w", encoding="utf-8", newline="") as out:
+                for i, p in enumerate(paths):
+                    with p.open("r", encoding="utf-8", newline="") as f:
+                        header = f.readline()
+                        if i == 0:
+                            out.write(header)
+                        shutil.copyfileobj(f, out)
+            return dest
+
+        import pyarrow as pa
+
+        tables = [self._read_arrow(p) for p in paths]
+        merged = pa.concat_tables(tables, promote_options="permissive") if tables else pa.table({})
+        self._write_arrow(merged, dest)
+        if self.csv_export:
+            merged.to_pandas().to_csv(directory / f"{name}.csv", index=False)
+        return dest
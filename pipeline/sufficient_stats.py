@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from statistics import NormalDist
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+# Additive sufficient statistics: per campaign x group (exposed / holdout) x lifecycle x
+# loyalty_tier x region, the customer count, converters, revenue and revenue². Any rollup over
+# these keys is a plain sum of rows, and from the sums CR, RPC, uplifts and their normal-approx
+# variances follow exactly, without going back to customer-level outcomes. converted² equals
+# converted and converted x revenue equals revenue (revenue implies a transaction), so neither
+# needs its own column.
+
+STATS_DIMENSIONS = ["lifecycle", "loyalty_tier", "region"]
+STATS_KEYS = ["campaign_id", "group"] + STATS_DIMENSIONS
+STAT_COLUMNS = ["n_customers", "converters", "revenue", "revenue_sq"]
+GROUPS = ("exposed", "holdout")
+
+
+def sufficient_stats(outcomes: pd.DataFrame, dimensions: Sequence[str] = tuple(STATS_DIMENSIONS)) -> pd.DataFrame:
+    """One row per campaign x group x `dimensions` (default lifecycle x loyalty_tier x region) with additive sums."""
+    exposed = outcomes["exposed_flag"].to_numpy() == 1
+    holdout = outcomes["holdout_flag"].to_numpy() == 1
+    keep = exposed | holdout
+    rows = outcomes.loc[keep]
+    rev = rows["revenue_in_window"].to_numpy(dtype=float)
+
+    values = pd.DataFrame({
+        "n_customers": np.ones(len(rows), dtype=np.int64),
+        "converters": rows["converted_flag"].to_numpy().astype(np.int64),
+        "revenue": rev,
+        "revenue_sq": rev * rev,
+    }, index=rows.index)
+    group = pd.Series(np.where(exposed[keep], GROUPS[0], GROUPS[1]), index=rows.index, name="group")
+    keys = [rows["campaign_id"], group] + [rows[d] for d in dimensions]
+    # dropna=False keeps pairs with a missing dimension (no dim_customers match) as NaN keys, so
+    # every rollup still adds up to the campaign totals
+    sums = values.groupby(keys, observed=True, sort=True, dropna=False).sum()
+    return sums.reset_index()
+
+
+def _variance_of_mean(n: np.ndarray, total: np.ndarray, total_sq: np.ndarray) -> np.ndarray:
+    # Sample variance / n from sums; 0 for groups with fewer than two customers
+    with np.errstate(divide="ignore", invalid="ignore"):
+        var = (total_sq - total * total / n) / (n - 1)
+        return np.where(n > 1, np.maximum(var, 0.0) / n, 0.0)
+
+
+def rollup_kpis(
+    stats: pd.DataFrame,
+    keys: Sequence[str],
+    min_group: int = 0,
+    confidence: float = 0.95,
+) -> pd.DataFrame:
+    """KPIs per `keys` rollup of the sufficient-statistics mart, with normal-approx intervals.
+
+    Columns match the KPI marts (exposed_/holdout_ n, converters, revenue, CR, RPC, uplifts,
+    incremental revenue, insufficient_sample_flag) plus *_ci_low / *_ci_high.
+    """
+    keys = list(keys)
+    sums = stats.groupby(keys + ["group"], observed=True, sort=True, dropna=False)[STAT_COLUMNS].sum()
+    sums = sums.unstack("group", fill_value=0).reindex(
+        columns=pd.MultiIndex.from_product([STAT_COLUMNS, GROUPS]), fill_value=0,
+    )
+    out = sums.index.to_frame(index=False)
+
+    var = {}
+    for g in GROUPS:
+        n, conv, rev, rev_sq = (sums[(c, g)].to_numpy(dtype=float) for c in STAT_COLUMNS)
+        safe_n = np.where(n > 0, n, 1.0)
+        out[f"{g}_n_customers"] = n
+        out[f"{g}_converters"] = conv
+        out[f"{g}_revenue"] = rev
+        out[f"{g}_CR"] = np.where(n > 0, conv / safe_n, 0.0)
+        out[f"{g}_RPC"] = np.where(n > 0, rev / safe_n, 0.0)
+        var[g] = (
+            _variance_of_mean(n, conv, conv),  # converted² = converted
+            _variance_of_mean(n, rev, rev_sq),
+        )
+
+    out["CR_uplift"] = out["exposed_CR"] - out["holdout_CR"]
+    out["RPC_uplift"] = out["exposed_RPC"] - out["holdout_RPC"]
+    out["incremental_revenue"] = out["RPC_uplift"] * out["exposed_n_customers"]
+    out["insufficient_sample_flag"] = (
+        (out["exposed_n_customers"] < min_group) | (out["holdout_n_customers"] < min_group)
+    ).astype(int)
+
+    z = NormalDist().inv_cdf(0.5 + confidence / 2.0)
+    cr_se = np.sqrt(var["exposed"][0] + var["holdout"][0])
+    rpc_se = np.sqrt(var["exposed"][1] + var["holdout"][1])
+    n_exposed = out["exposed_n_customers"].to_numpy()
+    for metric, est, se in (
+        ("CR_uplift", out["CR_uplift"], cr_se),
+        ("RPC_uplift", out["RPC_uplift"], rpc_se),
+        ("incremental_revenue", out["incremental_revenue"], rpc_se * n_exposed),
+    ):
+        out[f"{metric}_ci_low"] = est - z * se
+        out[f"{metric}_ci_high"] = est + z * se
+    return out
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from pipeline.window_join import _DAY_NS, _NAT, TransactionIndex, _as_ns
+
+# Daily cumulative uplift curves: per campaign and day d of the attribution window, exposed and
+# holdout customers, converters and revenue from transactions in the first d days after the
+# anchor. Every in-window transaction is bucketed once by (campaign x group, day offset k,
+# days elapsed e for its customer as of the observation cutoff) with bincount; day d totals are
+# then sums over k < d and e >= d, i.e. two cumsums over the histogram. Customers whose window
+# has not run d days by the cutoff are left out of day d entirely (numerator and denominator),
+# so in-flight campaigns get unbiased early reads over the customers observed that long.
+
+
+def _through_day(hist: np.ndarray) -> np.ndarray:
+    """(cells x days x days+1) histogram over (offset k, elapsed e) -> (cells x days) totals over
+    k < d, e >= d for d = 1..days."""
+    days = hist.shape[1]
+    upto = np.cumsum(hist, axis=1)                           # k <= row
+    from_e = np.cumsum(upto[..., ::-1], axis=2)[..., ::-1]   # e >= column
+    return from_e[:, np.arange(days), np.arange(1, days + 1)]
+
+
+def uplift_curves(pairs: pd.DataFrame, index: TransactionIndex, as_of: pd.Timestamp) -> pd.DataFrame:
+    """One row per campaign x day (1..its attribution window) with cumulative KPIs and uplift.
+
+    `pairs` needs campaign_id, customer_id, exposed_flag, holdout_flag, window_start, window_days.
+    complete_flag = 1 when every customer of the campaign had day `day` elapsed by `as_of`.
+    """
+    exposed = pairs["exposed_flag"].to_numpy() == 1
+    group = np.where(exposed, 0, np.where(pairs["holdout_flag"].to_numpy() == 1, 1, -1))
+    pairs = pairs.loc[group >= 0]
+    group = group[group >= 0]
+
+    codes, labels = pd.factorize(pairs["campaign_id"].astype(str), sort=True)
+    n_campaigns, n_cells = len(labels), 2 * len(labels)
+    window_days = pairs["window_days"].to_numpy(dtype=np.int64)
+    n_days = int(window_days.max()) if len(window_days) else 0
+    if n_days == 0:
+        return pd.DataFrame(columns=["campaign_id", "day"])
+    cell = codes.astype(np.int64) * 2 + group
+
+    start = _as_ns(pairs["window_start"])
+    cutoff = pd.Timestamp(as_of).value
+    elapsed = np.where(start == _NAT, window_days, np.clip((cutoff - start) // _DAY_NS, 0, window_days))
+
+    end = np.where(start == _NAT, _NAT, start + window_days * _DAY_NS)
+    window, pos = index.window_transactions(pairs["customer_id"].to_numpy(), start.view("datetime64[ns]"),
+                                            end.view("datetime64[ns]"))
+    offset = (index.ts[pos] - start[window]) // _DAY_NS
+    first = np.r_[True, window[1:] != window[:-1]] if len(window) else np.zeros(0, dtype=bool)
+
+    size = n_cells * n_days * (n_days + 1)
+
+    def hist(rows: np.ndarray, k: np.ndarray, weights=None) -> np.ndarray:
+        flat = (cell[rows] * n_days + k) * (n_days + 1) + elapsed[rows]
+        return np.bincount(flat, weights=weights, minlength=size).reshape(n_cells, n_days, n_days + 1)
+
+    revenue = _through_day(hist(window, offset, index.revenue[pos]))
+    converters = _through_day(hist(window[first], offset[first]))
+    n_elapsed = np.bincount(cell * (n_days + 1) + elapsed, minlength=n_cells * (n_days + 1)).reshape(n_cells, n_days + 1)
+    customers = np.cumsum(n_elapsed[:, ::-1], axis=1)[:, ::-1][:, 1:]   # e >= d for d = 1..days
+    total = n_elapsed.sum(axis=1, keepdims=True)
+
+    last_day = np.zeros(n_campaigns, dtype=np.int64)
+    np.maximum.at(last_day, codes, window_days)
+    day = np.arange(1, n_days + 1)
+    keep = (day[None, :] <= last_day[:, None]).reshape(-1)
+
+    out: Dict[str, np.ndarray] = {
+        "campaign_id": np.repeat(np.asarray(labels, dtype=object), n_days)[keep],
+        "day": np.tile(day, n_campaigns)[keep],
+    }
+    for g, prefix in enumerate(("exposed", "holdout")):
+        n = customers[g::2].reshape(-1)[keep].astype(float)
+        conv = converters[g::2].reshape(-1)[keep]
+        rev = revenue[g::2].reshape(-1)[keep]
+        safe_n = np.where(n > 0, n, 1.0)
+        out[f"{prefix}_n_customers"] = n
+        out[f"{prefix}_converters"] = conv
+        out[f"{prefix}_revenue"] = rev
+        out[f"{prefix}_CR"] = np.where(n > 0, conv / safe_n, 0.0)
+        out[f"{prefix}_RPC"] = np.where(n > 0, rev / safe_n, 0.0)
+
+    curves = pd.DataFrame(out)
+    curves["CR_uplift"] = curves["exposed_CR"] - curves["holdout_CR"]
+    curves["RPC_uplift"] = curves["exposed_RPC"] - curves["holdout_RPC"]
+    curves["incremental_revenue"] = curves["RPC_uplift"] * curves["exposed_n_customers"]
+    complete = (customers == total).reshape(n_campaigns, 2, n_days).all(axis=1).reshape(-1)[keep]
+    curves["complete_flag"] = complete.astype(int)
+    return curves
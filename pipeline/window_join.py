@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Window aggregation over transactions without a customer x transaction cartesian join:
+# transactions are sorted once by (customer_id, txn_ts) into composite int64 keys with
+# cumulative revenue, and every [window_start, window_end) is two searchsorted lookups.
+# Cost is O((pairs + txns) log txns); extra horizons from the same start add one lookup each.
+
+_NAT = np.iinfo(np.int64).min
+_DAY_NS = 86_400 * 10**9
+
+
+def observation_cutoff(as_of, txn_ts) -> pd.Timestamp:
+    """`as_of` when set, else the end of the last day with transactions (NaT when there are none)."""
+    if as_of:
+        return pd.Timestamp(as_of)
+    last = pd.to_datetime(pd.Series(txn_ts)).max()
+    return last.normalize() + pd.Timedelta(days=1) if pd.notna(last) else pd.NaT
+
+
+def _as_ns(values) -> np.ndarray:
+    """Timestamps as int64 nanoseconds (NaT -> int64 min)."""
+    return pd.to_datetime(pd.Series(values), errors="coerce").to_numpy(dtype="datetime64[ns]").view(np.int64)
+
+
+@dataclass(frozen=True)
+class TransactionIndex:
+    customers: np.ndarray    # unique customer ids, ascending
+    times: np.ndarray        # unique transaction timestamps (ns), ascending
+    keys: np.ndarray         # per transaction: customer_pos * (len(times) + 1) + rank(txn_ts), ascending
+    customer_id: np.ndarray  # per transaction, sorted by (customer_id, txn_ts)
+    ts: np.ndarray           # per transaction (ns), same order
+    revenue: np.ndarray      # per transaction, same order
+    cum_revenue: np.ndarray  # len(txns) + 1 running total, in units of 1 / revenue_scale
+    revenue_scale: float     # 100.0 when every amount is whole cents (exact integer sums), else 1.0
+
+    @staticmethod
+    def build(customer_id, txn_ts, revenue) -> "TransactionIndex":
+        cust = np.asarray(customer_id, dtype=np.int64)
+        ts = _as_ns(txn_ts)
+        rev = np.asarray(revenue, dtype=float)
+
+        valid = ts != _NAT
+        cust, ts, rev = cust[valid], ts[valid], rev[valid]
+
+        order = np.lexsort((ts, cust))
+        cust, ts, rev = cust[order], ts[order], rev[order]
+
+        customers, cust_pos = np.unique(cust, return_inverse=True)
+        times = np.unique(ts)
+        keys = cust_pos.astype(np.int64) * (len(times) + 1) + np.searchsorted(times, ts)
+
+        cents = np.round(rev * 100.0)
+        if np.array_equal(cents / 100.0, rev):
+            cum = np.concatenate([[0], np.cumsum(cents.astype(np.int64))])
+            scale = 100.0
+        else:
+            cum = np.concatenate([[0.0], np.cumsum(rev)])
+            scale = 1.0
+
+        return TransactionIndex(customers, times, keys, cust, ts, rev, cum, scale)
+
+    @staticmethod
+    def from_frame(tx: pd.DataFrame) -> "TransactionIndex":
+        return TransactionIndex.build(tx["customer_id"].to_numpy(), tx["txn_ts"], tx["gross_revenue"].to_numpy())
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def _locate(self, customer_id, start: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(customer base key, valid mask, lo position) for each window start (ns)."""
+        cust = np.asarray(customer_id, dtype=np.int64)
+
+        pos = np.minimum(np.searchsorted(self.customers, cust), max(len(self.customers) - 1, 0))
+        valid = start != _NAT
+        if len(self.customers):
+            valid &= self.customers[pos] == cust
+        else:
+            valid[:] = False
+
+        base = pos.astype(np.int64) * (len(self.times) + 1)
+        lo = np.searchsorted(self.keys, base + np.searchsorted(self.times, start), side="left")
+        return base, valid, lo
+
+    def _end_positions(self, base: np.ndarray, end: np.ndarray) -> np.ndarray:
+        return np.searchsorted(self.keys, base + np.searchsorted(self.times, end), side="left")
+
+    def window_positions(self, customer_id, window_start, window_end) -> Tuple[np.ndarray, np.ndarray]:
+        """[lo, hi) positions of each window's transactions in the sorted arrays (lo == hi if none)."""
+        start = _as_ns(window_start)
+        end = _as_ns(window_end)
+        base, valid, lo = self._locate(customer_id, start)
+        valid &= (end != _NAT) & (end > start)
+        hi = self._end_positions(base, end)
+
+        lo = np.where(valid, lo, 0)
+        hi = np.where(valid, hi, 0)
+        return lo, hi
+
+    def lookback_totals(
+        self, customer_id, anchor, days: Sequence[int]
+    ) -> Dict[int, Tuple[np.ndarray, np.ndarray]]:
+        """window_totals for [anchor - d days, anchor) for every d in `days` (pre-period covariates),
+        locating each anchor once."""
+        start = _as_ns(anchor)
+        base, valid, hi = self._locate(customer_id, start)
+        out = {}
+        for d in days:
+            ok = valid & (int(d) > 0)
+            lo = np.where(ok, self._end_positions(base, np.where(valid, start - int(d) * _DAY_NS, start)), 0)
+            hi_d = np.where(ok, hi, 0)
+            revenue = (self.cum_revenue[hi_d] - self.cum_revenue[lo]) / self.revenue_scale
+            out[int(d)] = (revenue.astype(float), (hi_d - lo).astype(np.int64))
+        return out
+
+    def window_transactions(self, customer_id, window_start, window_end) -> Tuple[np.ndarray, np.ndarray]:
+        """(window index, position in the sorted arrays) of every transaction inside a window,
+        grouped by window and in time order within each."""
+        lo, hi = self.window_positions(customer_id, window_start, window_end)
+        counts = hi - lo
+        window = np.repeat(np.arange(len(lo)), counts)
+        first_out = np.cumsum(counts) - counts  # where each window's transactions start in the output
+        pos = np.repeat(lo - first_out, counts) + np.arange(int(counts.sum()))
+        return window, pos
+
+    def window_totals(self, customer_id, window_start, window_end) -> Tuple[np.ndarray, np.ndarray]:
+        """(revenue, txn_count) in [window_start, window_end) for each (customer, window)."""
+        lo, hi = self.window_positions(customer_id, window_start, window_end)
+        revenue = (self.cum_revenue[hi] - self.cum_revenue[lo]) / self.revenue_scale
+        return revenue.astype(float), (hi - lo).astype(np.int64)
+
+    def horizon_totals(
+        self, customer_id, window_start, days: Sequence[int]
+    ) -> Dict[int, Tuple[np.ndarray, np.ndarray]]:
+        """window_totals for [window_start, window_start + d days) for every d in `days`,
+        locating each start once."""
+        start = _as_ns(window_start)
+        base, valid, lo = self._locate(customer_id, start)
+        out = {}
+        for d in days:
+            end = np.where(valid, start + int(d) * _DAY_NS, start)
+            ok = valid & (int(d) > 0)
+            hi = np.where(ok, self._end_positions(base, end), 0)
+            lo_d = np.where(ok, lo, 0)
+            revenue = (self.cum_revenue[hi] - self.cum_revenue[lo_d]) / self.revenue_scale
+            out[int(d)] = (revenue.astype(float), (hi - lo_d).astype(np.int64))
+        return out
@@ -1,13 +1,27 @@
 from __future__ import annotations
 
+import os
+import sys
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import ExitStack
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict
+from typing import Deque, Dict, Iterable, Iterator, Mapping, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 import yaml
 
+# Make imports stable regardless of where the script is launched
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from pipeline.handoff import BackgroundWriter, Handoff, pool_context  # noqa: E402
+from pipeline.holdout import assign_holdout  # noqa: E402
+from pipeline.profiling import step  # noqa: E402
+from pipeline.storage import Storage  # noqa: E402
+
 
 def _project_root_from_this_file(this_file: Path) -> Path:
     # scripts/00_generate_data.py -> project root is parent of "scripts"
@@ -47,11 +61,12 @@ def _rng(seed: int) -> np.random.Generator:
     return np.random.default_rng(seed)
 
 
-def _make_customers(rng: np.random.Generator, cfg: dict) -> pd.DataFrame:
-    n = int(cfg["simulation"]["n_customers"])
+def _make_customers(rng: np.random.Generator, cfg: dict, n: Optional[int] = None, id_offset: int = 0) -> pd.DataFrame:
+    # n / id_offset select a block of customers (streaming mode); default is the full population.
+    n = int(cfg["simulation"]["n_customers"]) if n is None else int(n)
     end = pd.Timestamp(cfg["simulation"]["end_date"])
 
-    customer_id = np.arange(1, n + 1)
+    customer_id = np.arange(id_offset + 1, id_offset + n + 1)
 
     tenure_days = rng.integers(30, 900, size=n)
     signup_date = (end - pd.to_timedelta(tenure_days, unit="D")).astype("datetime64[ns]")
@@ -122,6 +137,7 @@ def _make_campaigns(rng: np.random.Generator, cfg: dict) -> pd.DataFrame:
         "campaign_name": [f"Campaign {i+1}" for i in range(n)],
         "start_date": pd.to_datetime(campaign_starts),
         "end_date": pd.to_datetime(campaign_starts) + pd.Timedelta(days=2),
+        "eligibility_snapshot_date": pd.to_datetime(campaign_starts) - pd.Timedelta(days=1),
         "channel": channels,
         "target_segment": target_segment,
         "attribution_window_days": window_days,
@@ -130,12 +146,26 @@ def _make_campaigns(rng: np.random.Generator, cfg: dict) -> pd.DataFrame:
     })
 
 
-def _eligibility_logic(customers: pd.DataFrame, campaigns: pd.DataFrame, rng: np.random.Generator, cfg: dict) -> pd.DataFrame:
+def _eligibility_logic(
+    customers: pd.DataFrame,
+    campaigns: pd.DataFrame,
+    rng: np.random.Generator,
+    cfg: dict,
+    prop_range: Optional[Tuple[float, float]] = None,
+) -> pd.DataFrame:
+    """Eligible (campaign_id, customer_id) pairs only.
+
+    Failing pairs are implied by absence; the rules snapshot date is
+    dim_campaigns.eligibility_snapshot_date. `prop_range` is the (min, max) propensity over the
+    whole population (streaming mode passes it to every block); default is this frame's.
+    """
     overlap_rate = float(cfg["campaign_design"]["overlap_rate"])
+    customer_ids = customers["customer_id"].to_numpy()
     rows = []
 
     prop = customers["baseline_buy_prob_daily"].to_numpy()
-    prop_norm = (prop - prop.min()) / (prop.max() - prop.min() + 1e-9)
+    prop_min, prop_max = (prop.min(), prop.max()) if prop_range is None else prop_range
+    prop_norm = (prop - prop_min) / (prop_max - prop_min + 1e-9)
 
     for _, camp in campaigns.iterrows():
         seg = camp["target_segment"]
@@ -160,14 +190,9 @@ def _eligibility_logic(customers: pd.DataFrame, campaigns: pd.DataFrame, rng: np
             extra = (rng.random(len(customers)) < overlap_rate * 0.05).astype(int)
             eligible_flag = np.maximum(eligible_flag, extra)
 
-        snap_date = pd.Timestamp(camp["start_date"]) - pd.Timedelta(days=1)
-
         rows.append(pd.DataFrame({
             "campaign_id": camp["campaign_id"],
-            "customer_id": customers["customer_id"].to_numpy(),
-            "eligible_flag": eligible_flag,
-            "eligibility_reason": np.where(eligible_flag == 1, "rules_pass", "rules_fail"),
-            "snapshot_date": snap_date,
+            "customer_id": customer_ids[eligible_flag == 1],
         }))
 
     return pd.concat(rows, ignore_index=True)
@@ -177,33 +202,88 @@ def _make_exposure(elig: pd.DataFrame, campaigns: pd.DataFrame, rng: np.random.G
     holdout_pct = float(cfg["campaign_design"]["holdout_pct"])
     bounce_rate = float(cfg["campaign_design"]["bounce_rate"])
 
-    exposures = []
-    for _, camp in campaigns.iterrows():
-        cid = camp["campaign_id"]
-        start_ts = pd.Timestamp(camp["start_date"]) + pd.Timedelta(hours=9)
+    # Partition eligibility by campaign once (stable sort keeps customer order within a campaign);
+    # pairs of campaigns missing from dim_campaigns are dropped.
+    camp_pos = pd.Index(campaigns["campaign_id"]).get_indexer(elig["campaign_id"])
+    order = np.argsort(camp_pos, kind="stable")
+    order = order[camp_pos[order] >= 0]
+    camp_pos = camp_pos[order]
 
-        e = elig[(elig["campaign_id"] == cid) & (elig["eligible_flag"] == 1)][["campaign_id", "customer_id"]].copy()
-        if e.empty:
-            continue
+    e = elig[["campaign_id", "customer_id"]].iloc[order].reset_index(drop=True)
+    n = len(e)
 
-        n = len(e)
-        is_holdout = (rng.random(n) < holdout_pct).astype(int)
-        e["control_flag"] = is_holdout
+    design = cfg["campaign_design"]
+    if design.get("holdout_assignment", "random") == "hash":
+        pct = campaigns["holdout_pct"].to_numpy(dtype=float)[camp_pos]
+        e["control_flag"] = assign_holdout(e["campaign_id"], e["customer_id"], pct, str(design["holdout_salt"]))
+    else:
+        e["control_flag"] = (rng.random(n) < holdout_pct).astype(int)
+    e["bounce_flag"] = (rng.random(n) < bounce_rate).astype(int)
+    e["delivered_flag"] = np.where((e["control_flag"] == 0) & (e["bounce_flag"] == 0), 1, 0)
 
-        bounced = (rng.random(n) < bounce_rate).astype(int)
-        e["bounce_flag"] = bounced
-        e["delivered_flag"] = np.where((e["control_flag"] == 0) & (e["bounce_flag"] == 0), 1, 0)
+    start_ts = (pd.to_datetime(campaigns["start_date"]) + pd.Timedelta(hours=9)).to_numpy(dtype="datetime64[ns]")
+    jitter_min = rng.integers(0, 120, size=n)
+    delivered_ts = start_ts[camp_pos] + jitter_min.astype("timedelta64[m]")
+    e["delivered_ts"] = pd.to_datetime(
+        np.where(e["delivered_flag"] == 1, delivered_ts, np.datetime64("NaT"))
+    )
 
-        jitter_min = rng.integers(0, 120, size=n)
-        delivered_ts = start_ts + pd.to_timedelta(jitter_min, unit="m")
-        e["delivered_ts"] = pd.to_datetime(
-            np.where(e["delivered_flag"] == 1, delivered_ts.astype("datetime64[ns]"), np.datetime64("NaT"))
-        )
+    e["send_id"] = _send_ids(e["campaign_id"])
+    return e[["campaign_id", "customer_id", "send_id", "delivered_flag", "delivered_ts", "bounce_flag", "control_flag"]]
+
+
+def _send_ids(campaign_id: pd.Series, send_id_offset: Optional[Mapping[str, int]] = None) -> np.ndarray:
+    """Sequential per-campaign send ids (C001_S0000001, ...), continuing from send_id_offset."""
+    seq = campaign_id.groupby(campaign_id, sort=False).cumcount().to_numpy() + 1
+    if send_id_offset:
+        seq = seq + campaign_id.map(send_id_offset).fillna(0).to_numpy(dtype=np.int64)
+    return np.char.add(np.char.add(campaign_id.to_numpy(dtype=str), "_S"), np.char.zfill(seq.astype(str), 7))
 
-        e["send_id"] = [f"{cid}_S{str(i+1).zfill(7)}" for i in range(n)]
-        exposures.append(e[["campaign_id", "customer_id", "send_id", "delivered_flag", "delivered_ts", "bounce_flag", "control_flag"]])
 
-    return pd.concat(exposures, ignore_index=True)
+def _txn_ids(txn_id_offset: int, n: int) -> np.ndarray:
+    return np.char.add("T", np.char.zfill(np.arange(txn_id_offset + 1, txn_id_offset + n + 1).astype(str), 10))
+
+
+# Upper bound on days x customers cells drawn at once by the transaction simulator.
+_TXN_BLOCK_CELLS = 4_000_000
+
+
+def _uplift_intervals(
+    cfg: dict,
+    customers: pd.DataFrame,
+    campaigns: pd.DataFrame,
+    exposure: pd.DataFrame,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Delivered (campaign, customer) uplift windows as day-index intervals.
+
+    Returns (customer_pos, start_day, end_day, uplift) arrays, one entry per
+    delivered pair of a campaign with non-zero uplift; windows are [start, end).
+    """
+    start = pd.Timestamp(cfg["simulation"]["start_date"])
+
+    camp = campaigns[["campaign_id", "attribution_window_days", "true_rpc_uplift"]].copy()
+    camp["uplift"] = np.clip(camp["true_rpc_uplift"].astype(float) / 50.0, -0.01, 0.02)
+    camp = camp[camp["uplift"] != 0.0]
+
+    delivered = exposure.loc[exposure["delivered_flag"] == 1, ["campaign_id", "customer_id", "delivered_ts"]]
+    delivered = delivered.merge(camp[["campaign_id", "attribution_window_days", "uplift"]], on="campaign_id", how="inner")
+    delivered["delivered_date"] = pd.to_datetime(delivered["delivered_ts"]).dt.floor("D")
+    delivered = (
+        delivered.sort_values(["campaign_id", "delivered_date"], kind="mergesort")
+        .drop_duplicates(["campaign_id", "customer_id"])
+    )
+
+    cust_pos = pd.Index(customers["customer_id"].to_numpy()).get_indexer(delivered["customer_id"].to_numpy())
+    start_day = ((delivered["delivered_date"] - start) // pd.Timedelta(days=1)).to_numpy(dtype=np.int64)
+    end_day = start_day + delivered["attribution_window_days"].to_numpy(dtype=np.int64)
+
+    known = cust_pos >= 0
+    return (
+        cust_pos[known],
+        start_day[known],
+        end_day[known],
+        delivered["uplift"].to_numpy(dtype=float)[known],
+    )
 
 
 def _simulate_transactions(
@@ -212,131 +292,256 @@ def _simulate_transactions(
     customers: pd.DataFrame,
     campaigns: pd.DataFrame,
     exposure: pd.DataFrame,
+    txn_id_offset: int = 0,
+    day_range: Optional[Tuple[int, int]] = None,
 ) -> pd.DataFrame:
+    # day_range limits the simulation to day indices [first, last) of the simulation period (one day shard).
     start = pd.Timestamp(cfg["simulation"]["start_date"])
     end = pd.Timestamp(cfg["simulation"]["end_date"])
     days = pd.date_range(start, end, freq="D")
+    n_days = len(days)
     n_cust = len(customers)
 
-    p_daily = customers["baseline_buy_prob_daily"].to_numpy()
+    p_daily = customers["baseline_buy_prob_daily"].to_numpy(dtype=float)
+    customer_ids = customers["customer_id"].to_numpy().astype(int)
 
     tier_scale = customers["loyalty_tier"].map({"Bronze": 1.0, "Silver": 1.15, "Gold": 1.35, "Platinum": 1.55}).to_numpy()
     weekday_boost = np.array([1.00, 0.98, 0.99, 1.02, 1.08, 1.15, 1.05])
+    day_boost = weekday_boost[days.weekday.to_numpy()]
+
+    # Incremental purchase probability for delivered customers inside a campaign window,
+    # expanded per day block with a difference array instead of rescanning every campaign daily.
+    up_pos, up_start, up_end, up_value = _uplift_intervals(cfg, customers, campaigns, exposure)
+
+    first_day, last_day = day_range if day_range is not None else (0, n_days)
+    block_days = max(1, min(n_days, _TXN_BLOCK_CELLS // max(n_cust, 1)))
+    buy_day_parts = [np.empty(0, dtype=np.int64)]
+    buy_pos_parts = [np.empty(0, dtype=np.int64)]
+
+    for b0 in range(first_day, last_day, block_days):
+        b1 = min(b0 + block_days, last_day)
+
+        s = np.maximum(up_start, b0)
+        e = np.minimum(up_end, b1)
+        active = s < e
+        diff = np.zeros((b1 - b0 + 1, n_cust))
+        np.add.at(diff, (s[active] - b0, up_pos[active]), up_value[active])
+        np.add.at(diff, (e[active] - b0, up_pos[active]), -up_value[active])
+        uplift = np.cumsum(diff[:-1], axis=0)
+
+        p_adj = np.clip(day_boost[b0:b1, None] * p_daily[None, :] + uplift, 0.0, 0.35)
+
+        # Row-major draws: identical stream to one rng.random(n_cust) call per day.
+        buy_day, buy_pos = np.nonzero(rng.random((b1 - b0, n_cust)) < p_adj)
+        buy_day_parts.append(buy_day + b0)
+        buy_pos_parts.append(buy_pos)
+
+    buy_day = np.concatenate(buy_day_parts)
+    buy_pos = np.concatenate(buy_pos_parts)
+
+    n_txn = np.where(rng.random(len(buy_pos)) < 0.12, 2, 1)
+    txn_day = np.repeat(buy_day, n_txn)
+    txn_pos = np.repeat(buy_pos, n_txn)
+    n = len(txn_pos)
+
+    revenue = rng.lognormal(mean=2.85, sigma=0.55, size=n) * tier_scale[txn_pos]
+    items = np.clip((revenue / 8.5 + rng.normal(0, 1.0, size=n)).round().astype(int), 1, 40)
+    store_id = rng.integers(1, 120, size=n)
+    channel = rng.choice(["Store", "Online"], size=n, p=[0.78, 0.22])
+    minute = rng.integers(8 * 60, 21 * 60, size=n)
+
+    txn_ts = (
+        start.to_datetime64()
+        + txn_day.astype("timedelta64[D]")
+        + minute.astype("timedelta64[m]")
+    ).astype("datetime64[ns]")
 
-    txn_rows = []
-    txn_id_counter = 1
-
-    delivered = exposure[exposure["delivered_flag"] == 1][["campaign_id", "customer_id", "delivered_ts"]].copy()
-    delivered["delivered_date"] = pd.to_datetime(delivered["delivered_ts"]).dt.floor("D")
-
-    camp_uplift_prob: Dict[str, float] = {}
-    for _, camp in campaigns.iterrows():
-        rpc_uplift = float(camp["true_rpc_uplift"])
-        camp_uplift_prob[camp["campaign_id"]] = float(np.clip(rpc_uplift / 50.0, -0.01, 0.02))
-
-    # campaign_id -> {customer_id -> delivered_date}
-    delivered_map: Dict[str, Dict[int, pd.Timestamp]] = {}
-    for cid, g in delivered.groupby("campaign_id"):
-        dd = g.sort_values("delivered_date").drop_duplicates("customer_id")
-        delivered_map[cid] = dict(zip(dd["customer_id"].astype(int), dd["delivered_date"]))
-
-    # Iterate day by day (efficient enough for ~25k*90 with vectorization)
-    customer_ids = customers["customer_id"].to_numpy().astype(int)
-
-    for d in days:
-        wd = int(d.weekday())
-        p = p_daily * weekday_boost[wd]
-
-        # Apply incremental probability for customers currently inside a campaign window (delivered only)
-        p_adj = p.copy()
+    return pd.DataFrame({
+        "txn_id": _txn_ids(txn_id_offset, n),
+        "customer_id": customer_ids[txn_pos],
+        "txn_ts": txn_ts,
+        "store_id": store_id,
+        "channel": channel,
+        "gross_revenue": np.round(revenue, 2),
+        "items_count": items,
+    })
 
-        for _, camp in campaigns.iterrows():
-            cid = camp["campaign_id"]
-            window = int(camp["attribution_window_days"])
-            uplift = camp_uplift_prob.get(cid, 0.0)
 
-            if uplift == 0.0:
-                continue
+# Tables written per customer block in streaming mode (dim_campaigns stays a single file).
+_STREAMED_TABLES = ("dim_customers", "fact_eligibility", "fact_exposure", "fact_transactions")
 
-            cmap = delivered_map.get(cid)
-            if not cmap:
-                continue
 
-            delivered_dates = (
-                pd.to_datetime(pd.Series(customer_ids).map(cmap), errors="coerce")
-                .to_numpy(dtype="datetime64[ns]")
-            )
+def _reset_dataset(storage: Storage, raw_dir: Path, name: str, partitioned: bool) -> None:
+    # Keep exactly one layout on disk (single file or name/part-*) so readers never see stale data.
+    storage.remove(raw_dir, name)
+    part_dir = raw_dir / name
+    if partitioned:
+        part_dir.mkdir(parents=True, exist_ok=True)
+    elif part_dir.is_dir() and not any(part_dir.iterdir()):
+        part_dir.rmdir()
 
-            in_window = (
-                (delivered_dates != np.datetime64("NaT"))
-                & (d.to_datetime64() >= delivered_dates)
-                & (d.to_datetime64() < (delivered_dates + np.timedelta64(window, "D")))
-            )
 
-            p_adj = p_adj + uplift * in_window.astype(float)
+def _shard_rng(seed: int, *key: int) -> np.random.Generator:
+    # Independent stream per shard, spawned from project.random_seed by a fixed key rather than by
+    # the order shards happen to run in, so output does not depend on generation.workers.
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=key))
 
-        p_adj = np.clip(p_adj, 0.0, 0.35)
 
-        buy = (rng.random(n_cust) < p_adj)
-        if not buy.any():
-            continue
+def _generate_block(
+    cfg: dict,
+    campaigns: pd.DataFrame,
+    seed: int,
+    block: int,
+    id_offset: int,
+    n: int,
+    prop_range: Tuple[float, float],
+) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Generate one customer shard; transactions are drawn per day shard, each with its own stream.
+
+    send_id / txn_id are numbered from zero here and renumbered by the caller in block order.
+    """
+    rng = _shard_rng(seed, 1, block)
+    customers = _make_customers(rng, cfg, n=n, id_offset=id_offset)
+    eligibility = _eligibility_logic(customers, campaigns, rng, cfg, prop_range)
+    exposure = _make_exposure(eligibility, campaigns, rng, cfg)
 
-        buyers = customer_ids[buy]
-        n_txn = np.where(rng.random(len(buyers)) < 0.12, 2, 1)
+    n_days = len(pd.date_range(cfg["simulation"]["start_date"], cfg["simulation"]["end_date"], freq="D"))
+    shard_days = int(cfg.get("generation", {}).get("txn_shard_days", 30))
+    if shard_days <= 0:
+        raise ValueError(f"generation.txn_shard_days must be positive, got {shard_days}")
 
-        buyer_tier_scale = tier_scale[buy]
-        base = rng.lognormal(mean=2.85, sigma=0.55, size=n_txn.sum())
-        revenue = base * buyer_tier_scale.repeat(n_txn)
+    transactions = pd.concat([
+        _simulate_transactions(
+            _shard_rng(seed, 2, block, shard), cfg, customers, campaigns, exposure,
+            day_range=(d0, min(d0 + shard_days, n_days)),
+        )
+        for shard, d0 in enumerate(range(0, n_days, shard_days))
+    ], ignore_index=True)
+
+    return customers, eligibility, exposure, transactions
+
+
+def _propensity_range(cfg: dict, seed: int, blocks: Iterable[Tuple[int, int, int]]) -> Tuple[float, float]:
+    """(min, max) baseline propensity over every block's customers, regenerated from the block
+    streams, so eligibility is normalized over the population rather than per block."""
+    lo, hi = np.inf, -np.inf
+    for block, id_offset, n in blocks:
+        prop = _make_customers(_shard_rng(seed, 1, block), cfg, n=n, id_offset=id_offset)["baseline_buy_prob_daily"]
+        lo, hi = min(lo, float(prop.min())), max(hi, float(prop.max()))
+    return lo, hi
+
+
+def _ordered_results(executor: ProcessPoolExecutor, fn, tasks: Iterable[tuple], max_pending: int) -> Iterator:
+    # Yield results in submission order while keeping at most max_pending shards in flight.
+    pending: Deque[Future] = deque()
+    for task in tasks:
+        pending.append(executor.submit(fn, *task))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _generate_streaming(seed: int, cfg: dict, paths: Paths, storage: Storage, campaigns: pd.DataFrame) -> int:
+    """Generate customers in fixed-size blocks, writing each block's tables as soon as it is ready.
+
+    Peak memory is bounded by ``generation.block_size`` (customers x campaigns eligibility rows
+    per block) instead of ``simulation.n_customers``. Blocks run in a process pool when
+    ``generation.workers`` > 1; output only depends on the seed, block size and day-shard size.
+    Returns the number of parts written.
+    """
+    gen = cfg.get("generation", {})
+    n_total = int(cfg["simulation"]["n_customers"])
+    block_size = int(gen.get("block_size", 50000))
+    if block_size <= 0:
+        raise ValueError(f"generation.block_size must be positive, got {block_size}")
+    workers = int(gen.get("workers", 1)) or (os.cpu_count() or 1)
+
+    for name in _STREAMED_TABLES:
+        _reset_dataset(storage, paths.raw_dir, name, partitioned=True)
+
+    blocks = [(block, first, min(block_size, n_total - first)) for block, first in enumerate(range(0, n_total, block_size))]
+    prop_range = _propensity_range(cfg, seed, blocks)
+    tasks = [(cfg, campaigns, seed, block, first, n, prop_range) for block, first, n in blocks]
+
+    send_id_offset: Dict[str, int] = {}
+    txn_id_offset = 0
+    n_parts = 0
+
+    with ExitStack() as stack:
+        if workers > 1:
+            executor = stack.enter_context(ProcessPoolExecutor(max_workers=workers, mp_context=pool_context()))
+            results = _ordered_results(executor, _generate_block, tasks, max_pending=2 * workers)
+        else:
+            results = (_generate_block(*task) for task in tasks)
 
-        items = np.clip((revenue / 8.5 + rng.normal(0, 1.0, size=len(revenue))).round().astype(int), 1, 40)
+        for part, (customers, eligibility, exposure, transactions) in enumerate(results):
+            exposure["send_id"] = _send_ids(exposure["campaign_id"], send_id_offset)
+            transactions["txn_id"] = _txn_ids(txn_id_offset, len(transactions))
 
-        store_id = rng.integers(1, 120, size=len(revenue))
-        channel = rng.choice(["Store", "Online"], size=len(revenue), p=[0.78, 0.22])
+            for cid, count in exposure["campaign_id"].value_counts().items():
+                send_id_offset[cid] = send_id_offset.get(cid, 0) + int(count)
+            txn_id_offset += len(transactions)
 
-        buyer_rep = np.repeat(buyers, n_txn)
+            part_name = f"part-{part:05d}"
+            for name, df in zip(_STREAMED_TABLES, (customers, eligibility, exposure, transactions)):
+                storage.write(df, paths.raw_dir / name, part_name, table=name)
+            n_parts += 1
 
-        for i in range(len(revenue)):
-            txn_rows.append({
-                "txn_id": f"T{txn_id_counter:010d}",
-                "customer_id": int(buyer_rep[i]),
-                "txn_ts": pd.Timestamp(d) + pd.Timedelta(minutes=int(rng.integers(8 * 60, 21 * 60))),
-                "store_id": int(store_id[i]),
-                "channel": str(channel[i]),
-                "gross_revenue": float(round(revenue[i], 2)),
-                "items_count": int(items[i]),
-            })
-            txn_id_counter += 1
+            del customers, eligibility, exposure, transactions
 
-    return pd.DataFrame(txn_rows)
+    return n_parts
 
 
-def main() -> None:
+def main(
+    frames: Optional[Dict[str, pd.DataFrame]] = None, writer: Optional[BackgroundWriter] = None,
+) -> Dict[str, pd.DataFrame]:
     project_root = _project_root_from_this_file(Path(__file__))
     cfg = _load_settings(project_root)
     seed = int(cfg["project"]["random_seed"])
-    rng = _rng(seed)
 
     paths = Paths.from_config(project_root, cfg)
     paths.ensure()
+    storage = Storage.from_config(cfg)
+    io = Handoff(storage, frames, writer)
+
+    if bool(cfg.get("generation", {}).get("streaming", False)):
+        campaigns = _make_campaigns(_shard_rng(seed, 0), cfg)
+        storage.remove(paths.raw_dir, "dim_campaigns")
+        campaigns_path = storage.write(campaigns, paths.raw_dir, "dim_campaigns")
+        with step("generate_blocks"):
+            n_parts = _generate_streaming(seed, cfg, paths, storage, campaigns)
+
+        print(f"✅ Generated raw data (streaming, {n_parts} parts):")
+        print(f"- {campaigns_path}")
+        for name in _STREAMED_TABLES:
+            print(f"- {paths.raw_dir / name}/part-*{storage.ext}")
+        return io.outputs
 
-    customers = _make_customers(rng, cfg)
-    campaigns = _make_campaigns(rng, cfg)
-    eligibility = _eligibility_logic(customers, campaigns, rng, cfg)
-    exposure = _make_exposure(eligibility, campaigns, rng, cfg)
-    transactions = _simulate_transactions(rng, cfg, customers, campaigns, exposure)
-
-    customers.to_csv(paths.raw_dir / "dim_customers.csv", index=False)
-    campaigns.to_csv(paths.raw_dir / "dim_campaigns.csv", index=False)
-    eligibility.to_csv(paths.raw_dir / "fact_eligibility.csv", index=False)
-    exposure.to_csv(paths.raw_dir / "fact_exposure.csv", index=False)
-    transactions.to_csv(paths.raw_dir / "fact_transactions.csv", index=False)
+    rng = _rng(seed)
+    with step("customers_campaigns"):
+        customers = _make_customers(rng, cfg)
+        campaigns = _make_campaigns(rng, cfg)
+    with step("eligibility_exposure"):
+        eligibility = _eligibility_logic(customers, campaigns, rng, cfg)
+        exposure = _make_exposure(eligibility, campaigns, rng, cfg)
+    with step("transactions"):
+        transactions = _simulate_transactions(rng, cfg, customers, campaigns, exposure)
+
+    for name in _STREAMED_TABLES:
+        _reset_dataset(storage, paths.raw_dir, name, partitioned=False)
+    storage.remove(paths.raw_dir, "dim_campaigns")
 
     print("✅ Generated raw data:")
-    print(f"- {paths.raw_dir / 'dim_customers.csv'}")
-    print(f"- {paths.raw_dir / 'dim_campaigns.csv'}")
-    print(f"- {paths.raw_dir / 'fact_eligibility.csv'}")
-    print(f"- {paths.raw_dir / 'fact_exposure.csv'}")
-    print(f"- {paths.raw_dir / 'fact_transactions.csv'}")
+    for name, df in (
+        ("dim_customers", customers),
+        ("dim_campaigns", campaigns),
+        ("fact_eligibility", eligibility),
+        ("fact_exposure", exposure),
+        ("fact_transactions", transactions),
+    ):
+        print(f"- {io.write(df, paths.raw_dir, name)}")
+    return io.outputs
 
 
 if __name__ == "__main__":
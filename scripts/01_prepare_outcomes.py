@@ -1,11 +1,53 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import json
+import os
+import shutil
+import sys
+import time
+from dataclasses import dataclass, replace
 from pathlib import Path
+from typing import Dict, List, Optional, Sequence
 import numpy as np
 import pandas as pd
 import yaml
 
+# Make imports stable regardless of where the script is launched
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from pipeline.buckets import OutOfCoreConfig, bucket_dir, merge_sorted, read_bucket, scatter  # noqa: E402
+from pipeline.cuped import CupedConfig  # noqa: E402
+from pipeline.handoff import BackgroundWriter, Handoff  # noqa: E402
+from pipeline.holdout import assign_holdout  # noqa: E402
+from pipeline.incremental import (  # noqa: E402
+    DailyDigest,
+    dirty_keys,
+    drop_stale_partitions,
+    frame_digest,
+    group_digests,
+    load_state,
+    save_state,
+    write_partitions,
+)
+from pipeline.parallel_windows import parallel_window_outcomes  # noqa: E402
+from pipeline.profiling import step  # noqa: E402
+from pipeline.schemas import CSV_ENGINE, lookback_columns, window_columns  # noqa: E402
+from pipeline.sql_backend import SqlConfig, prepare_outcomes  # noqa: E402
+from pipeline.storage import Storage  # noqa: E402
+from pipeline.window_join import TransactionIndex, observation_cutoff  # noqa: E402
+
+# Per-campaign input signatures of data/processed/mart_campaign_outcomes/<campaign_id>.<ext>
+OUTCOMES_STATE_FILE = "outcomes_state.json"
+
+# Column projections of the raw tables (only these are parsed / mapped from disk)
+CUSTOMER_COLUMNS = ["customer_id", "loyalty_tier", "lifecycle", "region", "baseline_buy_prob_daily"]
+ELIGIBILITY_COLUMNS = ["campaign_id", "customer_id", "eligible_flag"]
+TRANSACTION_COLUMNS = ["customer_id", "txn_ts", "gross_revenue"]
+
+# Global eligibility row number carried through out-of-core buckets to restore input order
+ROW_COL = "_elig_row"
+
 
 def _project_root_from_this_file(this_file: Path) -> Path:
     return this_file.resolve().parents[1]
@@ -36,29 +78,19 @@ class Paths:
         self.processed_dir.mkdir(parents=True, exist_ok=True)
 
 
-def _read_required_csv(path: Path) -> pd.DataFrame:
-    if not path.exists():
-        raise FileNotFoundError(f"Missing required dataset: {path}")
-    return pd.read_csv(path)
-
-
-def main() -> None:
-    project_root = _project_root_from_this_file(Path(__file__))
-    cfg = _load_settings(project_root)
-    paths = Paths.from_config(project_root, cfg)
-    paths.ensure()
-
-    customers = _read_required_csv(paths.raw_dir / "dim_customers.csv")
-    campaigns = _read_required_csv(paths.raw_dir / "dim_campaigns.csv")
-    elig = _read_required_csv(paths.raw_dir / "fact_eligibility.csv")
-    exp = _read_required_csv(paths.raw_dir / "fact_exposure.csv")
-    tx = _read_required_csv(paths.raw_dir / "fact_transactions.csv")
-
-    campaigns["start_date"] = pd.to_datetime(campaigns["start_date"])
-    campaigns["attribution_window_days"] = campaigns["attribution_window_days"].astype(int)
-
-    exp["delivered_ts"] = pd.to_datetime(exp["delivered_ts"], errors="coerce")
-    tx["txn_ts"] = pd.to_datetime(tx["txn_ts"])
+def _build_base(
+    customers: pd.DataFrame,
+    campaigns: pd.DataFrame,
+    elig: pd.DataFrame,
+    exp: pd.DataFrame,
+    cfg: dict,
+) -> pd.DataFrame:
+    """Eligible (campaign, customer) pairs with exposure flags, anchor and attribution window."""
+    campaigns = campaigns.assign(
+        start_date=pd.to_datetime(campaigns["start_date"]),
+        attribution_window_days=campaigns["attribution_window_days"].astype(int),
+    )
+    exp = exp.assign(delivered_ts=pd.to_datetime(exp["delivered_ts"], errors="coerce"))
 
     # Join campaign settings onto exposure
     exp = exp.merge(
@@ -77,10 +109,29 @@ def main() -> None:
     )
     exp["anchor_ts"] = pd.to_datetime(exp["anchor_ts"], errors="coerce")
 
-    # Denominator: eligible customers only
-    elig_ok = elig[elig["eligible_flag"].astype(int) == 1][["campaign_id", "customer_id"]].drop_duplicates()
+    # Denominator: eligible customers only (the sparse format stores eligible pairs only;
+    # legacy dense files still carry eligible_flag for every customer x campaign)
+    if "eligible_flag" in elig.columns:
+        elig = elig[elig["eligible_flag"].astype(int) == 1]
+    order = [ROW_COL] if ROW_COL in elig.columns else []
+    elig_ok = elig[["campaign_id", "customer_id"] + order].drop_duplicates(["campaign_id", "customer_id"])
     base = elig_ok.merge(exp, on=["campaign_id", "customer_id"], how="left")
 
+    # With hash-based assignment control membership is recomputed per pair (no exposure join
+    # needed): it verifies the exposure file and fills pairs missing from it.
+    design = cfg["campaign_design"]
+    if design.get("holdout_assignment", "random") == "hash":
+        pct = base["campaign_id"].astype(object).map(campaigns.set_index("campaign_id")["holdout_pct"])
+        expected = assign_holdout(
+            base["campaign_id"], base["customer_id"],
+            pct.fillna(float(design["holdout_pct"])), str(design["holdout_salt"]),
+        )
+        logged = base["control_flag"].notna()
+        n_mismatch = int((logged & (base["control_flag"] != expected)).sum())
+        if n_mismatch:
+            print(f"⚠️ control_flag disagrees with hash assignment for {n_mismatch} of {int(logged.sum())} exposure rows")
+        base["control_flag"] = base["control_flag"].fillna(pd.Series(expected, index=base.index))
+
     # For any eligible customer missing in exposure file, treat as not-delivered control
     base["delivered_flag"] = base["delivered_flag"].fillna(0).astype(int)
     base["control_flag"] = base["control_flag"].fillna(1).astype(int)
@@ -96,30 +147,89 @@ def main() -> None:
 
     base["window_start"] = base["anchor_ts"]
     base["window_end"] = base["anchor_ts"] + pd.to_timedelta(base["window_days"], unit="D")
+    return base
 
-    # Transactions filter
-    min_start = base["window_start"].min()
-    max_end = base["window_end"].max()
-    tx_f = tx[(tx["txn_ts"] >= min_start) & (tx["txn_ts"] < max_end)].copy()
 
-    merged = base[["campaign_id", "customer_id", "window_start", "window_end"]].merge(
-        tx_f[["customer_id", "txn_ts", "gross_revenue"]],
-        on="customer_id",
-        how="left"
-    )
+def _sensitivity_windows(cfg: dict) -> List[int]:
+    return sorted({int(d) for d in cfg["campaign_design"].get("sensitivity_windows_days") or []})
 
-    in_win = (merged["txn_ts"] >= merged["window_start"]) & (merged["txn_ts"] < merged["window_end"])
-    merged = merged[in_win]
 
-    agg = merged.groupby(["campaign_id", "customer_id"], as_index=False).agg(
-        revenue_in_window=("gross_revenue", "sum"),
-        txn_count_in_window=("gross_revenue", "size"),
-    )
+def _lookback_windows(cfg: dict) -> List[int]:
+    return list(CupedConfig.from_config(cfg).lookback_days)
+
+
+def _outcome_workers(cfg: dict) -> int:
+    return int(cfg.get("execution", {}).get("workers", 1)) or (os.cpu_count() or 1)
+
+
+def _as_of(cfg: dict, txn_ts) -> pd.Timestamp:
+    return observation_cutoff((cfg.get("curves", {}) or {}).get("as_of"), txn_ts)
+
+
+def _mask_unobserved(out: pd.DataFrame, windows: Sequence[int], as_of) -> pd.DataFrame:
+    """NaN out revenue_in_window_<d> / converted_<d> where the d-day window ends after `as_of`."""
+    if pd.isna(as_of):
+        return out
+    window_start = pd.to_datetime(out["window_start"])
+    for d in windows:
+        unobserved = (window_start + pd.Timedelta(days=int(d)) > as_of).to_numpy()
+        if unobserved.any():
+            out[f"revenue_in_window_{d}"] = out[f"revenue_in_window_{d}"].astype(float).mask(unobserved)
+            out[f"converted_{d}"] = out[f"converted_{d}"].astype(float).mask(unobserved)
+    return out
+
+
+def _attach_outcomes(
+    base: pd.DataFrame,
+    tx: pd.DataFrame,
+    customers: pd.DataFrame,
+    windows: Sequence[int] = (),
+    lookbacks: Sequence[int] = (),
+    workers: int = 1,
+    as_of=None,
+) -> pd.DataFrame:
+    """Window revenue / conversion per pair plus customer attributes, in the mart column layout.
 
-    out = base.merge(agg, on=["campaign_id", "customer_id"], how="left")
-    out["revenue_in_window"] = out["revenue_in_window"].fillna(0.0)
-    out["txn_count_in_window"] = out["txn_count_in_window"].fillna(0).astype(int)
-    out["converted_flag"] = (out["txn_count_in_window"] > 0).astype(int)
+    `windows` adds revenue_in_window_<d> / converted_<d> for fixed d-day windows from the same
+    anchor and `lookbacks` adds pre_revenue_<d> / pre_txn_count_<d> over the d days before it
+    (CUPED covariates), all answered from the same transaction index. With workers > 1 the
+    lookups run per campaign in a process pool that memory-maps the index built here. Window
+    columns of pairs whose d-day window ends after the observation cutoff `as_of` are NaN.
+    """
+    txn_ts = pd.to_datetime(tx["txn_ts"])
+
+    # Transactions filter
+    min_start = base["window_start"].min()
+    if len(lookbacks):
+        min_start -= pd.Timedelta(days=max(lookbacks))
+    max_end = base["window_end"].max()
+    if len(windows):
+        max_end = max(max_end, base["window_start"].max() + pd.Timedelta(days=max(windows)))
+    in_range = (txn_ts >= min_start) & (txn_ts < max_end)
+    tx_f = tx.loc[in_range].assign(txn_ts=txn_ts[in_range])
+
+    # Window join: sorted per-customer transaction index + searchsorted lookups per window
+    with step("window_join", rows_in=len(base) + len(tx_f)) as rec:
+        index = TransactionIndex.from_frame(tx_f)
+        revenue, txn_count, horizons, pre = parallel_window_outcomes(
+            index, base["campaign_id"], base["customer_id"].to_numpy(), base["window_start"], base["window_end"],
+            windows, lookbacks, workers,
+        )
+
+        out = base.copy()
+        out["revenue_in_window"] = revenue
+        out["txn_count_in_window"] = txn_count
+        out["converted_flag"] = (out["txn_count_in_window"] > 0).astype(int)
+        for d, (rev_d, count_d) in horizons.items():
+            out[f"revenue_in_window_{d}"] = rev_d
+            out[f"converted_{d}"] = (count_d > 0).astype(int)
+        for d, (rev_d, count_d) in pre.items():
+            out[f"pre_revenue_{d}"] = rev_d
+            out[f"pre_txn_count_{d}"] = count_d
+        if as_of is not None:
+            out = _mask_unobserved(out, windows, as_of)
+        if rec is not None:
+            rec.rows_out = len(out)
 
     out["exposed_flag"] = (out["delivered_flag"] == 1).astype(int)
     out["holdout_flag"] = ((out["control_flag"] == 1) | (out["delivered_flag"] == 0)).astype(int)
@@ -137,14 +247,206 @@ def main() -> None:
         "anchor_ts", "window_start", "window_end", "window_days",
         "converted_flag", "revenue_in_window", "txn_count_in_window",
         "lifecycle", "loyalty_tier", "region", "baseline_buy_prob_daily", "segment_name"
+    ] + window_columns(windows) + lookback_columns(lookbacks)
+    if ROW_COL in out.columns:
+        keep.append(ROW_COL)
+    return out[keep].copy()
+
+
+def _campaign_signatures(
+    base: pd.DataFrame,
+    customers: pd.DataFrame,
+    campaigns: pd.DataFrame,
+    elig: pd.DataFrame,
+    exp: pd.DataFrame,
+    tx: pd.DataFrame,
+    cfg: dict,
+) -> Dict[str, dict]:
+    """Inputs each campaign's outcomes depend on: definition, eligibility/exposure, window transactions."""
+    lookbacks = _lookback_windows(cfg)
+    context = "|".join([frame_digest(customers), json.dumps(cfg["campaign_design"], sort_keys=True), str(lookbacks)])
+    camp_sig = group_digests(campaigns["campaign_id"], campaigns)
+    exp_sig = group_digests(exp["campaign_id"], exp)
+    elig_sig = group_digests(elig["campaign_id"], elig[["campaign_id", "customer_id"]])
+    daily = DailyDigest(tx["txn_ts"], tx)
+    as_of = _as_of(cfg, tx["txn_ts"])
+
+    windows = _sensitivity_windows(cfg)
+    if windows:
+        # Sensitivity windows can reach past the campaign's own attribution window
+        horizon_end = base["window_start"] + pd.Timedelta(days=max(windows))
+        base = base.assign(window_end=base["window_end"].clip(lower=horizon_end))
+    if lookbacks:
+        # Pre-period covariates reach back before the anchor
+        base = base.assign(window_start=base["window_start"] - pd.Timedelta(days=max(lookbacks)))
+    ranges = base.groupby("campaign_id", observed=True).agg(first=("window_start", "min"), last=("window_end", "max"))
+    signatures = {}
+    for cid, r in ranges.iterrows():
+        cid = str(cid)
+        first, last = r["first"], r["last"]
+        signatures[cid] = {
+            "campaign": camp_sig.get(cid, ""),
+            "exposure": exp_sig.get(cid, "") + "|" + elig_sig.get(cid, ""),
+            "txn_range": [str(first), str(last)],
+            "transactions": daily.range_digest(first, last) if pd.notna(first) and pd.notna(last) else "",
+            # windows past the cutoff are NaN until more transactions arrive
+            "observed_until": str(min(last, as_of)) if pd.notna(last) and pd.notna(as_of) else "",
+            "context": context,
+        }
+    return signatures
+
+
+def _run_out_of_core(paths: Paths, cfg: dict, storage: Storage, ooc: OutOfCoreConfig, campaigns: pd.DataFrame) -> int:
+    """Outcomes bucket by bucket: scatter inputs on customer_id, process each bucket, merge.
+
+    Each bucket's outcomes are written in eligibility order; a k-way merge on the global
+    eligibility row restores the exact row order of the in-memory path. Returns the bucket count.
+    """
+    customer_keyed = {
+        "dim_customers": CUSTOMER_COLUMNS,
+        "fact_eligibility": ELIGIBILITY_COLUMNS,
+        "fact_exposure": None,
+        "fact_transactions": TRANSACTION_COLUMNS,
+    }
+    input_bytes = sum(storage.nbytes(paths.raw_dir, name) for name in customer_keyed)
+    n_buckets = ooc.buckets_for(input_bytes, storage.format)
+
+    scratch_dir = ooc.scratch_dir
+    if scratch_dir.exists():
+        shutil.rmtree(scratch_dir)
+    with step("scatter"):
+        for name, columns in customer_keyed.items():
+            row_col = ROW_COL if name == "fact_eligibility" else None
+            scatter(storage, paths.raw_dir, name, scratch_dir, n_buckets, ooc.batch_bytes, columns, row_col)
+
+    scratch = replace(storage, csv_export=False)
+    last_txn = []  # per-bucket latest transaction, for the observation cutoff
+    for b in range(n_buckets):
+        elig = read_bucket(storage, scratch_dir, b, "fact_eligibility", ELIGIBILITY_COLUMNS + [ROW_COL])
+        if elig.empty:
+            continue
+        customers = read_bucket(storage, scratch_dir, b, "dim_customers", CUSTOMER_COLUMNS)
+        exp = read_bucket(storage, scratch_dir, b, "fact_exposure")
+        tx = read_bucket(storage, scratch_dir, b, "fact_transactions", TRANSACTION_COLUMNS)
+        last_txn.append(pd.to_datetime(tx["txn_ts"]).max())
+
+        with step(f"bucket:{b}", rows_in=len(elig)) as rec:
+            base = _build_base(customers, campaigns, elig, exp, cfg)
+            out = _attach_outcomes(base, tx, customers, _sensitivity_windows(cfg), _lookback_windows(cfg),
+                                   _outcome_workers(cfg))
+            if rec is not None:
+                rec.rows_out = len(out)
+        scratch.write(out, bucket_dir(scratch_dir, b), "outcomes", table="mart_campaign_outcomes")
+
+    sources = [
+        scratch.iter_batches(bucket_dir(scratch_dir, b), "outcomes", table="mart_campaign_outcomes",
+                             batch_bytes=max(1 << 20, ooc.batch_bytes // n_buckets))
+        for b in range(n_buckets) if scratch.exists(bucket_dir(scratch_dir, b), "outcomes")
     ]
-    out = out[keep].copy()
+    # The cutoff depends on every bucket's transactions, so it is applied at merge time
+    as_of, windows = _as_of(cfg, last_txn), _sensitivity_windows(cfg)
+    storage.remove(paths.processed_dir, "mart_campaign_outcomes")
+    out_dir = paths.processed_dir / "mart_campaign_outcomes"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    pending, pending_bytes, part = [], 0, 0
+    with step("merge"):
+        for chunk in merge_sorted(sources, ROW_COL):
+            pending.append(_mask_unobserved(chunk.drop(columns=ROW_COL), windows, as_of))
+            pending_bytes += int(chunk.memory_usage(index=False).sum())
+            if pending_bytes >= ooc.batch_bytes:
+                storage.write(pd.concat(pending, ignore_index=True), out_dir, f"part-{part:05d}", table="mart_campaign_outcomes")
+                pending, pending_bytes, part = [], 0, part + 1
+        if pending:
+            storage.write(pd.concat(pending, ignore_index=True), out_dir, f"part-{part:05d}", table="mart_campaign_outcomes")
+
+    shutil.rmtree(scratch_dir)
+    return n_buckets
+
+
+def main(
+    frames: Optional[Dict[str, pd.DataFrame]] = None, writer: Optional[BackgroundWriter] = None,
+) -> Dict[str, pd.DataFrame]:
+    project_root = _project_root_from_this_file(Path(__file__))
+    cfg = _load_settings(project_root)
+    paths = Paths.from_config(project_root, cfg)
+    paths.ensure()
 
-    out_path = paths.processed_dir / "mart_campaign_outcomes.csv"
-    out.to_csv(out_path, index=False)
+    storage = Storage.from_config(cfg)
+    io = Handoff(storage, frames, writer)
+    reader = f"{CSV_ENGINE} parser" if storage.format == "csv" else storage.format
+
+    sql = SqlConfig.from_config(project_root, cfg)
+    if sql.enabled:
+        io.flush()  # DuckDB scans the raw files
+        t0 = time.perf_counter()
+        with step("window_join"):
+            out = prepare_outcomes(sql.connect(), storage, paths.raw_dir, cfg, _sensitivity_windows(cfg),
+                                   _lookback_windows(cfg))
+        run_s = time.perf_counter() - t0
+        storage.remove(paths.processed_dir, "mart_campaign_outcomes")
+        out_path = io.write(out, paths.processed_dir, "mart_campaign_outcomes")
+
+        print(f"✅ Prepared outcomes mart ({sql.backend} backend, {run_s:.2f}s):")
+        print(f"- {out_path}")
+        return io.outputs
+
+    ooc = OutOfCoreConfig.from_config(project_root, cfg)
+    if ooc.enabled:
+        io.flush()  # buckets are scattered from the raw files
+        campaigns = storage.read(paths.raw_dir, "dim_campaigns")
+        n_buckets = _run_out_of_core(paths, cfg, storage, ooc, campaigns)
+
+        print(f"✅ Prepared outcomes mart (out-of-core, {n_buckets} customer buckets):")
+        print(f"- {paths.processed_dir / 'mart_campaign_outcomes'}/part-*{storage.ext}")
+        return io.outputs
+
+    # Accepts name.<ext> or a partitioned name/part-*.<ext> directory (streaming generator)
+    t0 = time.perf_counter()
+    customers = io.read(paths.raw_dir, "dim_customers", columns=CUSTOMER_COLUMNS)
+    campaigns = io.read(paths.raw_dir, "dim_campaigns")
+    elig = io.read(paths.raw_dir, "fact_eligibility", columns=ELIGIBILITY_COLUMNS)
+    exp = io.read(paths.raw_dir, "fact_exposure")
+    tx = io.read(paths.raw_dir, "fact_transactions", columns=TRANSACTION_COLUMNS)
+    read_s = time.perf_counter() - t0
+
+    if bool(cfg.get("incremental", {}).get("enabled", False)):
+        with step("build_base", rows_in=len(elig)):
+            base = _build_base(customers, campaigns, elig, exp, cfg)
+        with step("signatures"):
+            signatures = _campaign_signatures(base, customers, campaigns, elig, exp, tx, cfg)
+
+        part_dir = paths.processed_dir / "mart_campaign_outcomes"
+        state_path = paths.processed_dir / OUTCOMES_STATE_FILE
+        dirty = dirty_keys(signatures, load_state(state_path), storage, part_dir)
+
+        if dirty:
+            out = _attach_outcomes(base[base["campaign_id"].isin(dirty)].copy(), tx, customers,
+                                   _sensitivity_windows(cfg), _lookback_windows(cfg), _outcome_workers(cfg),
+                                   _as_of(cfg, tx["txn_ts"]))
+            with step("write_partitions") as rec:
+                write_partitions(out, storage, part_dir, "campaign_id", dirty, "mart_campaign_outcomes")
+                if rec is not None:
+                    rec.rows_out = len(out)
+        drop_stale_partitions(storage, part_dir, signatures)
+        save_state(state_path, signatures)
+
+        print(f"✅ Prepared outcomes partitions ({len(dirty)} of {len(signatures)} campaigns recomputed):")
+        print(f"- {part_dir}")
+        print(f"- raw inputs read in {read_s:.2f}s ({reader})")
+        return io.outputs
+
+    with step("build_base", rows_in=len(elig)):
+        base = _build_base(customers, campaigns, elig, exp, cfg)
+    out = _attach_outcomes(base, tx, customers, _sensitivity_windows(cfg), _lookback_windows(cfg),
+                           _outcome_workers(cfg), _as_of(cfg, tx["txn_ts"]))
+
+    storage.remove(paths.processed_dir, "mart_campaign_outcomes")
+    out_path = io.write(out, paths.processed_dir, "mart_campaign_outcomes")
 
     print("✅ Prepared outcomes mart:")
     print(f"- {out_path}")
+    print(f"- raw inputs read in {read_s:.2f}s ({reader})")
+    return io.outputs
 
 
 if __name__ == "__main__":
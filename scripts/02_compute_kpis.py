@@ -1,10 +1,39 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import json
+import sys
+import time
+from dataclasses import asdict, dataclass, replace
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
 import pandas as pd
 import yaml
 
+# Make imports stable regardless of where the script is launched
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from pipeline.bootstrap import BootstrapConfig, attach_intervals, bootstrap_intervals  # noqa: E402
+from pipeline.cuped import CupedConfig, cuped_kpis, short_lookbacks  # noqa: E402
+from pipeline.handoff import BackgroundWriter, Handoff  # noqa: E402
+from pipeline.incremental import (  # noqa: E402
+    concat_partitions,
+    dirty_keys,
+    drop_stale_partitions,
+    group_digests,
+    load_state,
+    read_partitions,
+    save_state,
+    write_partitions,
+)
+from pipeline.overlap import OverlapIndex  # noqa: E402
+from pipeline.profiling import step  # noqa: E402
+from pipeline.schemas import CSV_ENGINE, lookback_columns, window_columns  # noqa: E402
+from pipeline.sql_backend import SqlConfig, compute_kpis, read_outcomes, register_kpi_inputs  # noqa: E402
+from pipeline.storage import Storage  # noqa: E402
+from pipeline.sufficient_stats import sufficient_stats  # noqa: E402
+
 
 def _project_root_from_this_file(this_file: Path) -> Path:
     return this_file.resolve().parents[1]
@@ -37,122 +66,372 @@ class Paths:
         self.marts_dir.mkdir(parents=True, exist_ok=True)
 
 
-def _read_required_csv(path: Path) -> pd.DataFrame:
-    if not path.exists():
-        raise FileNotFoundError(f"Missing required dataset: {path}")
-    return pd.read_csv(path)
-
+def _kpi_block(n: pd.Series, conv: pd.Series, rev: pd.Series, prefix: str) -> Dict[str, np.ndarray]:
+    """n / converters / revenue / CR / RPC columns for one group (exposed or holdout), per row."""
+    n = n.to_numpy(dtype=float)
+    conv = conv.to_numpy(dtype=float)
+    rev = rev.to_numpy(dtype=float)
+    safe_n = np.where(n > 0, n, 1.0)
+    return {
+        f"{prefix}_n_customers": n,
+        f"{prefix}_converters": conv,
+        f"{prefix}_revenue": rev,
+        f"{prefix}_CR": np.where(n > 0, conv / safe_n, 0.0),
+        f"{prefix}_RPC": np.where(n > 0, rev / safe_n, 0.0),
+    }
+
+
+def _uplift(kpis: pd.DataFrame, min_group: int) -> pd.DataFrame:
+    kpis["CR_uplift"] = kpis["exposed_CR"] - kpis["holdout_CR"]
+    kpis["RPC_uplift"] = kpis["exposed_RPC"] - kpis["holdout_RPC"]
+    kpis["incremental_revenue"] = kpis["RPC_uplift"] * kpis["exposed_n_customers"]
+    kpis["insufficient_sample_flag"] = (
+        (kpis["exposed_n_customers"] < min_group) | (kpis["holdout_n_customers"] < min_group)
+    ).astype(int)
+    return kpis
+
+
+def _group_kpis(outcomes: pd.DataFrame, keys: List[str], min_group: int) -> pd.DataFrame:
+    """KPIs per `keys` group from one grouped sum of exposed/holdout-masked columns.
+
+    Exposed and holdout are flags (not one group column), so each group's counts and sums are
+    taken over masked copies of converted_flag / revenue_in_window in the same pass.
+    """
+    exposed = outcomes["exposed_flag"].to_numpy() == 1
+    holdout = outcomes["holdout_flag"].to_numpy() == 1
+    conv = outcomes["converted_flag"].to_numpy()
+    rev = outcomes["revenue_in_window"].to_numpy(dtype=float)
+
+    masked = pd.DataFrame({
+        "e_n": exposed.astype(np.int64),
+        "e_conv": np.where(exposed, conv, 0),
+        "e_rev": np.where(exposed, rev, 0.0),
+        "h_n": holdout.astype(np.int64),
+        "h_conv": np.where(holdout, conv, 0),
+        "h_rev": np.where(holdout, rev, 0.0),
+    }, index=outcomes.index)
+    sums = masked.groupby([outcomes[k] for k in keys], observed=True, sort=True).sum()
+
+    kpis = sums.index.to_frame(index=False)
+    kpis = kpis.assign(
+        **_kpi_block(sums["e_n"], sums["e_conv"], sums["e_rev"], "exposed"),
+        **_kpi_block(sums["h_n"], sums["h_conv"], sums["h_rev"], "holdout"),
+    )
+    return _uplift(kpis, min_group)
 
-def _kpi_block(df: pd.DataFrame) -> pd.Series:
-    n = len(df)
-    conv = int(df["converted_flag"].sum()) if n > 0 else 0
-    rev = float(df["revenue_in_window"].sum()) if n > 0 else 0.0
 
-    cr = (conv / n) if n > 0 else 0.0
-    rpc = (rev / n) if n > 0 else 0.0
+def _campaign_kpis(outcomes: pd.DataFrame, campaigns: pd.DataFrame, min_group: int) -> pd.DataFrame:
+    camp_kpis = _group_kpis(outcomes, ["campaign_id"], min_group)
+    camp_kpis["insufficient_sample_flag"] = camp_kpis["insufficient_sample_flag"].astype(float)
+    camp_kpis["leakage_rate"] = 0.0  # placeholder (synthetic mode)
 
-    return pd.Series({
-        "n_customers": int(n),
-        "converters": int(conv),
-        "revenue": float(rev),
-        "CR": float(cr),
-        "RPC": float(rpc),
-    })
+    campaigns = campaigns.assign(start_date=pd.to_datetime(campaigns["start_date"], errors="coerce"))
+    camp_kpis = camp_kpis.merge(
+        campaigns[["campaign_id", "campaign_name", "start_date", "channel", "target_segment", "attribution_window_days"]],
+        on="campaign_id",
+        how="left"
+    )
+    return camp_kpis
+
+
+def _segment_kpis(outcomes: pd.DataFrame, min_group: int) -> pd.DataFrame:
+    return _group_kpis(outcomes, ["campaign_id", "segment_name"], min_group)
+
+
+def _with_intervals(
+    camp_kpis: pd.DataFrame,
+    seg_kpis: pd.DataFrame,
+    outcomes: pd.DataFrame,
+    bootstrap: BootstrapConfig,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Campaign and segment KPIs with bootstrap CI columns (unchanged when bootstrap is off)."""
+    if not bootstrap.enabled:
+        return camp_kpis, seg_kpis
+    with step("bootstrap", rows_in=len(outcomes)):
+        camp_ci, seg_ci = bootstrap_intervals(outcomes, bootstrap)
+    return (
+        attach_intervals(camp_kpis, camp_ci, ["campaign_id"]),
+        attach_intervals(seg_kpis, seg_ci, ["campaign_id", "segment_name"]),
+    )
 
 
-def main() -> None:
+def _with_cuped(
+    camp_kpis: pd.DataFrame,
+    seg_kpis: pd.DataFrame,
+    outcomes: pd.DataFrame,
+    cuped: CupedConfig,
+    confidence: float,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Campaign and segment KPIs with CUPED-adjusted uplift columns (unchanged when CUPED is off)."""
+    if not cuped.enabled:
+        return camp_kpis, seg_kpis
+    short = short_lookbacks(camp_kpis, cuped.history_start, cuped.covariate_days)
+    if len(short):
+        print(f"⚠️ cuped.covariate_days ({cuped.covariate_days}) reaches back before the data start "
+              f"({cuped.history_start}) for {len(short)} of {len(camp_kpis)} campaigns; their covariate covers "
+              f"only the days available ({short.index[0]}: {short.iloc[0]} days)")
+    with step("cuped", rows_in=len(outcomes)):
+        return (
+            attach_intervals(camp_kpis, cuped_kpis(outcomes, ["campaign_id"], cuped.covariate_days, confidence),
+                             ["campaign_id"]),
+            attach_intervals(seg_kpis, cuped_kpis(outcomes, ["campaign_id", "segment_name"], cuped.covariate_days,
+                                                  confidence), ["campaign_id", "segment_name"]),
+        )
+
+
+def _cuped_columns(cuped: CupedConfig) -> List[str]:
+    return lookback_columns([cuped.covariate_days]) if cuped.enabled else []
+
+
+def _window_kpis(outcomes: pd.DataFrame, windows: List[int], min_group: int) -> pd.DataFrame:
+    """Campaign KPIs for every sensitivity window: one row per campaign x window_days.
+
+    One grouped sum per group (exposed / holdout) covers all windows at once. Pairs whose window
+    is not fully observed (NaN window columns, see 01) are left out of that window's counts, and
+    complete_flag = 0 marks campaign windows where that happened.
+    """
+    campaign_ids = pd.Index(sorted(outcomes["campaign_id"].astype(str).unique()), name="campaign_id")
+    cols = window_columns(windows)
+    revenue_cols = [f"revenue_in_window_{d}" for d in windows]
+    totals = {}
+    for group in ("exposed", "holdout"):
+        g = outcomes[outcomes[f"{group}_flag"] == 1].groupby(outcomes["campaign_id"].astype(str), observed=True)
+        sums = g[cols].sum().reindex(campaign_ids, fill_value=0)
+        observed = g[revenue_cols].count().reindex(campaign_ids, fill_value=0)
+        for d, c in zip(windows, revenue_cols):
+            sums[f"n_customers_{d}"] = observed[c]
+        sums["n_customers"] = g.size().reindex(campaign_ids, fill_value=0)
+        totals[group] = sums
+
+    frames = []
+    for d in windows:
+        block = pd.DataFrame({"campaign_id": campaign_ids, "window_days": d})
+        for group, sums in totals.items():
+            block = block.assign(**_kpi_block(
+                sums[f"n_customers_{d}"], sums[f"converted_{d}"], sums[f"revenue_in_window_{d}"], group
+            ))
+        block = _uplift(block, min_group)
+        observed = sum(sums[f"n_customers_{d}"] for sums in totals.values())
+        block["complete_flag"] = (observed == sum(sums["n_customers"] for sums in totals.values())).to_numpy().astype(int)
+        frames.append(block)
+
+    if not frames:
+        return pd.DataFrame(columns=["campaign_id", "window_days"])
+    return pd.concat(frames, ignore_index=True).sort_values(["campaign_id", "window_days"], ignore_index=True)
+
+
+def _write_overlap_marts(
+    io: Handoff,
+    marts_dir: Path,
+    outcomes: pd.DataFrame,
+    camp_kpis: pd.DataFrame,
+    threshold: float,
+) -> None:
+    """Overlap marts from every campaign's windows, and mart_kpis_campaign with its overlap flag."""
+    with step("overlap", rows_in=len(outcomes)):
+        overlap = OverlapIndex.build(
+            outcomes["campaign_id"], outcomes["customer_id"], outcomes["window_start"], outcomes["window_end"]
+        )
+        rates = overlap.campaign_rates(threshold)
+    io.write(rates, marts_dir, "mart_overlap_campaign")
+    io.write(overlap.segment_rates(outcomes["segment_name"]), marts_dir, "mart_overlap_segment")
+    io.write(overlap.pair_matrix(), marts_dir, "mart_overlap_pairs")
+
+    camp_kpis = camp_kpis.assign(campaign_id=camp_kpis["campaign_id"].astype(str)).merge(
+        rates[["campaign_id", "overlap_rate", "overlap_flag"]], on="campaign_id", how="left"
+    )
+    camp_kpis["overlap_rate"] = camp_kpis["overlap_rate"].fillna(0.0)
+    camp_kpis["overlap_flag"] = camp_kpis["overlap_flag"].fillna(0).astype(int)
+    io.write(camp_kpis, marts_dir, "mart_kpis_campaign")
+
+
+def _sensitivity_windows(cfg: dict) -> List[int]:
+    return sorted({int(d) for d in cfg["campaign_design"].get("sensitivity_windows_days") or []})
+
+
+# Customer-level columns the dashboard reads (mart_campaign_outcomes_light); also the only
+# outcomes columns the KPI stage projects from disk
+LIGHT_COLUMNS = [
+    "campaign_id", "customer_id",
+    "exposed_flag", "holdout_flag",
+    "converted_flag", "revenue_in_window",
+    "segment_name", "lifecycle", "loyalty_tier", "region",
+    "baseline_buy_prob_daily"
+]
+
+# Outcomes columns the overlap index needs on top of LIGHT_COLUMNS
+OVERLAP_COLUMNS = ["window_start", "window_end"]
+
+MART_NAMES = (
+    "mart_kpis_campaign", "mart_kpis_segment", "mart_campaign_outcomes_light", "mart_kpis_campaign_window",
+    "mart_sufficient_stats",
+    "mart_overlap_campaign", "mart_overlap_segment", "mart_overlap_pairs",
+)
+
+
+def _run_incremental(paths: Paths, cfg: dict, io: Handoff, campaigns: pd.DataFrame, min_group: int) -> int:
+    """Recompute KPI partitions of campaigns whose outcomes, definition or governance changed.
+
+    Returns the number of campaigns recomputed; marts are reassembled from all partitions.
+    """
+    storage = io.storage
+    outcomes_state = load_state(paths.processed_dir / "outcomes_state.json")
+    if not outcomes_state:
+        raise FileNotFoundError(
+            f"Missing {paths.processed_dir / 'outcomes_state.json'}; run 01_prepare_outcomes.py "
+            "with incremental.enabled: true first."
+        )
+
+    camp_sig = group_digests(campaigns["campaign_id"], campaigns)
+    governance = json.dumps(cfg["governance"], sort_keys=True)
+    bootstrap = BootstrapConfig.from_config(cfg)
+    # Intervals are per-campaign seed streams, so the worker count does not affect them
+    bootstrap_sig = json.dumps(asdict(replace(bootstrap, workers=0)), sort_keys=True)
+    cuped = CupedConfig.from_config(cfg)
+    signatures = {
+        cid: {
+            "outcomes": json.dumps(sig, sort_keys=True),
+            "campaign": camp_sig.get(cid, ""),
+            "governance": governance,
+            "bootstrap": bootstrap_sig,
+            "cuped": json.dumps(asdict(cuped), sort_keys=True),
+        }
+        for cid, sig in outcomes_state.items()
+    }
+
+    windows = _sensitivity_windows(cfg)
+    part_root = paths.marts_dir / "partitions"
+    names = ("kpis_campaign", "kpis_segment", "outcomes_light", "sufficient_stats")
+    names += ("kpis_campaign_window",) if windows else ()
+    part_dirs = {name: part_root / name for name in names}
+    state_path = paths.marts_dir / "kpis_state.json"
+    stored = load_state(state_path)
+    dirty = sorted(set().union(*(dirty_keys(signatures, stored, storage, d) for d in part_dirs.values())))
+
+    if dirty:
+        outcomes = read_partitions(
+            storage, paths.processed_dir / "mart_campaign_outcomes", dirty, "mart_campaign_outcomes",
+            LIGHT_COLUMNS + window_columns(windows) + _cuped_columns(cuped),
+        )
+        with step("aggregate", rows_in=len(outcomes)):
+            camp_kpis, seg_kpis = _campaign_kpis(outcomes, campaigns, min_group), _segment_kpis(outcomes, min_group)
+        camp_kpis, seg_kpis = _with_intervals(camp_kpis, seg_kpis, outcomes, bootstrap)
+        camp_kpis, seg_kpis = _with_cuped(camp_kpis, seg_kpis, outcomes, cuped, bootstrap.confidence)
+        write_partitions(camp_kpis, storage, part_dirs["kpis_campaign"], "campaign_id", dirty, "mart_kpis_campaign")
+        write_partitions(seg_kpis, storage, part_dirs["kpis_segment"], "campaign_id", dirty, "mart_kpis_segment")
+        write_partitions(outcomes[LIGHT_COLUMNS], storage, part_dirs["outcomes_light"],
+                         "campaign_id", dirty, "mart_campaign_outcomes_light")
+        write_partitions(sufficient_stats(outcomes), storage, part_dirs["sufficient_stats"],
+                         "campaign_id", dirty, "mart_sufficient_stats")
+        if windows:
+            write_partitions(_window_kpis(outcomes, windows, min_group), storage, part_dirs["kpis_campaign_window"],
+                             "campaign_id", dirty, "mart_kpis_campaign_window")
+
+    keys = sorted(signatures)
+    for d in part_dirs.values():
+        drop_stale_partitions(storage, d, keys)
+    # Overlap spans campaigns, so it is rebuilt from all partitions' windows on every run
+    _write_overlap_marts(
+        io,
+        paths.marts_dir,
+        read_partitions(storage, paths.processed_dir / "mart_campaign_outcomes", keys, "mart_campaign_outcomes",
+                        ["campaign_id", "customer_id", "segment_name"] + OVERLAP_COLUMNS),
+        read_partitions(storage, part_dirs["kpis_campaign"], keys, "mart_kpis_campaign"),
+        float(cfg["governance"]["overlap_flag_threshold"]),
+    )
+    concat_partitions(storage, part_dirs["kpis_segment"], keys, paths.marts_dir, "mart_kpis_segment")
+    concat_partitions(storage, part_dirs["outcomes_light"], keys, paths.marts_dir, "mart_campaign_outcomes_light")
+    concat_partitions(storage, part_dirs["sufficient_stats"], keys, paths.marts_dir, "mart_sufficient_stats")
+    if windows:
+        concat_partitions(storage, part_dirs["kpis_campaign_window"], keys, paths.marts_dir, "mart_kpis_campaign_window")
+    save_state(state_path, signatures)
+    return len(dirty)
+
+
+def main(
+    frames: Optional[Dict[str, pd.DataFrame]] = None, writer: Optional[BackgroundWriter] = None,
+) -> Dict[str, pd.DataFrame]:
     project_root = _project_root_from_this_file(Path(__file__))
     cfg = _load_settings(project_root)
     paths = Paths.from_config(project_root, cfg)
     paths.ensure()
 
-    outcomes = _read_required_csv(paths.processed_dir / "mart_campaign_outcomes.csv")
-    campaigns = _read_required_csv(paths.raw_dir / "dim_campaigns.csv")
-
+    storage = Storage.from_config(cfg)
+    io = Handoff(storage, frames, writer)
+    campaigns = io.read(paths.raw_dir, "dim_campaigns")
     min_group = int(cfg["governance"]["min_group_size"])
+    bootstrap = BootstrapConfig.from_config(cfg)
+    cuped = CupedConfig.from_config(cfg)
+
+    camp_path = storage.path(paths.marts_dir, "mart_kpis_campaign")
+    seg_path = storage.path(paths.marts_dir, "mart_kpis_segment")
+    outcomes_path = storage.path(paths.marts_dir, "mart_campaign_outcomes_light")
+    window_path = storage.path(paths.marts_dir, "mart_kpis_campaign_window")
+    stats_path = storage.path(paths.marts_dir, "mart_sufficient_stats")
+    windows = _sensitivity_windows(cfg)
+    for name in MART_NAMES:
+        storage.remove(paths.marts_dir, name)
+
+    sql = SqlConfig.from_config(project_root, cfg)
+    if sql.enabled:
+        io.flush()  # DuckDB scans the raw and processed files
+        t0 = time.perf_counter()
+        con = sql.connect()
+        register_kpi_inputs(con, storage, paths.raw_dir, paths.processed_dir)
+        with step("aggregate"):
+            marts = compute_kpis(con, min_group, windows)
+        with step("read:mart_campaign_outcomes") as rec:
+            outcomes = read_outcomes(con, LIGHT_COLUMNS + OVERLAP_COLUMNS + _cuped_columns(cuped))
+            if rec is not None:
+                rec.rows_in = len(outcomes)
+        camp_kpis, seg_kpis = _with_intervals(
+            marts.pop("mart_kpis_campaign"), marts["mart_kpis_segment"], outcomes, bootstrap,
+        )
+        camp_kpis, marts["mart_kpis_segment"] = _with_cuped(camp_kpis, seg_kpis, outcomes, cuped, bootstrap.confidence)
+        _write_overlap_marts(
+            io, paths.marts_dir, outcomes, camp_kpis,
+            float(cfg["governance"]["overlap_flag_threshold"]),
+        )
+        for name, df in marts.items():
+            io.write(df, paths.marts_dir, name)
+        io.write(outcomes[LIGHT_COLUMNS], paths.marts_dir, "mart_campaign_outcomes_light")
+        print(f"✅ KPI marts written ({sql.backend} backend, {time.perf_counter() - t0:.2f}s):")
+    elif bool(cfg.get("incremental", {}).get("enabled", False)):
+        n_dirty = _run_incremental(paths, cfg, io, campaigns, min_group)
+        print(f"✅ KPI marts reassembled from partitions ({n_dirty} campaigns recomputed):")
+    else:
+        reader = f"{CSV_ENGINE} parser" if storage.format == "csv" else storage.format
+        t0 = time.perf_counter()
+        outcomes = io.read(
+            paths.processed_dir, "mart_campaign_outcomes",
+            columns=LIGHT_COLUMNS + OVERLAP_COLUMNS + window_columns(windows) + _cuped_columns(cuped),
+        )
+        read_s = time.perf_counter() - t0
+        with step("aggregate", rows_in=len(outcomes)):
+            camp_kpis, seg_kpis = _campaign_kpis(outcomes, campaigns, min_group), _segment_kpis(outcomes, min_group)
+            stats = sufficient_stats(outcomes)
+            window_kpis = _window_kpis(outcomes, windows, min_group) if windows else None
+        camp_kpis, seg_kpis = _with_intervals(camp_kpis, seg_kpis, outcomes, bootstrap)
+        camp_kpis, seg_kpis = _with_cuped(camp_kpis, seg_kpis, outcomes, cuped, bootstrap.confidence)
+        _write_overlap_marts(
+            io, paths.marts_dir, outcomes, camp_kpis, float(cfg["governance"]["overlap_flag_threshold"]),
+        )
+        io.write(seg_kpis, paths.marts_dir, "mart_kpis_segment")
+        io.write(outcomes[LIGHT_COLUMNS], paths.marts_dir, "mart_campaign_outcomes_light")
+        io.write(stats, paths.marts_dir, "mart_sufficient_stats")
+        if windows:
+            io.write(window_kpis, paths.marts_dir, "mart_kpis_campaign_window")
+        print(f"✅ KPI marts written (outcomes read in {read_s:.2f}s, {reader}):")
 
-    def compute_campaign_kpis(g: pd.DataFrame) -> pd.Series:
-        exposed = g[g["exposed_flag"] == 1]
-        holdout = g[g["holdout_flag"] == 1]
-
-        e = _kpi_block(exposed).add_prefix("exposed_")
-        h = _kpi_block(holdout).add_prefix("holdout_")
-
-        cr_uplift = float(e["exposed_CR"] - h["holdout_CR"])
-        rpc_uplift = float(e["exposed_RPC"] - h["holdout_RPC"])
-        incr_rev = float(rpc_uplift * e["exposed_n_customers"])
-
-        insufficient = (e["exposed_n_customers"] < min_group) or (h["holdout_n_customers"] < min_group)
-        leakage_rate = 0.0  # placeholder (synthetic mode)
-
-        return pd.concat([e, h, pd.Series({
-            "CR_uplift": cr_uplift,
-            "RPC_uplift": rpc_uplift,
-            "incremental_revenue": incr_rev,
-            "insufficient_sample_flag": int(insufficient),
-            "leakage_rate": float(leakage_rate),
-        })])
-
-    camp_kpis = outcomes.groupby("campaign_id", as_index=False).apply(compute_campaign_kpis)
-    camp_kpis = camp_kpis.reset_index(drop=True)
-
-    campaigns["start_date"] = pd.to_datetime(campaigns["start_date"], errors="coerce")
-    camp_kpis = camp_kpis.merge(
-        campaigns[["campaign_id", "campaign_name", "start_date", "channel", "target_segment", "attribution_window_days"]],
-        on="campaign_id",
-        how="left"
-    )
-
-    def compute_segment_kpis(g: pd.DataFrame) -> pd.DataFrame:
-        rows = []
-        for seg, s in g.groupby("segment_name"):
-            exposed = s[s["exposed_flag"] == 1]
-            holdout = s[s["holdout_flag"] == 1]
-
-            e = _kpi_block(exposed).add_prefix("exposed_")
-            h = _kpi_block(holdout).add_prefix("holdout_")
-
-            cr_uplift = float(e["exposed_CR"] - h["holdout_CR"])
-            rpc_uplift = float(e["exposed_RPC"] - h["holdout_RPC"])
-            incr_rev = float(rpc_uplift * e["exposed_n_customers"])
-
-            insufficient = (e["exposed_n_customers"] < min_group) or (h["holdout_n_customers"] < min_group)
-
-            rows.append({
-                "campaign_id": g["campaign_id"].iloc[0],
-                "segment_name": seg,
-                **e.to_dict(),
-                **h.to_dict(),
-                "CR_uplift": cr_uplift,
-                "RPC_uplift": rpc_uplift,
-                "incremental_revenue": incr_rev,
-                "insufficient_sample_flag": int(insufficient),
-            })
-        return pd.DataFrame(rows)
-
-    seg_kpis = outcomes.groupby("campaign_id", as_index=False).apply(compute_segment_kpis)
-    seg_kpis = seg_kpis.reset_index(drop=True)
-
-    camp_path = paths.marts_dir / "mart_kpis_campaign.csv"
-    seg_path = paths.marts_dir / "mart_kpis_segment.csv"
-    outcomes_path = paths.marts_dir / "mart_campaign_outcomes_light.csv"
-
-    camp_kpis.to_csv(camp_path, index=False)
-    seg_kpis.to_csv(seg_path, index=False)
-
-    keep = [
-        "campaign_id", "customer_id",
-        "exposed_flag", "holdout_flag",
-        "converted_flag", "revenue_in_window",
-        "segment_name", "lifecycle", "loyalty_tier", "region",
-        "baseline_buy_prob_daily"
-    ]
-    outcomes[keep].to_csv(outcomes_path, index=False)
-
-    print("✅ KPI marts written:")
     print(f"- {camp_path}")
     print(f"- {seg_path}")
     print(f"- {outcomes_path}")
+    print(f"- {stats_path}")
+    if windows:
+        print(f"- {window_path} (windows: {', '.join(map(str, windows))} days)")
+    for name in ("mart_overlap_campaign", "mart_overlap_segment", "mart_overlap_pairs"):
+        print(f"- {storage.path(paths.marts_dir, name)}")
+    return io.outputs
 
 
 if __name__ == "__main__":
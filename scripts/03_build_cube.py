@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+import pandas as pd
+import yaml
+
+# Make imports stable regardless of where the script is launched
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from pipeline.cube import CUSTOMER_DIMENSIONS, CubeConfig, build_cube, tenure_band  # noqa: E402
+from pipeline.handoff import BackgroundWriter, Handoff  # noqa: E402
+from pipeline.profiling import step  # noqa: E402
+from pipeline.storage import Storage  # noqa: E402
+
+OUTCOME_COLUMNS = ["campaign_id", "customer_id", "exposed_flag", "holdout_flag", "converted_flag", "revenue_in_window"]
+
+
+def _project_root_from_this_file(this_file: Path) -> Path:
+    return this_file.resolve().parents[1]
+
+
+def _load_settings(project_root: Path) -> dict:
+    cfg_path = project_root / "config" / "settings.yaml"
+    if not cfg_path.exists():
+        raise FileNotFoundError(f"Missing config file: {cfg_path}")
+    with cfg_path.open("r", encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+
+@dataclass(frozen=True)
+class Paths:
+    project_root: Path
+    raw_dir: Path
+    marts_dir: Path
+
+    @staticmethod
+    def from_config(project_root: Path, cfg: dict) -> "Paths":
+        out = cfg.get("output", {})
+        raw_dir = project_root / out.get("raw_dir", "data/raw")
+        marts_dir = project_root / out.get("marts_dir", "data/marts")
+        return Paths(project_root, raw_dir, marts_dir)
+
+
+def main(
+    frames: Optional[Dict[str, pd.DataFrame]] = None, writer: Optional[BackgroundWriter] = None,
+) -> Dict[str, pd.DataFrame]:
+    project_root = _project_root_from_this_file(Path(__file__))
+    cfg = _load_settings(project_root)
+    paths = Paths.from_config(project_root, cfg)
+
+    storage = Storage.from_config(cfg)
+    io = Handoff(storage, frames, writer)
+    cube_cfg = CubeConfig.from_config(cfg)
+    min_group = int(cfg["governance"]["min_group_size"])
+    confidence = float((cfg.get("bootstrap", {}) or {}).get("confidence", 0.95))
+
+    t0 = time.perf_counter()
+    # The light outcomes mart (written by 02 in every mode) carries lifecycle / loyalty_tier / region;
+    # channel_pref and tenure bands come from the customer dimension.
+    outcome_dims = [d for d in cube_cfg.dimensions if d not in CUSTOMER_DIMENSIONS]
+    outcomes = io.read(paths.marts_dir, "mart_campaign_outcomes_light", columns=OUTCOME_COLUMNS + outcome_dims)
+    customer_dims = [d for d in cube_cfg.dimensions if d in CUSTOMER_DIMENSIONS]
+    if customer_dims:
+        columns = ["customer_id"] + [d for d in customer_dims if d != "tenure_band"]
+        columns += ["tenure_days"] if "tenure_band" in customer_dims else []
+        customers = io.read(paths.raw_dir, "dim_customers", columns=columns).set_index("customer_id")
+        if "tenure_band" in customer_dims:
+            customers["tenure_band"] = tenure_band(customers["tenure_days"], cube_cfg.tenure_bands_days)
+        rows = customers.index.get_indexer(outcomes["customer_id"])
+        if (rows < 0).any():
+            raise ValueError("Outcomes reference customers missing from dim_customers; rerun the pipeline.")
+        for d in customer_dims:
+            outcomes[d] = customers[d].to_numpy()[rows]
+
+    with step("aggregate", rows_in=len(outcomes)) as rec:
+        cube = build_cube(outcomes, cube_cfg, min_group, confidence)
+        if rec is not None:
+            rec.rows_out = len(cube)
+    out_path = io.write(cube, paths.marts_dir, "mart_kpi_cube")
+
+    n_sets = len(cube_cfg.grouping_sets())
+    print(f"✅ KPI cube written ({n_sets} grouping sets over {', '.join(cube_cfg.dimensions)}; "
+          f"{len(cube)} rows, {time.perf_counter() - t0:.2f}s):")
+    print(f"- {out_path}")
+    return io.outputs
+
+
+if __name__ == "__main__":
+    main()
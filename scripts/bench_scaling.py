@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import argparse
+import importlib
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+import yaml
+
+# Make imports stable regardless of where the script is launched
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from pipeline import profiling  # noqa: E402
+from pipeline.storage import Storage  # noqa: E402
+
+# Scaling benchmark: runs each pipeline stage (and the dashboard's mart loads) across a grid of
+# scale points, one axis at a time from `benchmark.base`, and records wall time, CPU, peak RSS,
+# rows and throughput per stage. Every point runs in a scratch copy of the project with its own
+# settings.yaml, each stage in a fresh process (standalone, from files), so peak RSS is the stage's
+# own. Results go to `benchmark.results_dir`; with a baseline (--save-baseline writes one), any
+# stage slower or heavier than baseline x (1 + regression_threshold) + slack fails with exit 1.
+# A point whose stage fails is recorded as failed (with the error) and the sweep goes on; the run
+# then also exits 1.
+# Usage: python scripts/bench_scaling.py [--axis n_customers] [--quick] [--save-baseline]
+
+STAGES = [
+    ("generate", "scripts.00_generate_data"),
+    ("prepare_outcomes", "scripts.01_prepare_outcomes"),
+    ("compute_kpis", "scripts.02_compute_kpis"),
+    ("build_cube", "scripts.03_build_cube"),
+    ("uplift_curves", "scripts.04_uplift_curves"),
+    ("dashboard_load", "dashboard"),
+]
+
+# Marts the Streamlit pages load through app/data_access.py (read whole, like the loaders do)
+DASHBOARD_MARTS = [
+    "mart_kpis_campaign", "mart_kpis_segment", "mart_sufficient_stats", "mart_uplift_curves",
+    "mart_campaign_outcomes_light",
+]
+
+AXES = ("n_customers", "n_campaigns", "days")
+
+# The generator draws campaign start dates without replacement from [start + 5d, end - 25d]
+CAMPAIGN_DAY_MARGIN = 30
+COPY_DIRS = ("config", "pipeline", "scripts")
+
+
+def _load_settings(project_root: Path) -> dict:
+    cfg_path = project_root / "config" / "settings.yaml"
+    if not cfg_path.exists():
+        raise FileNotFoundError(f"Missing config file: {cfg_path}")
+    with cfg_path.open("r", encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+
+def _point_settings(cfg: dict, params: Dict[str, int]) -> dict:
+    sim = dict(cfg["simulation"])
+    sim["n_customers"] = int(params["n_customers"])
+    sim["n_campaigns"] = int(params["n_campaigns"])
+    start = pd.Timestamp(sim["start_date"])
+    sim["end_date"] = (start + pd.Timedelta(days=int(params["days"]) - 1)).strftime("%Y-%m-%d")
+    return dict(cfg, simulation=sim)
+
+
+def _feasible(params: Dict[str, int]) -> Dict[str, int]:
+    """Widen `days` so every campaign can get its own start date (n_campaigns + 30 days at least)."""
+    return dict(params, days=max(params["days"], params["n_campaigns"] + CAMPAIGN_DAY_MARGIN))
+
+
+def _grid(bench: dict, axes: List[str], limit: Optional[int]) -> List[Tuple[str, Dict[str, int]]]:
+    """(axis, params) points: the base point, then each axis swept with the others at base.
+
+    Sweeping n_campaigns past days - 30 also widens days (see _feasible); params record what ran.
+    """
+    base = _feasible({k: int(v) for k, v in bench["base"].items()})
+    points = [("base", base)]
+    for axis in axes:
+        values = [int(v) for v in bench["axes"].get(axis, [])][:limit]
+        points += [(axis, _feasible(dict(base, **{axis: v}))) for v in values if v != base[axis]]
+    return points
+
+
+def _run_stage(module: str, record_path: Path) -> None:
+    """Worker mode: one stage under a profiling record, written as JSON for the parent."""
+    with profiling.stage(module) as rec:
+        if module == "dashboard":
+            cfg = _load_settings(PROJECT_ROOT)
+            storage = Storage.from_config(cfg)
+            marts_dir = PROJECT_ROOT / cfg["output"].get("marts_dir", "data/marts")
+            for name in DASHBOARD_MARTS:
+                with profiling.step(f"read:{name}"):
+                    profiling.add_rows(rows_in=len(storage.read_file(storage.path(marts_dir, name), name)))
+        else:
+            importlib.import_module(module).main()
+    record_path.write_text(json.dumps(rec.to_dict()), encoding="utf-8")
+
+
+def _measure_point(work: Path, cfg: dict, repeats: int) -> Tuple[Dict[str, dict], Optional[str]]:
+    """Run every stage of one scale point in `work`; the fastest of `repeats` runs per stage.
+
+    Returns the per-stage results and, when a stage fails, "<stage>: <last error line>" (later
+    stages depend on its outputs, so the point stops there).
+    """
+    (work / "config" / "settings.yaml").write_text(yaml.safe_dump(cfg, sort_keys=False), encoding="utf-8")
+    shutil.rmtree(work / "data", ignore_errors=True)
+    results: Dict[str, dict] = {}
+    for name, module in STAGES:
+        best = None
+        for _ in range(max(1, repeats)):
+            record_path = work / "stage_record.json"
+            proc = subprocess.run(
+                [sys.executable, str(work / "scripts" / Path(__file__).name), "--run-stage", module,
+                 "--record", str(record_path)],
+                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+            )
+            if proc.returncode != 0:
+                lines = proc.stderr.strip().splitlines()
+                return results, f"{name}: {lines[-1] if lines else f'exit code {proc.returncode}'}"
+            rec = json.loads(record_path.read_text(encoding="utf-8"))
+            if best is None or rec["wall_s"] < best["wall_s"]:
+                best = rec
+        rows = best["rows_in"] or best["rows_out"] or 0
+        results[name] = {
+            "wall_s": best["wall_s"],
+            "cpu_s": best["cpu_s"],
+            "peak_rss_mb": best["peak_rss_mb"],
+            "rows_in": best["rows_in"],
+            "rows_out": best["rows_out"],
+            "rows_per_s": round(rows / best["wall_s"], 1) if best["wall_s"] > 0 else None,
+        }
+    return results, None
+
+
+def _point_id(params: Dict[str, int]) -> str:
+    return f"c{params['n_customers']}-k{params['n_campaigns']}-d{params['days']}"
+
+
+def _regressions(results: dict, baseline: dict, threshold: float, slack_s: float, slack_mb: float) -> List[str]:
+    base_points = {p["id"]: p for p in baseline.get("points", [])}
+    problems = []
+    for point in results["points"]:
+        ref = base_points.get(point["id"])
+        if point.get("error") or (ref is not None and ref.get("error")):
+            continue
+        if ref is None:
+            continue
+        for stage, m in point["stages"].items():
+            r = ref["stages"].get(stage)
+            if r is None:
+                continue
+            if m["wall_s"] > r["wall_s"] * (1 + threshold) + slack_s:
+                problems.append(f"{point['id']} {stage}: wall {r['wall_s']:.2f}s -> {m['wall_s']:.2f}s")
+            if m["peak_rss_mb"] and r["peak_rss_mb"] and m["peak_rss_mb"] > r["peak_rss_mb"] * (1 + threshold) + slack_mb:
+                problems.append(f"{point['id']} {stage}: peak RSS {r['peak_rss_mb']:.0f} MB -> {m['peak_rss_mb']:.0f} MB")
+    return problems
+
+
+def _report(points: List[dict]) -> None:
+    for point in points:
+        p = point["params"]
+        print(f"\n{point['axis']}: {p['n_customers']:,} customers, {p['n_campaigns']} campaigns, {p['days']} days")
+        if point.get("error"):
+            print(f"  ❌ failed at {point['error']}")
+        for stage, m in point["stages"].items():
+            rate = f"{m['rows_per_s']:>12,.0f} rows/s" if m["rows_per_s"] else " " * 19
+            rss = f"{m['peak_rss_mb']:>7.0f} MB" if m["peak_rss_mb"] is not None else ""
+            print(f"  {stage:<18}{m['wall_s']:>8.2f}s  cpu {m['cpu_s']:>7.2f}s {rate} {rss}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Pipeline scaling benchmark.")
+    parser.add_argument("--axis", action="append", choices=AXES, help="sweep only this axis (repeatable)")
+    parser.add_argument("--limit", type=int, default=None, help="first N values of each axis")
+    parser.add_argument("--quick", action="store_true", help="same as --limit 2")
+    parser.add_argument("--repeats", type=int, default=None, help="runs per stage, fastest kept")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--run-stage", help=argparse.SUPPRESS)
+    parser.add_argument("--record", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_stage:
+        _run_stage(args.run_stage, args.record)
+        return
+
+    cfg = _load_settings(PROJECT_ROOT)
+    bench = cfg.get("benchmark", {}) or {}
+    limit = 2 if args.quick else args.limit
+    repeats = args.repeats or int(bench.get("repeats", 1))
+    threshold = float(bench.get("regression_threshold", 0.25))
+    results_dir = PROJECT_ROOT / bench.get("results_dir", "data/bench")
+    baseline_path = PROJECT_ROOT / bench.get("baseline_file", "benchmarks/baseline.json")
+
+    started = datetime.now(timezone.utc)
+    points = []
+    with tempfile.TemporaryDirectory(prefix="bench-") as tmp:
+        work = Path(tmp)
+        for d in COPY_DIRS:
+            shutil.copytree(PROJECT_ROOT / d, work / d, ignore=shutil.ignore_patterns("__pycache__"))
+        for axis, params in _grid(bench, args.axis or list(AXES), limit):
+            print(f"▶️  {axis}: {params}")
+            stages, error = _measure_point(work, _point_settings(cfg, params), repeats)
+            point = {"id": _point_id(params), "axis": axis, "params": params, "stages": stages}
+            if error:
+                print(f"   ❌ {error}")
+                point["error"] = error
+            points.append(point)
+
+    results = {
+        "created_at": started.isoformat(timespec="seconds"),
+        "environment": profiling.environment(),
+        "output_format": cfg.get("output", {}).get("format", "csv"),
+        "repeats": repeats,
+        "points": points,
+    }
+    _report(points)
+    out_path = profiling.write_manifest(results_dir / started.strftime("bench-%Y%m%dT%H%M%SZ.json"), results)
+    print(f"\n✅ Benchmark results written:\n- {out_path}")
+    failed = [p["id"] for p in points if p.get("error")]
+    if failed:
+        print(f"❌ {len(failed)} point(s) failed: {', '.join(failed)}")
+
+    if args.save_baseline:
+        print(f"- baseline: {profiling.write_manifest(baseline_path, results)}")
+    elif not baseline_path.exists():
+        print(f"(no baseline at {baseline_path}; run with --save-baseline to create one)")
+    else:
+        baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+        problems = _regressions(results, baseline, threshold, float(bench.get("regression_slack_s", 0.25)),
+                                float(bench.get("regression_slack_mb", 32)))
+        if problems:
+            print(f"❌ {len(problems)} regression(s) beyond {threshold:.0%} of {baseline_path}:")
+            for p in problems:
+                print(f"   - {p}")
+            sys.exit(1)
+        print(f"✅ No stage regressed beyond {threshold:.0%} of the baseline")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
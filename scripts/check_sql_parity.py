@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import importlib
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Make imports stable regardless of where the script is launched
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from pipeline.sql_backend import SqlConfig, compute_kpis, prepare_outcomes, register  # noqa: E402
+from pipeline.storage import Storage  # noqa: E402
+from pipeline.sufficient_stats import STATS_KEYS, sufficient_stats  # noqa: E402
+
+# Parity check between the pandas and SQL backends on the current raw data: runs 01 and 02 both
+# ways in memory (nothing is written) and compares every mart after sorting on its keys.
+# Exit code 1 on any mismatch. Usage: python scripts/check_sql_parity.py
+
+RTOL = 1e-9
+
+KEYS = {
+    "mart_campaign_outcomes": ["campaign_id", "customer_id"],
+    "mart_kpis_campaign": ["campaign_id"],
+    "mart_kpis_segment": ["campaign_id", "segment_name"],
+    "mart_kpis_campaign_window": ["campaign_id", "window_days"],
+    "mart_sufficient_stats": STATS_KEYS,
+}
+
+
+def _normalize(df: pd.DataFrame, keys: Sequence[str]) -> pd.DataFrame:
+    df = df.copy()
+    for c in df.columns:
+        if isinstance(df[c].dtype, pd.CategoricalDtype) or df[c].dtype == object:
+            df[c] = df[c].astype(str).where(df[c].notna(), "<null>")  # NaN and None alike
+        elif pd.api.types.is_datetime64_any_dtype(df[c]):
+            df[c] = pd.to_datetime(df[c]).astype("datetime64[ns]")
+        elif pd.api.types.is_numeric_dtype(df[c]):
+            df[c] = df[c].astype(float)
+    return df.sort_values(list(keys), ignore_index=True)
+
+
+def _compare(name: str, expected: pd.DataFrame, actual: pd.DataFrame) -> List[str]:
+    problems = []
+    if list(expected.columns) != list(actual.columns):
+        problems.append(f"columns differ: {list(expected.columns)} vs {list(actual.columns)}")
+        actual = actual[[c for c in expected.columns if c in actual.columns]]
+    if len(expected) != len(actual):
+        return problems + [f"row count {len(expected)} vs {len(actual)}"]
+
+    keys = KEYS[name]
+    a, b = _normalize(expected, keys), _normalize(actual[list(expected.columns)], keys)
+    for c in expected.columns:
+        x, y = a[c], b[c]
+        if pd.api.types.is_float_dtype(x):
+            same = np.isclose(x.to_numpy(), y.to_numpy(), rtol=RTOL, atol=1e-9, equal_nan=True)
+        else:
+            same = (x.to_numpy() == y.to_numpy()) | (x.isna() & y.isna()).to_numpy()
+        if not same.all():
+            problems.append(f"{c}: {int((~same).sum())} of {len(same)} values differ")
+    return problems
+
+
+def main() -> None:
+    prep = importlib.import_module("scripts.01_prepare_outcomes")
+    kpis = importlib.import_module("scripts.02_compute_kpis")
+
+    cfg = prep._load_settings(PROJECT_ROOT)
+    paths = prep.Paths.from_config(PROJECT_ROOT, cfg)
+    storage = Storage.from_config(cfg)
+    windows = prep._sensitivity_windows(cfg)
+    lookbacks = prep._lookback_windows(cfg)
+    min_group = int(cfg["governance"]["min_group_size"])
+
+    # pandas backend
+    t0 = time.perf_counter()
+    customers = storage.read(paths.raw_dir, "dim_customers", columns=prep.CUSTOMER_COLUMNS)
+    campaigns = storage.read(paths.raw_dir, "dim_campaigns")
+    elig = storage.read(paths.raw_dir, "fact_eligibility", columns=prep.ELIGIBILITY_COLUMNS)
+    exp = storage.read(paths.raw_dir, "fact_exposure")
+    tx = storage.read(paths.raw_dir, "fact_transactions", columns=prep.TRANSACTION_COLUMNS)
+    outcomes = prep._attach_outcomes(
+        prep._build_base(customers, campaigns, elig, exp, cfg), tx, customers, windows, lookbacks,
+        as_of=prep._as_of(cfg, tx["txn_ts"]),
+    )
+    expected: Dict[str, pd.DataFrame] = {
+        "mart_campaign_outcomes": outcomes,
+        "mart_kpis_campaign": kpis._campaign_kpis(outcomes, campaigns, min_group),
+        "mart_kpis_segment": kpis._segment_kpis(outcomes, min_group),
+        "mart_sufficient_stats": sufficient_stats(outcomes),
+    }
+    if windows:
+        expected["mart_kpis_campaign_window"] = kpis._window_kpis(outcomes, windows, min_group)
+    pandas_s = time.perf_counter() - t0
+
+    # SQL backend (its KPI stage reads its own outcomes, like 02 reads the file 01 wrote)
+    sql_cfg = dict(cfg, incremental={"enabled": False}, out_of_core={"enabled": False},
+                   execution=dict(cfg.get("execution", {}) or {}, backend="duckdb"))
+    sql = SqlConfig.from_config(PROJECT_ROOT, sql_cfg)
+    t0 = time.perf_counter()
+    con = sql.connect()
+    sql_outcomes = prepare_outcomes(con, storage, paths.raw_dir, sql_cfg, windows, lookbacks)
+    register(con, storage, paths.raw_dir, "dim_campaigns")
+    con.register("outcomes", sql_outcomes)
+    actual = {"mart_campaign_outcomes": sql_outcomes, **compute_kpis(con, min_group, windows)}
+    sql_s = time.perf_counter() - t0
+
+    failed = False
+    print(f"pandas backend {pandas_s:.2f}s, {sql.backend} backend {sql_s:.2f}s (rtol {RTOL:g})")
+    for name, df in expected.items():
+        problems = _compare(name, df, actual[name])
+        failed |= bool(problems)
+        print(f"{'✅' if not problems else '❌'} {name} ({len(df)} rows)")
+        for p in problems:
+            print(f"   - {p}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
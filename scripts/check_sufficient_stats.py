@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pandas as pd
+import yaml
+
+# Make imports stable regardless of where the script is launched
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from pipeline.storage import Storage  # noqa: E402
+from pipeline.sufficient_stats import rollup_kpis  # noqa: E402
+
+# Consistency check on the written marts: rolling mart_sufficient_stats up to campaign level must
+# reproduce the customer counts, converters and revenue of mart_kpis_campaign (every pair lands in
+# exactly one stats row, including pairs with a missing dimension). Run after 02_compute_kpis.py.
+# Exit code 1 on any mismatch. Usage: python scripts/check_sufficient_stats.py
+
+RTOL = 1e-9
+CHECKED = [
+    f"{g}_{c}" for g in ("exposed", "holdout") for c in ("n_customers", "converters", "revenue")
+]
+
+
+def _load_settings(project_root: Path) -> dict:
+    cfg_path = project_root / "config" / "settings.yaml"
+    if not cfg_path.exists():
+        raise FileNotFoundError(f"Missing config file: {cfg_path}")
+    with cfg_path.open("r", encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+
+def _compare(expected: pd.DataFrame, actual: pd.DataFrame) -> List[str]:
+    merged = expected.merge(actual, on="campaign_id", how="outer", suffixes=("_kpis", "_stats"), indicator=True)
+    problems = [
+        f"campaign {cid} only in {'mart_kpis_campaign' if side == 'left_only' else 'mart_sufficient_stats'}"
+        for cid, side in zip(merged["campaign_id"], merged["_merge"]) if side != "both"
+    ]
+    merged = merged[merged["_merge"] == "both"]
+    for c in CHECKED:
+        x = merged[f"{c}_kpis"].to_numpy(dtype=float)
+        y = merged[f"{c}_stats"].to_numpy(dtype=float)
+        same = np.isclose(x, y, rtol=RTOL, atol=1e-6)
+        for cid, a, b in zip(merged["campaign_id"][~same], x[~same], y[~same]):
+            problems.append(f"{cid} {c}: {a:,.2f} in mart_kpis_campaign vs {b:,.2f} rolled up")
+    return problems
+
+
+def main() -> None:
+    cfg = _load_settings(PROJECT_ROOT)
+    storage = Storage.from_config(cfg)
+    marts_dir = PROJECT_ROOT / cfg["output"].get("marts_dir", "data/marts")
+
+    kpis = storage.read(marts_dir, "mart_kpis_campaign", columns=["campaign_id"] + CHECKED)
+    stats = storage.read(marts_dir, "mart_sufficient_stats")
+    rolled = rollup_kpis(stats, ["campaign_id"])[["campaign_id"] + CHECKED]
+    kpis["campaign_id"] = kpis["campaign_id"].astype(str)
+    rolled["campaign_id"] = rolled["campaign_id"].astype(str)
+
+    problems = _compare(kpis, rolled)
+    print(f"{'✅' if not problems else '❌'} mart_sufficient_stats rolls up to mart_kpis_campaign "
+          f"({len(kpis)} campaigns, {len(stats)} stats rows)")
+    for p in problems:
+        print(f"   - {p}")
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
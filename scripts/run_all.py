@@ -1,8 +1,22 @@
 from __future__ import annotations
 
+from datetime import datetime, timezone
 from pathlib import Path
-import importlib
+import argparse
+import hashlib
 import sys
+import time
+from typing import List
+
+import yaml
+
+# Make imports stable regardless of where the script is launched
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from pipeline import profiling  # noqa: E402
+from pipeline.dag import DagRunner, RunnerConfig, Stage  # noqa: E402
+from pipeline.storage import Storage  # noqa: E402
 
 
 def _project_root_from_this_file(this_file: Path) -> Path:
@@ -10,21 +24,130 @@ def _project_root_from_this_file(this_file: Path) -> Path:
     return this_file.resolve().parents[1]
 
 
+def _load_settings(project_root: Path) -> dict:
+    cfg_path = project_root / "config" / "settings.yaml"
+    if not cfg_path.exists():
+        raise FileNotFoundError(f"Missing config file: {cfg_path}")
+    with cfg_path.open("r", encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+
+RAW_TABLES = ("dim_customers", "dim_campaigns", "fact_eligibility", "fact_exposure", "fact_transactions")
+KPI_MARTS = (
+    "mart_kpis_campaign", "mart_kpis_segment", "mart_campaign_outcomes_light", "mart_sufficient_stats",
+    "mart_overlap_campaign", "mart_overlap_segment", "mart_overlap_pairs",
+)
+
+
+def _stages(cfg: dict) -> List[Stage]:
+    """The pipeline DAG: what each script reads and writes, and the settings it depends on.
+    Keep `config` in sync with the keys a script reads, or edits to them will not rerun it."""
+    windows = cfg.get("campaign_design", {}).get("sensitivity_windows_days") or []
+    kpi_marts = KPI_MARTS + (("mart_kpis_campaign_window",) if windows else ())
+    outcomes = ("processed", "mart_campaign_outcomes")
+    return [
+        Stage(
+            "generate", "scripts.00_generate_data",
+            inputs=(),
+            outputs=tuple(("raw", t) for t in RAW_TABLES),
+            config=("project", "simulation", "generation", "campaign_design", "output"),
+        ),
+        Stage(
+            "prepare_outcomes", "scripts.01_prepare_outcomes",
+            inputs=tuple(("raw", t) for t in RAW_TABLES),
+            outputs=(outcomes,),
+            config=("campaign_design", "incremental", "execution", "out_of_core", "cuped", "output"),
+        ),
+        Stage(
+            "compute_kpis", "scripts.02_compute_kpis",
+            inputs=(outcomes, ("raw", "dim_campaigns")),
+            outputs=tuple(("marts", m) for m in kpi_marts),
+            config=(
+                "project.random_seed", "governance", "campaign_design.sensitivity_windows_days",
+                "incremental", "execution", "bootstrap", "cuped", "output",
+            ),
+        ),
+        Stage(
+            "build_cube", "scripts.03_build_cube",
+            inputs=(("marts", "mart_campaign_outcomes_light"), ("raw", "dim_customers")),
+            outputs=(("marts", "mart_kpi_cube"),),
+            config=("cube", "governance.min_group_size", "bootstrap.confidence", "output"),
+        ),
+        Stage(
+            "uplift_curves", "scripts.04_uplift_curves",
+            inputs=(outcomes, ("raw", "fact_transactions")),
+            outputs=(("marts", "mart_uplift_curves"),),
+            config=("curves", "incremental", "output"),
+        ),
+    ]
+
+
+def _write_manifest(path: Path, project_root: Path, runner: DagRunner, stages: List[Stage], run: dict) -> Path:
+    """Run metadata plus, per stage, its status and cache key and (if it ran) the measured step tree."""
+    settings = (project_root / "config" / "settings.yaml").read_bytes()
+    stage_rows = {}
+    for stage in stages:
+        row = {"status": runner.status.get(stage.name, "not_run"), "key": runner.keys.get(stage.name)}
+        if stage.name in runner.records:
+            row.update(runner.records[stage.name].to_dict())
+            row.pop("name")
+        stage_rows[stage.name] = row
+    peaks = [r["peak_rss_mb"] for r in stage_rows.values() if r.get("peak_rss_mb") is not None]
+    return profiling.write_manifest(path, {
+        **run,
+        "status": "failed" if "failed" in runner.status.values() else "ok",
+        "settings_sha": hashlib.blake2b(settings, digest_size=16).hexdigest(),
+        "environment": profiling.environment(),
+        "peak_rss_mb": max(peaks, default=None),
+        "stages": stage_rows,
+    })
+
+
 def main() -> None:
     project_root = _project_root_from_this_file(Path(__file__))
 
-    # Ensure imports work regardless of where you run the command from
-    sys.path.insert(0, str(project_root))
+    parser = argparse.ArgumentParser(description="Run the pipeline, skipping stages whose inputs, config and code are unchanged.")
+    parser.add_argument("--force", action="store_true", help="rerun every stage regardless of the cache")
+    parser.add_argument("--jobs", type=int, default=None, help="stages run in parallel (default: runner.jobs)")
+    parser.add_argument("--profile", action="append", default=[], metavar="STAGE",
+                        help="dump a profile of this stage next to the run manifest (repeatable)")
+    parser.add_argument("--profiler", choices=profiling.PROFILERS, default="cprofile",
+                        help="cprofile writes .prof (pstats / snakeviz); pyinstrument writes .html")
+    args = parser.parse_args()
 
-    gen_mod = importlib.import_module("scripts.00_generate_data")
-    out_mod = importlib.import_module("scripts.01_prepare_outcomes")
-    kpi_mod = importlib.import_module("scripts.02_compute_kpis")
+    cfg = _load_settings(project_root)
+    runner_cfg = RunnerConfig.from_config(project_root, cfg)
+    out = cfg.get("output", {})
+    dirs = {
+        "raw": project_root / out.get("raw_dir", "data/raw"),
+        "processed": project_root / out.get("processed_dir", "data/processed"),
+        "marts": project_root / out.get("marts_dir", "data/marts"),
+    }
+    stages = _stages(cfg)
+    unknown = sorted(set(args.profile) - {s.name for s in stages})
+    if unknown:
+        parser.error(f"--profile: unknown stage(s) {unknown}; choose from {[s.name for s in stages]}")
 
-    gen_mod.main()
-    out_mod.main()
-    kpi_mod.main()
+    started = datetime.now(timezone.utc)
+    run_id = started.strftime("run-%Y%m%dT%H%M%SZ")
+    jobs = args.jobs or runner_cfg.jobs
+    runner = DagRunner(project_root, cfg, dirs, Storage.from_config(cfg), stages)
+    t0 = time.perf_counter()
+    try:
+        status = runner.run(runner_cfg.cache_file, jobs=jobs, force=args.force, profile=args.profile,
+                            profiler=args.profiler, profile_prefix=runner_cfg.manifest_dir / run_id)
+    finally:
+        manifest_path = _write_manifest(runner_cfg.manifest_dir / f"{run_id}.json", project_root, runner, stages, {
+            "run_id": run_id,
+            "started_at": started.isoformat(timespec="seconds"),
+            "wall_s": round(time.perf_counter() - t0, 3),
+            "argv": sys.argv[1:],
+            "jobs": jobs,
+        })
 
-    print("\n✅ Pipeline complete.")
+    ran = [name for name, s in status.items() if s == "ran"]
+    print(f"\n✅ Pipeline complete ({len(ran)} of {len(status)} stages ran, the rest were cached).")
+    print(f"- run manifest: {manifest_path}")
     print("Next:")
     print("  streamlit run app/app.py")
 